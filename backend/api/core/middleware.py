@@ -0,0 +1,16 @@
+from django.middleware.gzip import GZipMiddleware
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """
+    ``GZipMiddleware`` limited to buffered JSON bodies. PDFs and other
+    file responses are already compressed, and gzipping a stream would
+    rewrite it chunk by chunk, so they are passed through with their strong
+    ``ETag``. A compressed body gets the weak form of its ``ETag``, which
+    still matches ``If-None-Match`` on the next request.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        return super().process_response(request, response)
@@ -1,3 +1,15 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import RetentionPolicy, ValidationRuleSet
+
+
+@admin.register(ValidationRuleSet)
+class ValidationRuleSetAdmin(admin.ModelAdmin):
+    list_display = ('site', 'version', 'is_active', 'updated_at')
+    readonly_fields = ('version', 'updated_at')
+
+
+@admin.register(RetentionPolicy)
+class RetentionPolicyAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'max_uploads', 'max_age_days', 'max_total_bytes', 'updated_at')
+    readonly_fields = ('updated_at',)
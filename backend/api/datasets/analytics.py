@@ -1,7 +1,11 @@
 import math
+from dataclasses import dataclass, field
 
+import numpy as np
 import pandas as pd
 
+from .sketch import QuantileSketch
+
 REQUIRED_COLUMNS = [
     'Equipment Name',
     'Type',
@@ -10,35 +14,319 @@ REQUIRED_COLUMNS = [
     'Temperature',
 ]
 
+NUMERIC_COLUMNS = ['Flowrate', 'Pressure', 'Temperature']
 
-def _safe_mean(series: pd.Series):
-    value = pd.to_numeric(series, errors='coerce').mean()
-    if pd.isna(value) or (isinstance(value, float) and math.isnan(value)):
-        return None
-    return float(value)
+# Reported per Type, as ``p5`` ... ``p95``.
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
 
 
-def compute_chemviz_analytics(df: pd.DataFrame) -> dict:
-    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
-    if missing:
-        raise ValueError(f'Missing required columns: {missing}')
-
-    total_equipment = int(len(df))
-    avg_flowrate = _safe_mean(df['Flowrate'])
-    avg_pressure = _safe_mean(df['Pressure'])
-    avg_temperature = _safe_mean(df['Temperature'])
-
-    type_distribution = (
-        df['Type']
-        .astype(str)
-        .value_counts(dropna=False)
-        .to_dict()
+@dataclass
+class ColumnStats:
+    """
+    Count, sum, min/max and Welford mean/M2 for one numeric column, plus a
+    quantile sketch. Two instances combine with Chan's parallel update, so
+    the result does not depend on how the rows were split.
+    """
+
+    count: int = 0
+    total: float = 0.0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float | None = None
+    maximum: float | None = None
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> 'ColumnStats':
+        values = pd.to_numeric(series, errors='coerce').dropna()
+        if values.empty:
+            return cls()
+        mean = float(values.mean())
+        return cls(
+            count=int(len(values)),
+            total=float(values.sum()),
+            mean=mean,
+            m2=float(((values - mean) ** 2).sum()),
+            minimum=float(values.min()),
+            maximum=float(values.max()),
+            sketch=QuantileSketch.from_values(values.to_numpy(dtype=np.float64)),
+        )
+
+    def merge(self, other: 'ColumnStats') -> 'ColumnStats':
+        if not other.count:
+            return ColumnStats(**vars(self))
+        if not self.count:
+            return ColumnStats(**vars(other))
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        return ColumnStats(
+            count=count,
+            total=self.total + other.total,
+            mean=self.mean + delta * other.count / count,
+            m2=self.m2 + other.m2 + delta * delta * self.count * other.count / count,
+            minimum=min(self.minimum, other.minimum),
+            maximum=max(self.maximum, other.maximum),
+            sketch=self.sketch.merge(other.sketch),
+        )
+
+    @property
+    def average(self):
+        if not self.count:
+            return None
+        value = self.total / self.count
+        return None if math.isnan(value) else value
+
+    @property
+    def variance(self):
+        """Sample variance (ddof=1), matching ``Series.var``."""
+        if self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+    def to_dict(self) -> dict:
+        """The mergeable counters, without the sketch (stored separately)."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.minimum,
+            'max': self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ColumnStats':
+        return cls(
+            count=data['count'],
+            total=data['total'],
+            mean=data['mean'],
+            m2=data['m2'],
+            minimum=data['min'],
+            maximum=data['max'],
+        )
+
+    def describe(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': self.average,
+            'std': self.std,
+            'min': self.minimum,
+            'max': self.maximum,
+        }
+
+
+@dataclass
+class TypeStats:
+    """``ColumnStats`` per numeric column for the rows of one equipment Type."""
+
+    rows: int = 0
+    columns: dict = field(
+        default_factory=lambda: {col: ColumnStats() for col in NUMERIC_COLUMNS}
     )
 
-    return {
-        'total_equipment': total_equipment,
-        'avg_flowrate': avg_flowrate,
-        'avg_pressure': avg_pressure,
-        'avg_temperature': avg_temperature,
-        'type_distribution': type_distribution,
-    }
+    def merge(self, other: 'TypeStats') -> 'TypeStats':
+        return TypeStats(
+            rows=self.rows + other.rows,
+            columns={
+                col: self.columns[col].merge(other.columns[col])
+                for col in NUMERIC_COLUMNS
+            },
+        )
+
+    def finalize(self) -> dict:
+        result = {'count': self.rows}
+        for col in NUMERIC_COLUMNS:
+            stats = self.columns[col]
+            quantiles = stats.sketch.quantiles(QUANTILES)
+            result[col] = {
+                'count': stats.count,
+                'mean': stats.average,
+                'min': stats.minimum,
+                'max': stats.maximum,
+                'std': stats.std,
+                **{_quantile_key(q): value for q, value in zip(QUANTILES, quantiles)},
+            }
+        return result
+
+
+def _quantile_key(q: float) -> str:
+    return f'p{q * 100:g}'
+
+
+def type_stats_from_dataframe(df: pd.DataFrame) -> dict:
+    """
+    ``TypeStats`` for every Type in ``df``, from one ``groupby('Type')``
+    aggregation per statistic rather than a pass per Type.
+    """
+    numeric = df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    keys = df['Type'].astype(str)
+    groups = numeric.groupby(keys, sort=False)
+    sizes = groups.size()
+    counts = groups.count()
+    sums = groups.sum()
+    means = groups.mean()
+    minimums = groups.min()
+    maximums = groups.max()
+    m2 = (numeric - groups.transform('mean')).pow(2).groupby(keys, sort=False).sum()
+
+    result = {}
+    for label, frame in groups:
+        columns = {}
+        for col in NUMERIC_COLUMNS:
+            count = int(counts.at[label, col])
+            if not count:
+                columns[col] = ColumnStats()
+                continue
+            columns[col] = ColumnStats(
+                count=count,
+                total=float(sums.at[label, col]),
+                mean=float(means.at[label, col]),
+                m2=float(m2.at[label, col]),
+                minimum=float(minimums.at[label, col]),
+                maximum=float(maximums.at[label, col]),
+                sketch=QuantileSketch.from_values(frame[col].to_numpy(dtype=np.float64)),
+            )
+        result[label] = TypeStats(rows=int(sizes.at[label]), columns=columns)
+    return result
+
+
+@dataclass
+class AnalyticsAccumulator:
+    """
+    Mergeable partial result of ``compute_chemviz_analytics``.
+
+    Build one per chunk, worker or dataset with ``from_dataframe``, combine
+    them with ``merge`` (associative, empty accumulator as identity) and call
+    ``finalize`` for the summary dict.
+    """
+
+    rows: int = 0
+    columns: dict = field(
+        default_factory=lambda: {col: ColumnStats() for col in NUMERIC_COLUMNS}
+    )
+    # Insertion order is first appearance, which ``finalize`` uses to break
+    # ties the same way ``value_counts`` does.
+    type_counts: dict = field(default_factory=dict)
+    # Type -> ``TypeStats``, same order as ``type_counts``.
+    by_type: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'AnalyticsAccumulator':
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f'Missing required columns: {missing}')
+
+        type_counts = (
+            df['Type']
+            .astype(str)
+            .value_counts(dropna=False, sort=False)
+        )
+        return cls(
+            rows=int(len(df)),
+            columns={col: ColumnStats.from_series(df[col]) for col in NUMERIC_COLUMNS},
+            type_counts={label: int(count) for label, count in type_counts.items()},
+            by_type=type_stats_from_dataframe(df),
+        )
+
+    def merge(self, other: 'AnalyticsAccumulator') -> 'AnalyticsAccumulator':
+        type_counts = dict(self.type_counts)
+        for label, count in other.type_counts.items():
+            type_counts[label] = type_counts.get(label, 0) + count
+        by_type = dict(self.by_type)
+        for label, stats in other.by_type.items():
+            by_type[label] = by_type[label].merge(stats) if label in by_type else stats
+        return AnalyticsAccumulator(
+            rows=self.rows + other.rows,
+            columns={
+                col: self.columns[col].merge(other.columns[col])
+                for col in NUMERIC_COLUMNS
+            },
+            type_counts=type_counts,
+            by_type=by_type,
+        )
+
+    def components(self) -> dict:
+        """
+        The counters behind ``finalize`` (row count, per-column count, sum,
+        mean, M2, min and max, type counts, and the same per Type) in a
+        JSON-friendly form, so stored summaries can be merged without the
+        rows.
+        """
+        return {
+            'rows': self.rows,
+            'columns': _columns_to_dict(self.columns),
+            'type_counts': dict(self.type_counts),
+            'by_type': {
+                label: {'rows': stats.rows, 'columns': _columns_to_dict(stats.columns)}
+                for label, stats in self.by_type.items()
+            },
+        }
+
+    @classmethod
+    def from_components(cls, data: dict) -> 'AnalyticsAccumulator':
+        """
+        Inverse of ``components``; sketches are not restored. Components
+        stored before they carried ``by_type`` come back without per-Type
+        stats.
+        """
+        return cls(
+            rows=data['rows'],
+            columns=_columns_from_dict(data['columns']),
+            type_counts=dict(data['type_counts']),
+            by_type={
+                label: TypeStats(rows=stats['rows'], columns=_columns_from_dict(stats['columns']))
+                for label, stats in (data.get('by_type') or {}).items()
+            },
+        )
+
+    def type_distribution(self) -> dict:
+        return dict(sorted(self.type_counts.items(), key=lambda item: -item[1]))
+
+    def finalize(self) -> dict:
+        type_distribution = self.type_distribution()
+        return {
+            'total_equipment': self.rows,
+            'avg_flowrate': self.columns['Flowrate'].average,
+            'avg_pressure': self.columns['Pressure'].average,
+            'avg_temperature': self.columns['Temperature'].average,
+            'type_distribution': type_distribution,
+            'type_stats': {
+                label: self.by_type[label].finalize()
+                for label in type_distribution
+                if label in self.by_type
+            },
+            # Serialised ``QuantileSketch`` per column; see ``column_sketches``.
+            'sketches': {
+                col: self.columns[col].sketch.to_dict() for col in NUMERIC_COLUMNS
+            },
+            'components': self.components(),
+        }
+
+
+def _columns_to_dict(columns: dict) -> dict:
+    return {col: columns[col].to_dict() for col in NUMERIC_COLUMNS}
+
+
+def _columns_from_dict(data: dict) -> dict:
+    return {col: ColumnStats.from_dict(data[col]) for col in NUMERIC_COLUMNS}
+
+
+def compute_chemviz_analytics(df: pd.DataFrame) -> dict:
+    return AnalyticsAccumulator.from_dataframe(df).finalize()
+
+
+def quantile_keys(qs=QUANTILES) -> list:
+    return [_quantile_key(q) for q in qs]
+
+
+def column_sketches(summary: dict):
+    """The stored per-column sketches of a summary, or ``None`` if it has none."""
+    stored = (summary or {}).get('sketches')
+    if not stored:
+        return None
+    return {col: QuantileSketch.from_dict(stored[col]) for col in NUMERIC_COLUMNS}
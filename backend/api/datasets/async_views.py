@@ -0,0 +1,165 @@
+"""
+Async variants of the read endpoints, for ASGI servers.
+
+DRF views are sync, so under ASGI each request holds a thread for as long
+as it runs, report rendering included. These views take the same query
+parameters and return the same bodies and validators as their sync
+counterparts, but query with the async ORM and send pandas and ReportLab
+work to ``offload``; a slow report then only occupies a worker process,
+and summary requests keep being served from the event loop. They
+authenticate with the same ``Token`` header as the rest of the API.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import offload
+from .columnar import read_stored_rows, upload_variant
+from .conditional import not_modified, set_validators
+from .listing import RowsPage, SummaryListing
+from .models import DatasetUpload
+from .report_cache import get_cached_report, store_report
+from .reports import REPORT_TEMPLATE_VERSION, ReportSource, render_source_pdf, report_etag
+
+
+def _json(body, status_code=status.HTTP_200_OK):
+    # DRF's encoder, so dates come out exactly as in the sync views.
+    return JsonResponse(body, status=status_code, encoder=JSONEncoder)
+
+
+def _unauthorized(detail):
+    response = _json({'detail': detail}, status.HTTP_401_UNAUTHORIZED)
+    response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+def _busy():
+    response = _json(
+        {'error': 'The server is busy rendering; retry shortly.'},
+        status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response['Retry-After'] = '1'
+    return response
+
+
+async def _authenticate(request):
+    """
+    ``(user, None)`` for a valid ``Authorization: Token <key>`` header, as
+    DRF's ``TokenAuthentication`` checks it, or ``(None, 401 response)``.
+    """
+    header = request.headers.get('Authorization', '').split()
+    if not header or header[0].lower() != 'token':
+        return None, _unauthorized('Authentication credentials were not provided.')
+    if len(header) != 2:
+        return None, _unauthorized('Invalid token header.')
+    try:
+        token = await Token.objects.select_related('user').aget(key=header[1])
+    except Token.DoesNotExist:
+        return None, _unauthorized('Invalid token.')
+    if not token.user.is_active:
+        return None, _unauthorized('User inactive or deleted.')
+    return token.user, None
+
+
+@require_GET
+async def summaries(request):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    listing, error = SummaryListing.parse(request.GET)
+    if error:
+        return _json(error, status.HTTP_400_BAD_REQUEST)
+    try:
+        uploads = [upload async for upload in listing.queryset(user)]
+    except ValueError:
+        return _json({'error': 'Invalid cursor.'}, status.HTTP_400_BAD_REQUEST)
+    uploaded_by = user.get_full_name() or user.username
+
+    uploads, next_cursor, etag = listing.page(uploads, user, uploaded_by)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return set_validators(cached, etag)
+    return set_validators(
+        _json({'results': listing.results(uploads, uploaded_by), 'next_cursor': next_cursor}),
+        etag,
+    )
+
+
+@require_GET
+async def latest_rows(request):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    page, error = RowsPage.parse(request.GET)
+    if error:
+        return _json(error, status.HTTP_400_BAD_REQUEST)
+
+    uploads = RowsPage.queryset(user)
+    while True:
+        upload = await uploads.afirst()
+        if upload is None:
+            return _json({'rows': [], 'error': 'No valid datasets available.'})
+        # ETag only, as in DatasetLatestRowsView.
+        etag = page.etag(upload)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return set_validators(cached, etag)
+
+        try:
+            total_rows, rows, error = await offload.run(
+                read_stored_rows,
+                upload.file.path,
+                upload_variant(upload),
+                page.columns,
+                page.offset,
+                page.offset + page.limit,
+            )
+        except offload.OffloadBusy:
+            return _busy()
+        if not error:
+            break
+        await DatasetUpload.objects.filter(id=upload.id).aupdate(is_valid=False)
+
+    return set_validators(_json(page.body(upload, total_rows, rows)), etag)
+
+
+@require_GET
+async def report(request, upload_id):
+    user, error = await _authenticate(request)
+    if error:
+        return error
+    try:
+        upload = await DatasetUpload.objects.aget(
+            id=upload_id,
+            user=user  # 🔒 OWNER CHECK
+        )
+    except DatasetUpload.DoesNotExist:
+        return _json(
+            {'error': 'Dataset not found or access denied.'}, status.HTTP_404_NOT_FOUND
+        )
+
+    etag = report_etag(upload)
+    cached = not_modified(request, etag, upload.uploaded_at)
+    if cached is not None:
+        return set_validators(cached, etag, upload.uploaded_at)
+    # A cached PDF is served straight away, without waiting for a worker.
+    path = get_cached_report(upload.id, REPORT_TEMPLATE_VERSION)
+    if path is None:
+        try:
+            content = await offload.run(render_source_pdf, ReportSource.of(upload))
+        except offload.OffloadBusy:
+            return _busy()
+        path = await sync_to_async(store_report, thread_sensitive=False)(
+            upload.id, REPORT_TEMPLATE_VERSION, content
+        )
+    response = FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename=f'chemviz-report-{upload.id}.pdf',
+        content_type='application/pdf',
+    )
+    return set_validators(response, etag, upload.uploaded_at)
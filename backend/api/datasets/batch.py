@@ -0,0 +1,138 @@
+"""
+Parallel ingest for batch uploads.
+
+Each CSV of a batch is parsed, validated and summarised in a worker process
+(``CHEMVIZ_BATCH_WORKERS``; ``0`` runs them inline). Workers only touch the
+file system: they stage the columnar sidecar under ``MEDIA_ROOT/tmp`` and
+return the ingest result, and the request process creates the rows and
+installs the sidecars.
+"""
+
+import io
+import threading
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+from .columnar import ColumnarWriter
+from .compression import archive_members
+from .ingest import ingest_csv
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.CHEMVIZ_BATCH_WORKERS)
+        return _executor
+
+
+def expand_batch(uploaded_files, max_file_size: int, max_files: int):
+    """
+    Flatten the uploaded files of a batch, replacing each ``.zip`` with the
+    files inside it (in a batch a zip is a bundle, not one compressed CSV).
+    Members are extracted to temporary files, which the caller closes.
+    Returns ``(files, None)`` or ``(None, message)``.
+    """
+    files = []
+    error = None
+    for uploaded in uploaded_files:
+        is_zip = uploaded.name.lower().endswith('.zip')
+        members = _zip_members(uploaded, max_file_size) if is_zip else [uploaded]
+        try:
+            # Count as members are extracted so a huge archive stops early.
+            for member in members:
+                files.append(member)
+                if len(files) > max_files:
+                    error = f'Batch exceeds maximum of {max_files} files.'
+                    break
+        except (zipfile.BadZipFile, zlib.error, EOFError):
+            error = f'{uploaded.name} is not a valid zip archive.'
+        if error:
+            for member in files:
+                member.close()
+            return None, error
+    return files, None
+
+
+def _zip_members(uploaded, max_file_size: int):
+    with zipfile.ZipFile(uploaded) as archive:
+        for info in archive_members(archive):
+            extracted = TemporaryUploadedFile(PurePosixPath(info.filename).name, None, 0, None)
+            try:
+                with archive.open(info) as member:
+                    extracted.size = _copy_capped(member, extracted, max_file_size + 1)
+            except BaseException:
+                extracted.close()
+                raise
+            extracted.seek(0)
+            yield extracted
+
+
+def _copy_capped(source, target, limit: int) -> int:
+    # Copy at most ``limit`` bytes, one past the size cap: enough for the
+    # size check to reject the member without inflating all of it.
+    copied = 0
+    while copied < limit:
+        chunk = source.read(min(target.DEFAULT_CHUNK_SIZE, limit - copied))
+        if not chunk:
+            break
+        target.write(chunk)
+        copied += len(chunk)
+    return copied
+
+
+def _ingest_one(source, compression, rules, max_rows, chunk_size, max_bytes, staging_root):
+    """
+    Worker entry point. ``source`` is the file's bytes or a path to it,
+    compressed with ``compression`` if that is set.
+    Returns ``(IngestResult, None, staged_sidecar_dir)`` or
+    ``(None, error_payload, None)``.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    writer = ColumnarWriter(staging_root=staging_root)
+    try:
+        result, error = ingest_csv(
+            source,
+            max_rows=max_rows,
+            chunk_size=chunk_size,
+            sink=writer,
+            rules=rules,
+            compression=compression,
+            max_bytes=max_bytes,
+        )
+    except BaseException:
+        writer.discard()
+        raise
+    if error:
+        writer.discard()
+        return None, error, None
+    return result, None, str(writer.seal())
+
+
+def ingest_many(sources, rules):
+    """
+    Ingest every ``(source, compression)`` pair with ``rules`` and return
+    the ``_ingest_one`` results in the same order.
+    """
+    args = (
+        rules,
+        settings.CHEMVIZ_UPLOAD_MAX_ROWS,
+        settings.CHEMVIZ_CSV_CHUNK_SIZE,
+        settings.CHEMVIZ_UPLOAD_MAX_DECOMPRESSED_BYTES,
+        str(Path(settings.MEDIA_ROOT) / 'tmp'),
+    )
+    if settings.CHEMVIZ_BATCH_WORKERS <= 0 or len(sources) < 2:
+        return [_ingest_one(*source, *args) for source in sources]
+
+    executor = _get_executor()
+    futures = [executor.submit(_ingest_one, *source, *args) for source in sources]
+    return [future.result() for future in futures]
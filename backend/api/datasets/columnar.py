@@ -0,0 +1,307 @@
+"""
+Columnar sidecar for accepted uploads.
+
+The validated rows of an upload are stored next to its CSV in a
+``<csv>.columns/`` directory: one raw little-endian float64 file per numeric
+column, UTF-8 bytes plus int64 offsets per text column, and a
+``manifest.json`` describing them. Readers map the files with
+``numpy.memmap`` instead of parsing the CSV again.
+"""
+
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils.text import slugify
+
+from .analytics import NUMERIC_COLUMNS, REQUIRED_COLUMNS, AnalyticsAccumulator
+from .compression import compression_for
+from .ingest import ingest_csv
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+SIDECAR_SUFFIX = '.columns'
+
+_FLOAT_DTYPE = np.dtype('<f8')
+_OFFSET_DTYPE = np.dtype('<i8')
+
+
+def sidecar_path(csv_path, variant: str = '') -> Path:
+    path = Path(csv_path)
+    return path.with_name(path.name + variant + SIDECAR_SUFFIX)
+
+
+def sidecar_variant(rule_set) -> str:
+    """
+    Sidecar name infix for rows accepted under a stored rule set (the
+    ``validation.rule_set`` label of a summary); empty for the defaults.
+    A CSV shared by several uploads can then carry one sidecar per rule set.
+    """
+    if not rule_set:
+        return ''
+    site = slugify(rule_set.get('site', '')) or 'default'
+    return f'.{site}-v{rule_set.get("version")}'
+
+
+def upload_variant(upload) -> str:
+    validation = (upload.summary or {}).get('validation') or {}
+    return sidecar_variant(validation.get('rule_set'))
+
+
+def _slug(column: str) -> str:
+    return column.lower().replace(' ', '_')
+
+
+class ColumnarWriter:
+    """
+    Appends validated chunks to a staging directory under ``MEDIA_ROOT``.
+    Call ``install`` once the CSV has been stored, or ``discard`` on failure.
+    A writer filled in another process can be ``seal``-ed there and its
+    directory handed to ``install_staged``. One filled across requests is
+    ``detach``-ed after each and reopened on ``directory`` at the returned
+    ``position``, which drops anything written after it.
+    """
+
+    def __init__(self, staging_root=None, directory=None, position=None):
+        if directory is None:
+            staging_root = Path(staging_root or Path(settings.MEDIA_ROOT) / 'tmp')
+            staging_root.mkdir(parents=True, exist_ok=True)
+            directory = tempfile.mkdtemp(dir=staging_root, suffix=SIDECAR_SUFFIX)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        position = position or {'rows': 0, 'text_bytes': {}}
+        self.rows = position['rows']
+        self._handles = {}
+        self._offsets = {}
+        for col in REQUIRED_COLUMNS:
+            slug = _slug(col)
+            if col in NUMERIC_COLUMNS:
+                self._handles[col] = _open_at(
+                    self.directory / f'{slug}.f8', self.rows * _FLOAT_DTYPE.itemsize
+                )
+            else:
+                base = position['text_bytes'].get(col, 0)
+                self._handles[col] = _open_at(self.directory / f'{slug}.utf8', base)
+                # Zero-filled up to the first offset, which is 0.
+                offsets = _open_at(
+                    self.directory / f'{slug}.offsets', (self.rows + 1) * _OFFSET_DTYPE.itemsize
+                )
+                self._offsets[col] = [offsets, base]
+
+    def append(self, frame: pd.DataFrame):
+        for col in REQUIRED_COLUMNS:
+            if col in NUMERIC_COLUMNS:
+                values = frame[col].to_numpy(dtype=_FLOAT_DTYPE)
+                self._handles[col].write(values.tobytes())
+                continue
+            encoded = [str(value).encode('utf-8') for value in frame[col]]
+            self._handles[col].write(b''.join(encoded))
+            offsets, base = self._offsets[col]
+            ends = base + np.cumsum(
+                np.fromiter(map(len, encoded), dtype=_OFFSET_DTYPE, count=len(encoded))
+            )
+            offsets.write(ends.astype(_OFFSET_DTYPE).tobytes())
+            if len(ends):
+                self._offsets[col][1] = int(ends[-1])
+        self.rows += int(len(frame))
+
+    def _close(self):
+        for handle in self._handles.values():
+            handle.close()
+        for offsets, _ in self._offsets.values():
+            offsets.close()
+
+    def detach(self) -> dict:
+        """Close the column files, to be reopened at the returned position."""
+        self._close()
+        return {
+            'rows': self.rows,
+            'text_bytes': {col: base for col, (_, base) in self._offsets.items()},
+        }
+
+    def seal(self) -> Path:
+        """Close the column files and write the manifest."""
+        self._close()
+        columns = []
+        for col in REQUIRED_COLUMNS:
+            slug = _slug(col)
+            if col in NUMERIC_COLUMNS:
+                columns.append({'name': col, 'kind': 'float64', 'data': f'{slug}.f8'})
+            else:
+                columns.append(
+                    {
+                        'name': col,
+                        'kind': 'string',
+                        'data': f'{slug}.utf8',
+                        'offsets': f'{slug}.offsets',
+                    }
+                )
+        manifest = {'version': FORMAT_VERSION, 'rows': self.rows, 'columns': columns}
+        (self.directory / MANIFEST_NAME).write_text(json.dumps(manifest), encoding='utf-8')
+        return self.directory
+
+    def install(self, csv_path, variant: str = '') -> Path:
+        return install_staged(self.seal(), csv_path, variant)
+
+    def discard(self):
+        self._close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _open_at(path: Path, length: int):
+    handle = open(path, 'r+b' if path.exists() else 'w+b')
+    handle.truncate(length)
+    handle.seek(length)
+    return handle
+
+
+def install_staged(directory, csv_path, variant: str = '') -> Path:
+    """Move a sealed staging directory into place as the CSV's sidecar."""
+    target = sidecar_path(csv_path, variant)
+    if target.exists():
+        # Same bytes, same rules: the sidecar already there is identical.
+        shutil.rmtree(directory, ignore_errors=True)
+        return target
+    try:
+        os.replace(directory, target)
+    except OSError:
+        # A concurrent request installed it since the check above.
+        if ColumnarDataset.open_directory(target) is None:
+            raise
+        shutil.rmtree(directory, ignore_errors=True)
+    return target
+
+
+class ColumnarDataset:
+    """Read-only, memory-mapped view of an installed sidecar."""
+
+    def __init__(self, directory: Path, manifest: dict):
+        self.directory = directory
+        self.rows = int(manifest['rows'])
+        self._columns = {spec['name']: spec for spec in manifest['columns']}
+
+    @classmethod
+    def open(cls, csv_path, variant: str = ''):
+        return cls.open_directory(sidecar_path(csv_path, variant))
+
+    @classmethod
+    def open_directory(cls, directory: Path):
+        try:
+            manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != FORMAT_VERSION:
+            return None
+        return cls(directory, manifest)
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def _map(self, filename, dtype, length):
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.directory / filename, dtype=dtype, mode='r', shape=(length,))
+
+    def column(self, name, start=0, stop=None):
+        spec = self._columns[name]
+        start, stop, _ = slice(start, stop).indices(self.rows)
+        stop = max(start, stop)
+        if spec['kind'] == 'float64':
+            return self._map(spec['data'], _FLOAT_DTYPE, self.rows)[start:stop]
+
+        offsets = self._map(spec['offsets'], _OFFSET_DTYPE, self.rows + 1)[start:stop + 1]
+        if stop == start:
+            return np.empty(0, dtype=object)
+        data = self._map(spec['data'], np.uint8, int(offsets[-1]))
+        blob = data[int(offsets[0]):int(offsets[-1])].tobytes()
+        base = int(offsets[0])
+        return np.array(
+            [
+                blob[begin - base:end - base].decode('utf-8')
+                for begin, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+            ],
+            dtype=object,
+        )
+
+    def frame(self, columns=None, start=0, stop=None) -> pd.DataFrame:
+        columns = columns or self.columns
+        return pd.DataFrame(
+            {name: self.column(name, start, stop) for name in columns},
+            columns=columns,
+        )
+
+    def analytics(self, chunk_size: int) -> AnalyticsAccumulator:
+        """Analytics of every row, read ``chunk_size`` rows at a time."""
+        accumulator = AnalyticsAccumulator()
+        for start in range(0, self.rows, chunk_size):
+            frame = self.frame(REQUIRED_COLUMNS, start, start + chunk_size)
+            accumulator = accumulator.merge(AnalyticsAccumulator.from_dataframe(frame))
+        return accumulator
+
+
+def remove_sidecars(csv_path):
+    """Remove every sidecar of a stored CSV, whatever rule set built it."""
+    path = Path(csv_path)
+    shutil.rmtree(sidecar_path(path), ignore_errors=True)
+    for directory in path.parent.glob(f'{glob.escape(path.name)}.*{SIDECAR_SUFFIX}'):
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def open_valid_dataset(upload):
+    """
+    Return ``(ColumnarDataset, None)`` for the accepted rows of an upload,
+    or ``(None, message)``. Uploads stored before sidecars existed are
+    re-ingested once and get one.
+    """
+    return open_stored_dataset(upload.file.path, upload_variant(upload))
+
+
+def open_stored_dataset(csv_path, variant: str = ''):
+    """``open_valid_dataset`` for the stored CSV at ``csv_path``."""
+    dataset = ColumnarDataset.open(csv_path, variant)
+    if dataset is not None:
+        return dataset, None
+    if variant:
+        # Sidecars for stored rule sets are always written at upload time,
+        # and the rules may have changed since, so do not guess.
+        return None, 'Accepted rows for this upload are no longer available.'
+
+    writer = ColumnarWriter()
+    _, error = ingest_csv(
+        csv_path,
+        max_rows=sys.maxsize,
+        chunk_size=settings.CHEMVIZ_CSV_CHUNK_SIZE,
+        sink=writer,
+        compression=compression_for(Path(csv_path).name),
+        max_bytes=sys.maxsize,
+    )
+    if error:
+        writer.discard()
+        return None, error['error']
+    writer.install(csv_path)
+    return ColumnarDataset.open(csv_path), None
+
+
+def read_rows(upload, columns, start, stop):
+    """
+    ``(total_rows, records, None)`` for ``columns`` of the accepted rows
+    ``start:stop`` of an upload, or ``(None, None, message)``.
+    """
+    return read_stored_rows(upload.file.path, upload_variant(upload), columns, start, stop)
+
+
+def read_stored_rows(csv_path, variant, columns, start, stop):
+    """``read_rows`` by path, for worker processes."""
+    dataset, error = open_stored_dataset(csv_path, variant)
+    if error:
+        return None, None, error
+    frame = dataset.frame(columns, start=start, stop=stop)
+    return dataset.rows, frame.to_dict(orient='records'), None
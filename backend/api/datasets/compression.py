@@ -0,0 +1,157 @@
+"""
+Compressed CSV uploads.
+
+Uploads may be sent as ``.csv.gz``, ``.csv.zst`` or a ``.zip`` holding one
+CSV, and are stored in that form. ``open_csv`` wraps a stored or uploaded
+file in a reader that decompresses as the CSV parser pulls bytes, and stops
+the read once more than the allowed number of decompressed bytes came out,
+so a small archive cannot inflate into an unbounded parse.
+"""
+
+import gzip
+import io
+import zipfile
+from pathlib import PurePosixPath
+
+try:
+    import zstandard
+except ImportError:  # optional: .csv.zst uploads are refused without it
+    zstandard = None
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+ZIP = 'zip'
+
+# Longest suffix first, so ``.csv.gz`` is not mistaken for anything shorter.
+SUFFIXES = {
+    '.csv.gz': GZIP,
+    '.csv.zst': ZSTD,
+    '.zip': ZIP,
+    '.csv': '',
+}
+
+COMPRESSED_MIME = {
+    'application/gzip',
+    'application/x-gzip',
+    'application/zstd',
+    'application/zip',
+    'application/x-zip-compressed',
+    'application/octet-stream',
+}
+
+
+class CompressedFileError(ValueError):
+    """The archive is unreadable, unsupported or inflates past the limit."""
+
+
+def upload_suffix(name: str):
+    """The supported suffix ``name`` ends with, or ``None``."""
+    lowered = name.lower()
+    for suffix in SUFFIXES:
+        if lowered.endswith(suffix):
+            return suffix
+    return None
+
+
+def compression_for(name: str):
+    """``''`` for a plain CSV, the codec for a compressed one, else ``None``."""
+    suffix = upload_suffix(name)
+    return None if suffix is None else SUFFIXES[suffix]
+
+
+def unsupported_reason(compression: str):
+    if compression == ZSTD and zstandard is None:
+        return '.csv.zst uploads are not supported on this server.'
+    return None
+
+
+class _LimitedReader(io.RawIOBase):
+    def __init__(self, stream, max_bytes: int, owned=()):
+        self._stream = stream
+        self._remaining = max_bytes
+        self._max_bytes = max_bytes
+        self._owned = (stream, *owned)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        self._remaining -= len(data)
+        if self._remaining < 0:
+            raise CompressedFileError(
+                f'Decompressed CSV exceeds maximum size '
+                f'({self._max_bytes / (1024 * 1024):g} MB).'
+            )
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            for handle in self._owned:
+                handle.close()
+        super().close()
+
+
+def open_csv(source, compression: str, max_bytes: int):
+    """
+    Return a binary reader over the CSV inside ``source`` (a path or a
+    binary file object). Raises ``CompressedFileError`` if the archive
+    cannot be opened; reading past ``max_bytes`` raises it too.
+    """
+    reason = unsupported_reason(compression)
+    if reason:
+        raise CompressedFileError(reason)
+
+    owned = []
+    if isinstance(source, str) or hasattr(source, '__fspath__'):
+        source = open(source, 'rb')
+        owned.append(source)
+
+    try:
+        try:
+            if compression == GZIP:
+                stream = gzip.GzipFile(fileobj=source, mode='rb')
+            elif compression == ZSTD:
+                stream = zstandard.ZstdDecompressor().stream_reader(source, closefd=False)
+            else:
+                stream = _single_member(zipfile.ZipFile(source))
+        except (OSError, zipfile.BadZipFile) as exc:
+            raise CompressedFileError(f'Could not open {compression} archive: {exc}') from exc
+    except CompressedFileError:
+        for handle in owned:
+            handle.close()
+        raise
+
+    return io.BufferedReader(_LimitedReader(stream, max_bytes, owned))
+
+
+def archive_members(archive):
+    """The file entries of a zip, without directories and macOS metadata."""
+    for info in archive.infolist():
+        name = PurePosixPath(info.filename)
+        if info.is_dir() or name.parts[0] == '__MACOSX' or name.name.startswith('.'):
+            continue
+        yield info
+
+
+def _single_member(archive):
+    members = list(archive_members(archive))
+    if len(members) != 1 or not members[0].filename.lower().endswith('.csv'):
+        archive.close()
+        raise CompressedFileError('Zip uploads must contain exactly one .csv file.')
+    return _ZipMember(archive, archive.open(members[0]))
+
+
+class _ZipMember:
+    # Closes the archive with the member so a path-opened zip is released.
+    def __init__(self, archive, member):
+        self._archive = archive
+        self._member = member
+
+    def read(self, size=-1):
+        return self._member.read(size)
+
+    def close(self):
+        self._member.close()
+        self._archive.close()
@@ -0,0 +1,34 @@
+"""
+Validators for conditional GETs on dataset endpoints.
+
+Uploads never change once stored, so a strong ETag built from upload ids,
+upload timestamps and whatever else shapes a response is enough to answer
+``If-None-Match`` without rebuilding the body. Summaries of older uploads
+can be backfilled later; responses that show them include the upload's
+``summary_version``.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=16).hexdigest()
+    return quote_etag(digest)
+
+
+def not_modified(request, etag, last_modified=None):
+    """Return a 304 response if the client's validators still match, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Let clients keep a copy but make them revalidate before using it.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,243 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .analytics import NUMERIC_COLUMNS, REQUIRED_COLUMNS, AnalyticsAccumulator
+from .compression import CompressedFileError, open_csv
+from .validation import INVALID, MISSING, RANGE, compile_rules
+
+MAX_ROW_ERRORS = 50
+
+# Where each rule kind is counted in the validation summary.
+_SUMMARY_KEYS = {
+    MISSING: 'missing_values',
+    INVALID: 'invalid_values',
+    RANGE: 'out_of_range',
+}
+
+
+@dataclass
+class IngestResult:
+    analytics: dict
+    validation_summary: dict
+    row_count: int
+
+
+class IngestState:
+    """
+    Running totals for a chunked CSV ingest. Only counters and capped
+    row-error lists are kept, so memory does not grow with the row count.
+    """
+
+    def __init__(self, sink=None, rules=None, analytics=True):
+        self.sink = sink
+        self.rules = rules or compile_rules()
+        self.columns = None
+        self.missing_columns = []
+        self.total_rows = 0
+        self.accepted_rows = 0
+        self.counters = {
+            'missing_values': {col: 0 for col in REQUIRED_COLUMNS},
+            'invalid_values': {col: 0 for col in NUMERIC_COLUMNS},
+            'out_of_range': {col: 0 for col in NUMERIC_COLUMNS},
+        }
+        self.rule_errors = [[] for _ in self.rules.rules]
+        # None when the caller computes the analytics from the sink's rows.
+        self.analytics = AnalyticsAccumulator() if analytics else None
+
+    def snapshot(self) -> dict:
+        """The counters and row errors so far, in a JSON-friendly form."""
+        return {
+            'columns': self.columns,
+            'total_rows': self.total_rows,
+            'accepted_rows': self.accepted_rows,
+            'counters': self.counters,
+            'rule_errors': self.rule_errors,
+        }
+
+    @classmethod
+    def restore(cls, data, sink=None, rules=None) -> 'IngestState':
+        """A state, without analytics, carrying on from ``snapshot()``."""
+        state = cls(sink=sink, rules=rules, analytics=False)
+        if data:
+            state.columns = data['columns']
+            if state.columns is not None:
+                state.missing_columns = [
+                    col for col in REQUIRED_COLUMNS if col not in state.columns
+                ]
+            state.total_rows = data['total_rows']
+            state.accepted_rows = data['accepted_rows']
+            state.counters = data['counters']
+            state.rule_errors = [[tuple(error) for error in errors] for errors in data['rule_errors']]
+        return state
+
+    def feed(self, chunk: pd.DataFrame, max_rows: int):
+        """
+        Count, check and consume one parsed chunk. Returns the error body
+        once the row count passes ``max_rows``, else None.
+        """
+        if self.columns is None:
+            self.columns = [str(col).strip() for col in chunk.columns]
+            self.missing_columns = [
+                col for col in REQUIRED_COLUMNS if col not in self.columns
+            ]
+
+        chunk = chunk.dropna(how='all')
+        self.total_rows += int(len(chunk))
+        if self.total_rows > max_rows:
+            return {'error': f'CSV exceeds maximum row limit ({max_rows}).'}
+
+        # Keep counting rows so the empty/row-limit checks still take
+        # precedence over a missing column, as they always have.
+        if self.missing_columns or chunk.empty:
+            return None
+
+        chunk.columns = self.columns
+        self.consume(chunk)
+        return None
+
+    def missing_columns_error(self) -> dict:
+        return {
+            'error': f'Missing column: {self.missing_columns[0]}',
+            'missing_columns': self.missing_columns,
+            'received_columns': self.columns,
+        }
+
+    def finish(self, analytics=None):
+        """
+        ``(IngestResult, None)`` for everything fed so far, or ``(None,
+        payload)``. ``analytics`` stands in for a state built without them.
+        """
+        if not self.total_rows:
+            return None, {'error': 'CSV file is empty.'}
+
+        if self.missing_columns:
+            return None, self.missing_columns_error()
+
+        validation_summary = self.validation_summary()
+        if not self.accepted_rows:
+            return None, {
+                'error': 'All rows are invalid. Please fix the CSV and retry.',
+                'validation_summary': validation_summary,
+            }
+
+        return IngestResult(
+            analytics=(analytics or self.analytics).finalize(),
+            validation_summary=validation_summary,
+            row_count=self.total_rows,
+        ), None
+
+    def consume(self, chunk: pd.DataFrame):
+        df = chunk[REQUIRED_COLUMNS]
+        result = self.rules.evaluate(
+            df, [MAX_ROW_ERRORS - len(errors) for errors in self.rule_errors]
+        )
+
+        labels = df.index.to_numpy()
+        types = None
+        for rule, count, positions, errors in zip(
+            self.rules.rules, result.counts.tolist(), result.first_rows, self.rule_errors
+        ):
+            counter = self.counters[_SUMMARY_KEYS[rule.kind]]
+            counter[rule.column] = counter.get(rule.column, 0) + count
+            if not len(positions):
+                continue
+            if rule.by_type:
+                if types is None:
+                    types = df['Type'].to_numpy()
+                messages = [rule.message_for(label) for label in types[positions]]
+            else:
+                messages = [rule.message] * len(positions)
+            errors.extend(
+                (int(label) + 2, message)
+                for label, message in zip(labels[positions], messages)
+            )
+
+        valid_mask = result.valid
+        accepted = int(valid_mask.sum())
+        if not accepted:
+            return
+        self.accepted_rows += accepted
+
+        valid = df.loc[valid_mask, ['Equipment Name', 'Type']]
+        for col in NUMERIC_COLUMNS:
+            valid[col] = result.numeric[col][valid_mask]
+        if self.analytics is not None:
+            self.analytics = self.analytics.merge(AnalyticsAccumulator.from_dataframe(valid))
+        if self.sink is not None:
+            self.sink.append(valid)
+
+    def validation_summary(self) -> dict:
+        row_errors = []
+        for rule, errors in zip(self.rules.rules, self.rule_errors):
+            for row, message in errors:
+                if len(row_errors) >= MAX_ROW_ERRORS:
+                    break
+                row_errors.append({'row': row, 'column': rule.column, 'message': message})
+
+        summary = {
+            'total_rows': self.total_rows,
+            'accepted_rows': self.accepted_rows,
+            'rejected_rows': int(self.total_rows - self.accepted_rows),
+            **self.counters,
+            'row_errors': row_errors,
+        }
+        if self.rules.label is not None:
+            summary['rule_set'] = self.rules.label
+        return summary
+
+
+def ingest_csv(
+    source,
+    max_rows: int,
+    chunk_size: int,
+    sink=None,
+    rules=None,
+    compression: str = '',
+    max_bytes=None,
+):
+    """
+    Read, validate and summarise a CSV in chunks of ``chunk_size`` rows,
+    checking rows against ``rules`` (``CompiledRules``, default rule set if
+    omitted). Accepted rows of each chunk are passed to ``sink.append``.
+    A compressed ``source`` is inflated as it is parsed, up to
+    ``max_bytes`` of CSV.
+
+    Returns ``(IngestResult, None)`` on success or ``(None, payload)`` with
+    the error body for a 400 response.
+    """
+    if not compression:
+        return _ingest(source, max_rows, chunk_size, sink, rules)
+    try:
+        stream = open_csv(source, compression, max_bytes)
+    except CompressedFileError as exc:
+        return None, {'error': str(exc)}
+    with stream:
+        return _ingest(stream, max_rows, chunk_size, sink, rules)
+
+
+def _ingest(source, max_rows, chunk_size, sink, rules):
+    try:
+        reader = pd.read_csv(source, chunksize=chunk_size, dtype=str)
+    except CompressedFileError as exc:
+        return None, {'error': str(exc)}
+    except Exception as exc:
+        return None, {'error': 'Failed to read CSV file.', 'details': str(exc)}
+
+    state = IngestState(sink=sink, rules=rules)
+    with reader:
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                break
+            except CompressedFileError as exc:
+                return None, {'error': str(exc)}
+            except Exception as exc:
+                return None, {'error': 'Failed to read CSV file.', 'details': str(exc)}
+
+            error = state.feed(chunk, max_rows)
+            if error:
+                return None, error
+
+    return state.finish()
@@ -0,0 +1,127 @@
+"""
+Background report rendering on an in-process worker pool.
+
+Jobs are tracked in the database (``ReportJob``) so any worker process can
+answer a status poll, and finished PDFs go through the report cache, so no
+external broker or result store is needed.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ReportJob
+from .report_cache import get_cached_report, store_report
+from .reports import REPORT_TEMPLATE_VERSION, render_report_pdf
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Jobs a previous process was running will never finish.
+            fail_stale_jobs()
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CHEMVIZ_REPORT_WORKERS,
+                thread_name_prefix='chemviz-report',
+            )
+        return _executor
+
+
+def _stale_cutoff():
+    return timezone.now() - timedelta(seconds=settings.CHEMVIZ_REPORT_JOB_TIMEOUT_SECONDS)
+
+
+def _stale_jobs():
+    cutoff = _stale_cutoff()
+    return ReportJob.objects.filter(
+        Q(started_at__lt=cutoff) | Q(started_at__isnull=True, created_at__lt=cutoff),
+        status=ReportJob.STATUS_RUNNING,
+    )
+
+
+def _fail(jobs) -> int:
+    return jobs.update(
+        status=ReportJob.STATUS_FAILED,
+        error='Report job was interrupted; please request the report again.',
+        finished_at=timezone.now(),
+    )
+
+
+def fail_stale_jobs() -> int:
+    """
+    Mark every job still running ``CHEMVIZ_REPORT_JOB_TIMEOUT_SECONDS``
+    after it started as failed, so clients polling one stop waiting for a
+    worker that is gone. Pending jobs are left alone: they may be queued
+    behind others on a live process's pool.
+    """
+    return _fail(_stale_jobs())
+
+
+def fail_if_stale(job: ReportJob) -> ReportJob:
+    """``fail_stale_jobs`` for one job about to be reported to a client."""
+    # Jobs started before started_at was recorded go by created_at.
+    started_at = job.started_at or job.created_at
+    if job.status == ReportJob.STATUS_RUNNING and started_at < _stale_cutoff():
+        if _fail(_stale_jobs().filter(id=job.id)):
+            job.refresh_from_db()
+    return job
+
+
+def submit_report_job(user, upload) -> ReportJob:
+    """
+    Create a job for ``upload`` and queue it once the row is committed.
+    Reports that are already cached complete immediately.
+    """
+    job = ReportJob(user=user, upload=upload, template_version=REPORT_TEMPLATE_VERSION)
+    if get_cached_report(upload.id, REPORT_TEMPLATE_VERSION) is not None:
+        job.status = ReportJob.STATUS_SUCCEEDED
+        job.finished_at = timezone.now()
+        job.save()
+        return job
+
+    job.save()
+    if settings.CHEMVIZ_REPORT_WORKERS <= 0:
+        run_report_job(job.id)
+        job.refresh_from_db()
+    else:
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_worker, job.id))
+    return job
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_report_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_report_job(job_id):
+    updated = (
+        ReportJob.objects
+        .filter(id=job_id, status=ReportJob.STATUS_PENDING)
+        .update(status=ReportJob.STATUS_RUNNING, started_at=timezone.now())
+    )
+    if not updated:
+        return
+
+    job = ReportJob.objects.select_related('upload').get(id=job_id)
+    try:
+        if get_cached_report(job.upload_id, job.template_version) is None:
+            store_report(job.upload_id, job.template_version, render_report_pdf(job.upload))
+    except Exception as exc:
+        job.status = ReportJob.STATUS_FAILED
+        job.error = str(exc)
+    else:
+        job.status = ReportJob.STATUS_SUCCEEDED
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
@@ -0,0 +1,240 @@
+"""
+Query parameters and result shaping for the upload listing and the latest
+rows, shared by the sync views and their async variants. Nothing here runs
+a query, so each kind of view can evaluate the querysets its own way.
+"""
+
+from dataclasses import dataclass
+
+from .analytics import REQUIRED_COLUMNS
+from .conditional import make_etag
+from .models import DatasetUpload
+from .pagination import after_cursor, encode_cursor
+
+SUMMARY_FIELDS = (
+    'id',
+    'name',
+    'uploaded_at',
+    'summary',
+    'uploaded_by',
+    'row_count',
+    'file_size_bytes',
+    'accepted_rows',
+    'rejected_rows',
+    'total_equipment',
+    'avg_flowrate',
+    'avg_pressure',
+    'avg_temperature',
+)
+# Read from the model's own columns, not from the summary JSON.
+COLUMN_FIELDS = (
+    'row_count',
+    'file_size_bytes',
+    'accepted_rows',
+    'rejected_rows',
+    'total_equipment',
+    'avg_flowrate',
+    'avg_pressure',
+    'avg_temperature',
+)
+SHAPES = ('full', 'compact')
+
+# Summary keys kept for the server's own use and left out of responses.
+PRIVATE_SUMMARY_KEYS = ('sketches', 'components')
+
+# Left out of summaries in the compact list shape; the row counts stay.
+DETAIL_SUMMARY_KEYS = ('validation', 'type_stats')
+
+
+def public_summary(summary):
+    return {key: value for key, value in summary.items() if key not in PRIVATE_SUMMARY_KEYS}
+
+
+def _optional_int(value):
+    return None if value in (None, '') else int(value)
+
+
+@dataclass(frozen=True)
+class SummaryListing:
+    limit: int
+    fields: tuple
+    shape: str
+    cursor: str | None
+    min_rows: int | None
+    max_rows: int | None
+    rejected: str | None
+
+    default_limit = 5
+    max_limit = 100
+
+    @classmethod
+    def parse(cls, query_params):
+        """``(SummaryListing, None)``, or ``(None, error body)`` for a 400."""
+        try:
+            limit = int(query_params.get('limit', cls.default_limit))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            return None, {'error': 'limit must be a positive integer.'}
+
+        fields = SUMMARY_FIELDS
+        requested = query_params.get('fields')
+        if requested:
+            fields = tuple(field.strip() for field in requested.split(',') if field.strip())
+            unknown = [field for field in fields if field not in SUMMARY_FIELDS]
+            if unknown:
+                return None, {
+                    'error': f'Unknown field: {unknown[0]}',
+                    'allowed_fields': list(SUMMARY_FIELDS),
+                }
+        shape = query_params.get('shape', 'full')
+        if shape not in SHAPES:
+            return None, {'error': 'shape must be "full" or "compact".'}
+
+        try:
+            min_rows = _optional_int(query_params.get('min_rows'))
+            max_rows = _optional_int(query_params.get('max_rows'))
+        except ValueError:
+            return None, {'error': 'min_rows and max_rows must be integers.'}
+        rejected = query_params.get('rejected')
+        if rejected not in (None, 'true', 'false'):
+            return None, {'error': 'rejected must be "true" or "false".'}
+
+        return cls(
+            limit=min(limit, cls.max_limit),
+            fields=fields,
+            shape=shape,
+            cursor=query_params.get('cursor') or None,
+            min_rows=min_rows,
+            max_rows=max_rows,
+            rejected=rejected,
+        ), None
+
+    def queryset(self, user):
+        """
+        The page, plus one more upload that tells whether there is a next
+        page. Raises ``ValueError`` for a malformed cursor.
+        """
+        uploads = (
+            DatasetUpload.objects
+            .filter(user=user)  # 🔒 USER FILTER
+            .only(
+                'id',
+                'name',
+                'uploaded_at',
+                'summary_version',
+                *[field for field in COLUMN_FIELDS if field in self.fields],
+                *(['summary'] if 'summary' in self.fields else []),
+            )
+            .order_by('-uploaded_at', '-id')
+        )
+        if self.cursor:
+            uploads = after_cursor(uploads, self.cursor)
+        if self.min_rows is not None:
+            uploads = uploads.filter(row_count__gte=self.min_rows)
+        if self.max_rows is not None:
+            uploads = uploads.filter(row_count__lte=self.max_rows)
+        if self.rejected == 'true':
+            uploads = uploads.filter(rejected_rows__gt=0)
+        elif self.rejected == 'false':
+            uploads = uploads.filter(rejected_rows=0)
+        return uploads[:self.limit + 1]
+
+    def page(self, uploads, user, uploaded_by):
+        """``(uploads on this page, next_cursor, etag)`` from the queryset's rows."""
+        next_cursor = encode_cursor(uploads[self.limit - 1]) if len(uploads) > self.limit else None
+        uploads = uploads[:self.limit]
+        etag = make_etag(
+            'summaries',
+            user.id,
+            uploaded_by,
+            [
+                (upload.id, upload.uploaded_at.isoformat(), upload.summary_version)
+                for upload in uploads
+            ],
+            next_cursor,
+            list(self.fields),
+            self.shape,
+        )
+        return uploads, next_cursor, etag
+
+    def results(self, uploads, uploaded_by):
+        data = []
+        for upload in uploads:
+            result = {
+                'id': upload.id,
+                'name': upload.name,
+                'uploaded_at': upload.uploaded_at,
+                'uploaded_by': uploaded_by,
+            }
+            if 'summary' in self.fields:
+                public = public_summary(upload.summary or {})
+                if self.shape == 'compact':
+                    public = {
+                        key: value for key, value in public.items()
+                        if key not in DETAIL_SUMMARY_KEYS
+                    }
+                result['summary'] = public
+            for field in COLUMN_FIELDS:
+                if field in self.fields:
+                    result[field] = getattr(upload, field)
+            data.append({field: result[field] for field in self.fields})
+        return data
+
+
+@dataclass(frozen=True)
+class RowsPage:
+    columns: list
+    offset: int
+    limit: int
+
+    default_limit = 200
+    max_limit = 5000
+
+    @classmethod
+    def parse(cls, query_params):
+        """``(RowsPage, None)``, or ``(None, error body)`` for a 400."""
+        try:
+            limit = int(query_params.get('limit', cls.default_limit))
+            offset = int(query_params.get('offset', 0))
+        except ValueError:
+            return None, {'error': 'limit and offset must be integers.'}
+        if limit < 0 or offset < 0:
+            return None, {'error': 'limit and offset must be non-negative.'}
+
+        columns = REQUIRED_COLUMNS
+        requested = query_params.get('columns')
+        if requested:
+            columns = [col.strip() for col in requested.split(',') if col.strip()]
+            unknown = [col for col in columns if col not in REQUIRED_COLUMNS]
+            if unknown:
+                return None, {
+                    'error': f'Unknown column: {unknown[0]}',
+                    'allowed_columns': REQUIRED_COLUMNS,
+                }
+        return cls(columns=columns, offset=offset, limit=min(limit, cls.max_limit)), None
+
+    @staticmethod
+    def queryset(user):
+        return (
+            DatasetUpload.objects
+            .filter(user=user, is_valid=True)  # 🔒 USER FILTER
+            .only('id', 'name', 'uploaded_at', 'file', 'summary')
+            .order_by('-uploaded_at', '-id')
+        )
+
+    def etag(self, upload):
+        return make_etag(
+            'latest', upload.id, upload.uploaded_at.isoformat(), self.columns, self.offset, self.limit
+        )
+
+    def body(self, upload, total_rows, rows):
+        return {
+            'id': upload.id,
+            'name': upload.name,
+            'uploaded_at': upload.uploaded_at,
+            'total_rows': total_rows,
+            'offset': self.offset,
+            'limit': self.limit,
+            'rows': rows,
+        }
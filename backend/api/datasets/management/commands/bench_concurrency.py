@@ -0,0 +1,150 @@
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.datasets.management.commands.bench_validation import _synthetic_csv
+from api.datasets.models import DatasetUpload
+
+
+class Command(BaseCommand):
+    help = (
+        'POST CSVs to /api/datasets/upload/ from parallel clients against the '
+        'configured database profile and report throughput, latency and errors. '
+        'With --url they go over HTTP to a server running on the same database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--url',
+            help='base URL of a running server, e.g. http://127.0.0.1:8000 '
+            '(default: the in-process test client)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self._describe_database())
+        # Distinct files, so none is recognised as a re-upload.
+        payloads = [
+            _synthetic_csv(options['rows'], 0.05, options['seed'] + idx)
+            for idx in range(options['requests'])
+        ]
+        user = get_user_model().objects.create_user(
+            username=f'bench-{uuid.uuid4().hex[:12]}@example.com', password=None
+        )
+        if options['url']:
+            send = self._http_sender(options['url'].rstrip('/'), user, payloads)
+            try:
+                outcomes, elapsed = self._hammer(send, len(payloads), options['concurrency'])
+            finally:
+                # The server stored the files; remove whatever retention left.
+                with override_settings(CHEMVIZ_RETENTION_WORKERS=0):
+                    for upload in DatasetUpload.objects.filter(user=user):
+                        upload.delete()
+                user.delete()
+        else:
+            media_root = tempfile.mkdtemp()
+            try:
+                with override_settings(
+                    MEDIA_ROOT=media_root, CHEMVIZ_REPORT_CACHE_DIR=f'{media_root}/reports'
+                ):
+                    send = self._client_sender(user, payloads)
+                    outcomes, elapsed = self._hammer(send, len(payloads), options['concurrency'])
+            finally:
+                user.delete()
+                shutil.rmtree(media_root, ignore_errors=True)
+
+        latencies = sorted(latency for _, latency in outcomes)
+        statuses = Counter(status for status, _ in outcomes)
+        self.stdout.write(
+            f'{len(outcomes)} uploads of {options["rows"]:,} rows, '
+            f'{options["concurrency"]} clients: {len(outcomes) / elapsed:.1f} uploads/s'
+        )
+        self.stdout.write(
+            f'latency p50 {statistics.median(latencies) * 1000:.0f} ms   '
+            f'p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.0f} ms   '
+            f'max {latencies[-1] * 1000:.0f} ms'
+        )
+        self.stdout.write(
+            'status ' + ', '.join(
+                f'{status}: {count}'
+                for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))
+            )
+        )
+
+    def _describe_database(self) -> str:
+        config = settings.DATABASES['default']
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                pragmas = {
+                    name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                    for name in ('journal_mode', 'synchronous', 'busy_timeout')
+                }
+            return 'sqlite ' + ' '.join(f'{name}={value}' for name, value in pragmas.items())
+        return (
+            f'{connection.vendor} CONN_MAX_AGE={config.get("CONN_MAX_AGE")} '
+            f'CONN_HEALTH_CHECKS={config.get("CONN_HEALTH_CHECKS")}'
+        )
+
+    def _client_sender(self, user, payloads):
+        local = threading.local()
+
+        def _upload(idx):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = APIClient(HTTP_HOST='localhost')
+                client.force_authenticate(user)
+            start = time.perf_counter()
+            response = client.post(
+                '/api/datasets/upload/',
+                {'file': SimpleUploadedFile(f'bench-{idx}.csv', payloads[idx], 'text/csv')},
+                format='multipart',
+            )
+            return response.status_code, time.perf_counter() - start
+
+        return _upload
+
+    def _http_sender(self, url, user, payloads):
+        token = Token.objects.create(user=user).key
+        local = threading.local()
+
+        def _upload(idx):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+                session.headers['Authorization'] = f'Token {token}'
+            start = time.perf_counter()
+            try:
+                response = session.post(
+                    f'{url}/api/datasets/upload/',
+                    files={'file': (f'bench-{idx}.csv', payloads[idx], 'text/csv')},
+                    timeout=120,
+                )
+            except requests.RequestException as exc:
+                return type(exc).__name__, time.perf_counter() - start
+            return response.status_code, time.perf_counter() - start
+
+        return _upload
+
+    def _hammer(self, send, count, concurrency):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(send, range(count)))
+        return outcomes, time.perf_counter() - start
@@ -0,0 +1,145 @@
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.datasets.models import DatasetUpload, summary_columns
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _synthetic_summary(rng, row_errors: int) -> dict:
+    rows = int(rng.integers(10, 10_000))
+    rejected = int(rng.integers(0, rows // 10 + 1))
+    return {
+        'total_equipment': rows - rejected,
+        'avg_flowrate': float(rng.uniform(0, 400)),
+        'avg_pressure': float(rng.uniform(0, 20)),
+        'avg_temperature': float(rng.uniform(-40, 480)),
+        'type_distribution': {'Pump': rows // 2, 'Valve': rows - rows // 2},
+        'row_count': rows,
+        'file_size_bytes': rows * 40,
+        'validation': {
+            'total_rows': rows,
+            'accepted_rows': rows - rejected,
+            'rejected_rows': rejected,
+            'row_errors': [
+                {'row': idx + 2, 'column': 'Flowrate', 'message': 'Value must be in range'}
+                for idx in range(min(rejected, row_errors))
+            ],
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Time upload listing, filtering and sorting on summary JSON against the '
+        'summary columns, over synthetic uploads inserted in a rolled-back transaction.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=100_000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--row-errors', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _run(self, options):
+        rng = np.random.default_rng(options['seed'])
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f'bench-{idx}@example.com')
+            for idx in range(options['users'])
+        )
+        start = time.perf_counter()
+        uploads = []
+        for idx in range(options['uploads']):
+            summary = _synthetic_summary(rng, options['row_errors'])
+            uploads.append(DatasetUpload(
+                user=users[idx % len(users)],
+                name=f'bench-{idx}.csv',
+                file=f'datasets/bench-{idx}.csv',
+                summary=summary,
+                **summary_columns(summary),
+            ))
+        DatasetUpload.objects.bulk_create(uploads, batch_size=2000)
+        user = users[0]
+        self.stdout.write(
+            f'{options["uploads"]:,} uploads over {len(users)} users '
+            f'inserted in {time.perf_counter() - start:.1f} s'
+        )
+
+        mine = DatasetUpload.objects.filter(user=user).order_by('-uploaded_at', '-id')
+        self.stdout.write(f'plan: {mine[:50].explain()}')
+        repeat = options['repeat']
+
+        def _json_page():
+            return [
+                (
+                    upload.id,
+                    upload.summary.get('row_count'),
+                    upload.summary['validation'].get('rejected_rows'),
+                )
+                for upload in mine.only('id', 'name', 'uploaded_at', 'summary')[:50]
+            ]
+
+        def _column_page():
+            return list(mine.values_list('id', 'row_count', 'rejected_rows')[:50])
+
+        def _json_filter():
+            return [
+                upload.id
+                for upload in mine.only('id', 'summary')
+                if upload.summary.get('row_count', 0) >= 5000
+                and upload.summary['validation'].get('rejected_rows')
+            ]
+
+        def _column_filter():
+            return list(
+                mine.filter(row_count__gte=5000, rejected_rows__gt=0).values_list('id', flat=True)
+            )
+
+        def _json_sort():
+            ranked = sorted(
+                mine.only('id', 'summary'),
+                key=lambda upload: upload.summary.get('avg_temperature') or 0,
+                reverse=True,
+            )
+            return [upload.id for upload in ranked[:50]]
+
+        def _column_sort():
+            return list(
+                DatasetUpload.objects.filter(user=user)
+                .order_by('-avg_temperature', '-id')
+                .values_list('id', flat=True)[:50]
+            )
+
+        assert sorted(_json_filter()) == sorted(_column_filter())
+        for label, fn in (
+            ('page, json', _json_page),
+            ('page, columns', _column_page),
+            ('filter, json', _json_filter),
+            ('filter, columns', _column_filter),
+            ('sort, json', _json_sort),
+            ('sort, columns', _column_sort),
+        ):
+            self._report(label, repeat, fn)
+
+    def _report(self, label, repeat, fn):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        self.stdout.write(f'{label:<16} {best * 1000:9.2f} ms')
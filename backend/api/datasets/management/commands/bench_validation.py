@@ -0,0 +1,107 @@
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from api.datasets.analytics import NUMERIC_COLUMNS, REQUIRED_COLUMNS
+from api.datasets.ingest import MAX_ROW_ERRORS, ingest_csv
+from api.datasets.validation import compile_rules
+
+
+def _synthetic_csv(rows: int, bad_fraction: float, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(
+        {
+            'Equipment Name': np.char.add('Unit-', np.arange(rows).astype(str)),
+            'Type': rng.choice(['Pump', 'Valve', 'Reactor', 'Compressor'], rows),
+            'Flowrate': np.round(rng.uniform(0, 400, rows), 2).astype(str),
+            'Pressure': np.round(rng.uniform(0, 20, rows), 2).astype(str),
+            'Temperature': np.round(rng.uniform(-40, 480, rows), 2).astype(str),
+        }
+    )
+    # Spread blanks, garbage and out-of-range values over the bad rows.
+    bad = np.flatnonzero(rng.random(rows) < bad_fraction)
+    for kind, positions in enumerate(np.array_split(rng.permutation(bad), 3)):
+        column = rng.choice(NUMERIC_COLUMNS, len(positions))
+        for col in NUMERIC_COLUMNS:
+            target = positions[column == col]
+            frame.loc[target, col] = ['', 'bad', '-999'][kind]
+    return frame.to_csv(index=False).encode('utf-8')
+
+
+def _legacy_validate(df: pd.DataFrame):
+    """The per-column mask loop the upload view used before the rule engine."""
+    row_errors = []
+
+    def _add_row_errors(mask, column, message):
+        if len(row_errors) >= MAX_ROW_ERRORS:
+            return
+        for idx in df.index[mask].tolist():
+            if len(row_errors) >= MAX_ROW_ERRORS:
+                break
+            row_errors.append({'row': int(idx) + 2, 'column': column, 'message': message})
+
+    valid_mask = pd.Series(True, index=df.index)
+    for col in REQUIRED_COLUMNS:
+        missing_mask = df[col].isna() | df[col].astype(str).str.strip().eq('')
+        _add_row_errors(missing_mask, col, 'Missing value')
+        valid_mask &= ~missing_mask
+
+    numeric_df = df[NUMERIC_COLUMNS].apply(pd.to_numeric, errors='coerce')
+    for col in NUMERIC_COLUMNS:
+        missing_mask = df[col].isna() | df[col].astype(str).str.strip().eq('')
+        invalid_mask = numeric_df[col].isna() & ~missing_mask
+        _add_row_errors(invalid_mask, col, 'Invalid numeric value')
+        valid_mask &= ~invalid_mask
+
+    for col, mask in (
+        ('Flowrate', numeric_df['Flowrate'] < 0),
+        ('Pressure', numeric_df['Pressure'] < 0),
+        ('Temperature', (numeric_df['Temperature'] < -50) | (numeric_df['Temperature'] > 500)),
+    ):
+        _add_row_errors(mask, col, 'Value must be in range')
+        valid_mask &= ~mask
+    return int(valid_mask.sum())
+
+
+class Command(BaseCommand):
+    help = 'Measure validation and ingest throughput on a synthetic CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000)
+        parser.add_argument('--bad-fraction', type=float, default=0.05)
+        parser.add_argument('--chunk-size', type=int, default=50_000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        repeat = options['repeat']
+        data = _synthetic_csv(rows, options['bad_fraction'], options['seed'])
+        frame = pd.read_csv(io.BytesIO(data), dtype=str)
+        rules = compile_rules()
+        limits = [MAX_ROW_ERRORS] * len(rules.rules)
+        self.stdout.write(f'{rows:,} rows, {len(data) / 2 ** 20:.1f} MB of CSV')
+
+        self._report('legacy loop', rows, repeat, lambda: _legacy_validate(frame))
+        self._report('rule engine', rows, repeat, lambda: rules.evaluate(frame, limits))
+        self._report(
+            'full ingest',
+            rows,
+            repeat,
+            lambda: ingest_csv(
+                io.BytesIO(data), max_rows=rows, chunk_size=options['chunk_size']
+            ),
+        )
+
+    def _report(self, label, rows, repeat, fn):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        self.stdout.write(
+            f'{label:<12} {best * 1000:9.1f} ms   {rows / best / 1e6:6.2f} M rows/s'
+        )
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.datasets.retention import sweep
+
+
+class Command(BaseCommand):
+    help = 'Apply the upload retention policies now, to every user or to the given ones.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'users', nargs='*', help='Usernames to sweep (default: every user with uploads).'
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--dry-run', action='store_true', help='Count the stale uploads without deleting them.'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['users']:
+            found = dict(
+                get_user_model().objects
+                .filter(username__in=options['users'])
+                .values_list('username', 'id')
+            )
+            missing = [username for username in options['users'] if username not in found]
+            if missing:
+                raise CommandError(f'Unknown user: {missing[0]}')
+            user_ids = list(found.values())
+
+        result = sweep(
+            user_ids=user_ids,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            background=False,
+        )
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(f'{verb} {result.uploads} uploads of {result.users} users.')
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0002_report_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetupload',
+            name='is_valid',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='datasetupload',
+            index=models.Index(fields=['user', 'is_valid', '-uploaded_at', '-id'], name='dataset_user_valid_recent_idx'),
+        ),
+    ]
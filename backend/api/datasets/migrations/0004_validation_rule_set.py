@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0003_upload_is_valid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValidationRuleSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site', models.CharField(blank=True, max_length=64, unique=True)),
+                ('rules', models.JSONField(default=dict)),
+                ('version', models.PositiveIntegerField(default=1, editable=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['site'],
+            },
+        ),
+    ]
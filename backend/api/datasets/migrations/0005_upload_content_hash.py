@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 02:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0004_validation_rule_set'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetupload',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='datasetupload',
+            index=models.Index(fields=['user', 'content_hash'], name='dataset_user_hash_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+COLUMNS = (
+    'row_count',
+    'accepted_rows',
+    'rejected_rows',
+    'file_size_bytes',
+    'total_equipment',
+    'avg_flowrate',
+    'avg_pressure',
+    'avg_temperature',
+)
+BATCH_SIZE = 1000
+
+
+def fill_summary_columns(apps, schema_editor):
+    DatasetUpload = apps.get_model('datasets', 'DatasetUpload')
+    uploads = DatasetUpload.objects.only('id', 'summary').order_by('id')
+    last_id = 0
+    while True:
+        batch = list(uploads.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            return
+        for upload in batch:
+            summary = upload.summary or {}
+            validation = summary.get('validation') or {}
+            upload.row_count = summary.get('row_count') or validation.get('total_rows')
+            upload.accepted_rows = validation.get('accepted_rows')
+            upload.rejected_rows = validation.get('rejected_rows')
+            upload.file_size_bytes = summary.get('file_size_bytes')
+            upload.total_equipment = summary.get('total_equipment')
+            upload.avg_flowrate = summary.get('avg_flowrate')
+            upload.avg_pressure = summary.get('avg_pressure')
+            upload.avg_temperature = summary.get('avg_temperature')
+        DatasetUpload.objects.bulk_update(batch, COLUMNS)
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0007_retention_policy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetupload',
+            name='accepted_rows',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='avg_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='avg_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='avg_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='file_size_bytes',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='rejected_rows',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='row_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='datasetupload',
+            name='total_equipment',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='datasetupload',
+            index=models.Index(fields=['user', '-uploaded_at', '-id'], name='dataset_user_recent_idx'),
+        ),
+        migrations.RunPython(fill_summary_columns, migrations.RunPython.noop),
+    ]
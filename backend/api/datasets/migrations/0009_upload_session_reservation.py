@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0008_upload_summary_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='reserved_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadsession',
+            name='reserved_by',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 03:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0009_upload_session_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='scan',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
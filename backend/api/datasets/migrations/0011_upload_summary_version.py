@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0010_upload_session_scan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datasetupload',
+            name='summary_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -1,5 +1,30 @@
+import uuid
+
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models, transaction
+from django.utils import timezone
+
+from .resumable import discard_staged
+from .retention import Limits, release_files, schedule_sweep
+from .validation import rules_from_config
+
+
+def summary_columns(summary) -> dict:
+    """The ``DatasetUpload`` column values held in a stored summary."""
+    summary = summary or {}
+    validation = summary.get('validation') or {}
+    return {
+        'row_count': summary.get('row_count') or validation.get('total_rows'),
+        'accepted_rows': validation.get('accepted_rows'),
+        'rejected_rows': validation.get('rejected_rows'),
+        'file_size_bytes': summary.get('file_size_bytes'),
+        'total_equipment': summary.get('total_equipment'),
+        'avg_flowrate': summary.get('avg_flowrate'),
+        'avg_pressure': summary.get('avg_pressure'),
+        'avg_temperature': summary.get('avg_temperature'),
+    }
 
 
 class DatasetUpload(models.Model):
@@ -16,35 +41,245 @@ class DatasetUpload(models.Model):
     )
     name = models.CharField(max_length=255)
     file = models.FileField(upload_to='datasets/')
+    # BLAKE2b of the uploaded bytes. Uploads with the same hash share one
+    # content-addressed file; blank for uploads stored before hashing.
+    content_hash = models.CharField(max_length=64, blank=True)
     summary = models.JSONField(default=dict, blank=True)
+    # Bumped whenever the stored summary is rewritten, e.g. by a backfill,
+    # so ETags built from it change with it.
+    summary_version = models.PositiveIntegerField(default=1)
+    # Set at ingest; cleared if the stored data later turns out unreadable.
+    is_valid = models.BooleanField(default=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Copies of the summary values listings read, sort and filter on, so
+    # they are plain columns instead of keys inside the JSON.
+    row_count = models.PositiveIntegerField(null=True, blank=True)
+    accepted_rows = models.PositiveIntegerField(null=True, blank=True)
+    rejected_rows = models.PositiveIntegerField(null=True, blank=True)
+    file_size_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    total_equipment = models.PositiveIntegerField(null=True, blank=True)
+    avg_flowrate = models.FloatField(null=True, blank=True)
+    avg_pressure = models.FloatField(null=True, blank=True)
+    avg_temperature = models.FloatField(null=True, blank=True)
 
     class Meta:
         ordering = ['-uploaded_at', '-id']
+        indexes = [
+            models.Index(
+                fields=['user', '-uploaded_at', '-id'],
+                name='dataset_user_recent_idx',
+            ),
+            models.Index(
+                fields=['user', 'is_valid', '-uploaded_at', '-id'],
+                name='dataset_user_valid_recent_idx',
+            ),
+            models.Index(
+                fields=['user', 'content_hash'],
+                name='dataset_user_hash_idx',
+            ),
+        ]
 
     def save(self, *args, **kwargs):
         is_new = self.pk is None
+        self.sync_summary_columns()
         super().save(*args, **kwargs)
         if is_new:
-            transaction.on_commit(
-                lambda: self._prune_old_uploads(user=self.user)
-            )
+            transaction.on_commit(lambda: schedule_sweep([self.user_id]))
 
-    @classmethod
-    def _prune_old_uploads(cls, user, keep=5):
-        """
-        Keep only the most recent `keep` uploads PER USER.
-        """
-        ids_to_keep = (
-            cls.objects.filter(user=user)
-            .order_by('-uploaded_at', '-id')
-            .values_list('id', flat=True)[:keep]
-        )
-        cls.objects.filter(user=user).exclude(id__in=list(ids_to_keep)).delete()
+    def sync_summary_columns(self):
+        """Copy the hot summary values into their columns (``save`` does this)."""
+        for field, value in summary_columns(self.summary).items():
+            setattr(self, field, value)
 
     def delete(self, *args, **kwargs):
-        storage = self.file.storage
         path = self.file.name
+        upload_id = self.pk
+        super().delete(*args, **kwargs)
+        release_files([upload_id], [path] if path else [])
+
+
+class ValidationRuleSet(models.Model):
+    """
+    Range limits for one site, optionally per equipment Type, stored as
+    data (see ``validation.rules_from_config`` for the format). The rule
+    set with a blank site applies to uploads from any other site. Every
+    save bumps ``version``, which keys the compiled-rules cache.
+    """
+
+    site = models.CharField(max_length=64, unique=True, blank=True)
+    rules = models.JSONField(default=dict)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['site']
+
+    def __str__(self):
+        return f'{self.site or "default"} v{self.version}'
+
+    def clean(self):
+        try:
+            rules_from_config(self.rules)
+        except ValueError as exc:
+            raise ValidationError({'rules': str(exc)})
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            self.version += 1
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def for_site(cls, site: str):
+        """The active rule set for ``site``, else the default one, else None."""
+        candidates = {
+            rule_set.site: rule_set
+            for rule_set in (
+                cls.objects.filter(site__in={site, ''}, is_active=True).order_by()
+            )
+        }
+        return candidates.get(site) or candidates.get('')
+
+
+class RetentionPolicy(models.Model):
+    """
+    Limits on the uploads a user keeps. A policy belongs to one user, to a
+    tier (the members of an auth group), or, with neither set, is the
+    default for everyone else. A blank limit does not apply; see
+    ``retention`` for how policies are resolved and applied.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='retention_policy',
+    )
+    tier = models.OneToOneField(
+        'auth.Group',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='retention_policy',
+    )
+    max_uploads = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)]
+    )
+    max_age_days = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)]
+    )
+    max_total_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'retention policies'
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(user__isnull=True) | models.Q(tier__isnull=True),
+                name='retention_policy_user_or_tier',
+            ),
+        ]
+
+    def __str__(self):
+        if self.user_id:
+            return f'user {self.user}'
+        if self.tier_id:
+            return f'tier {self.tier}'
+        return 'default'
+
+    def clean(self):
+        if self.user_id and self.tier_id:
+            raise ValidationError('A policy applies to a user or to a tier, not both.')
+        if not self.user_id and not self.tier_id:
+            defaults = RetentionPolicy.objects.filter(user__isnull=True, tier__isnull=True)
+            if defaults.exclude(pk=self.pk).exists():
+                raise ValidationError('There already is a default policy.')
+
+    @property
+    def limits(self) -> Limits:
+        return Limits(self.max_uploads, self.max_age_days, self.max_total_bytes)
+
+
+class ReportJob(models.Model):
+    """
+    A PDF report rendered in the background for one upload.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='report_jobs',
+    )
+    upload = models.ForeignKey(
+        DatasetUpload,
+        on_delete=models.CASCADE,
+        related_name='report_jobs',
+    )
+    template_version = models.PositiveIntegerField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload in progress. The bytes received so far are staged
+    at ``resumable.staging_path(id)``; ``received`` is how many of them are
+    there, and so where the next range has to start. A plain CSV is
+    validated as its ranges arrive, see ``resumable.scan_received``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions',
+    )
+    filename = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, blank=True)
+    site = models.CharField(max_length=64, blank=True)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    # Set once the CSV header row has arrived and passed the column check.
+    header_checked = models.BooleanField(default=False)
+    # How far validation has got (``resumable.scan_received``); null when
+    # the file is only read once complete.
+    scan = models.JSONField(null=True, blank=True)
+    # The PUT currently appending at ``received``, and since when. Other
+    # ranges are refused until it commits, fails or times out.
+    reserved_by = models.UUIDField(null=True, blank=True)
+    reserved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def delete(self, *args, **kwargs):
+        session_id = self.pk
         super().delete(*args, **kwargs)
-        if path:
-            storage.delete(path)
\ No newline at end of file
+        discard_staged(session_id)
+
+    @classmethod
+    def prune_expired(cls, max_age):
+        """Drop sessions, and their staged bytes, idle for longer than ``max_age``."""
+        for session in cls.objects.filter(updated_at__lt=timezone.now() - max_age):
+            session.delete()
@@ -0,0 +1,68 @@
+"""
+CPU-bound work for the async dataset views, on a bounded process pool.
+
+pandas and ReportLab hold the GIL, so running them on the event loop, or on
+the threads it hands sync code to, would hold up every other request the
+server is handling. ``run`` sends a call to one of
+``CHEMVIZ_OFFLOAD_WORKERS`` worker processes and awaits its result; ``0``
+runs it on a thread instead. At most ``CHEMVIZ_OFFLOAD_MAX_PENDING`` calls
+are queued or running at once, and ``run`` raises ``OffloadBusy`` rather
+than queue more. Calls must be importable functions that only touch the
+file system, and take paths, ids and plain values rather than model
+instances: workers are spawned fresh, not forked from the server, and do
+not share its database connection.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = None
+
+
+class OffloadBusy(Exception):
+    """Every worker slot, queue included, is taken."""
+
+
+def _get_executor():
+    global _executor, _pending
+    with _executor_lock:
+        if _pending is None:
+            _pending = threading.BoundedSemaphore(settings.CHEMVIZ_OFFLOAD_MAX_PENDING)
+        if _executor is None and settings.CHEMVIZ_OFFLOAD_WORKERS > 0:
+            # Forking a server that runs threads and an event loop can copy
+            # held locks into the child; spawned workers start clean.
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.CHEMVIZ_OFFLOAD_WORKERS,
+                mp_context=get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _executor, _pending
+
+
+async def run(func, *args):
+    executor, pending = _get_executor()
+    if not pending.acquire(blocking=False):
+        raise OffloadBusy(func.__name__)
+    try:
+        if executor is None:
+            future = asyncio.ensure_future(sync_to_async(func, thread_sensitive=False)(*args))
+        else:
+            future = executor.submit(func, *args)
+    except BaseException:
+        pending.release()
+        raise
+    # The slot is freed when the work ends, not when the caller stops
+    # waiting: a cancelled request leaves a started call running.
+    future.add_done_callback(lambda _: pending.release())
+    if executor is None:
+        return await asyncio.shield(future)
+    # Cancelling this only cancels a call that has not started.
+    return await asyncio.wrap_future(future)
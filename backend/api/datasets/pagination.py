@@ -0,0 +1,35 @@
+"""
+Cursor pagination over a user's uploads.
+
+Listings are ordered newest first by ``(uploaded_at, id)``. A cursor is the
+position of the last upload on a page, encoded as an opaque URL-safe token,
+and the next page holds the uploads strictly after it. Unlike offsets, a
+cursor stays on the right row when uploads are added or pruned meanwhile.
+"""
+
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_cursor(upload) -> str:
+    raw = f'{upload.uploaded_at.isoformat()}|{upload.id}'.encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str):
+    """``(uploaded_at, id)`` of a cursor. Raises ``ValueError`` if it is malformed."""
+    padded = token + '=' * (-len(token) % 4)
+    uploaded_at, upload_id = (
+        base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split('|')
+    )
+    return datetime.fromisoformat(uploaded_at), int(upload_id)
+
+
+def after_cursor(queryset, token: str):
+    """Uploads that come after the cursor in newest-first order."""
+    uploaded_at, upload_id = decode_cursor(token)
+    return queryset.filter(
+        Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=upload_id)
+    )
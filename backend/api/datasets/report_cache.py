@@ -0,0 +1,82 @@
+"""
+Size-bounded on-disk cache of rendered PDF reports.
+
+Uploads are immutable, so a report is fully determined by the upload id and
+the report template version. Entries live under ``CHEMVIZ_REPORT_CACHE_DIR``
+as ``report-<upload_id>-v<version>.pdf``; a hit bumps the file's mtime and
+the oldest files are evicted once the directory exceeds
+``CHEMVIZ_REPORT_CACHE_MAX_BYTES``. Storing a report drops the upload's
+entries for other template versions.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+
+def _cache_dir() -> Path:
+    directory = Path(settings.CHEMVIZ_REPORT_CACHE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def _entry_path(upload_id: int, version: int) -> Path:
+    return _cache_dir() / f'report-{upload_id}-v{version}.pdf'
+
+
+def get_cached_report(upload_id: int, version: int):
+    path = _entry_path(upload_id, version)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def store_report(upload_id: int, version: int, content: bytes) -> Path:
+    path = _entry_path(upload_id, version)
+    # Write under a temporary name so concurrent readers never see a
+    # partially written PDF.
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix='.part')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(content)
+    os.replace(tmp_name, path)
+    # Rendered with another template; they would never be read again.
+    for stale in path.parent.glob(f'report-{upload_id}-v*.pdf'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    _evict(keep=path)
+    return path
+
+
+def invalidate_reports(*upload_ids: int):
+    prefixes = tuple(f'report-{upload_id}-v' for upload_id in upload_ids)
+    if not prefixes:
+        return
+    # One pass over the directory however many uploads are dropped.
+    for path in _cache_dir().glob('report-*.pdf'):
+        if path.name.startswith(prefixes):
+            path.unlink(missing_ok=True)
+
+
+def _evict(keep: Path):
+    entries = []
+    total = 0
+    for path in _cache_dir().glob('report-*.pdf'):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    limit = settings.CHEMVIZ_REPORT_CACHE_MAX_BYTES
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
@@ -0,0 +1,361 @@
+from dataclasses import dataclass
+from datetime import datetime
+from io import BytesIO
+
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.shapes import Circle, Drawing, String
+from reportlab.platypus import (
+    PageBreak,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+from .analytics import NUMERIC_COLUMNS, REQUIRED_COLUMNS, column_sketches
+from .columnar import open_stored_dataset, upload_variant
+from .conditional import make_etag
+from .report_cache import get_cached_report, store_report
+from .sketch import QuantileSketch
+
+# Bump whenever the rendered layout or content changes, so cached PDFs from
+# the previous template are no longer served.
+REPORT_TEMPLATE_VERSION = 2
+
+SNAPSHOT_ROWS = 10
+
+
+@dataclass(frozen=True)
+class ReportSource:
+    """What a report is rendered from, in a form a worker process can take."""
+
+    id: int
+    name: str
+    uploaded_at: datetime
+    summary: dict
+    csv_path: str
+    variant: str
+
+    @classmethod
+    def of(cls, upload) -> 'ReportSource':
+        return cls(
+            id=upload.id,
+            name=upload.name,
+            uploaded_at=upload.uploaded_at,
+            summary=upload.summary,
+            csv_path=upload.file.path,
+            variant=upload_variant(upload),
+        )
+
+
+def report_etag(upload) -> str:
+    return make_etag('report', upload.id, upload.uploaded_at.isoformat(), REPORT_TEMPLATE_VERSION)
+
+
+def report_file(upload):
+    """Path of the upload's cached PDF, rendering and caching it first if needed."""
+    path = get_cached_report(upload.id, REPORT_TEMPLATE_VERSION)
+    if path is None:
+        path = store_report(upload.id, REPORT_TEMPLATE_VERSION, render_report_pdf(upload))
+    return path
+
+
+def render_report_pdf(upload) -> bytes:
+    return render_source_pdf(ReportSource.of(upload))
+
+
+def render_source_pdf(source: 'ReportSource') -> bytes:
+    dataset, load_error = open_stored_dataset(source.csv_path, source.variant)
+    # Ranges, percentiles and histograms come from the stored quantile
+    # sketches; only summaries older than those need the rows.
+    sketches = column_sketches(source.summary)
+    if sketches is None and dataset is not None:
+        sketches = {
+            col: QuantileSketch.from_values(dataset.column(col)) for col in NUMERIC_COLUMNS
+        }
+    df = dataset.frame(REQUIRED_COLUMNS, stop=SNAPSHOT_ROWS) if dataset is not None else None
+
+    def _format_number(value):
+        if value is None or pd.isna(value):
+            return 'N/A'
+        if isinstance(value, float):
+            return f'{value:.2f}'
+        return str(value)
+
+    def _build_bar_chart(values, labels, title, width=430, height=190):
+        drawing = Drawing(width, height)
+        chart = VerticalBarChart()
+        chart.x = 40
+        chart.y = 25
+        chart.width = width - 70
+        chart.height = height - 60
+        chart.data = [values]
+        chart.categoryAxis.categoryNames = labels
+        chart.valueAxis.valueMin = 0
+        chart.barWidth = 14
+        chart.groupSpacing = 8
+        chart.barSpacing = 4
+        chart.bars.fillColor = colors.HexColor('#3b82f6')
+        drawing.add(chart)
+        drawing.add(String(40, height - 20, title, fontSize=9))
+        return drawing
+
+    def _histogram(sketch: QuantileSketch, bins=6):
+        counts, edges = sketch.histogram(bins)
+        if not counts:
+            return [], []
+        labels = [
+            f'{edges[i]:.1f}-{edges[i + 1]:.1f}'
+            for i in range(len(edges) - 1)
+        ]
+        return counts, labels
+
+    s = source.summary or {}
+    total_equipment = s.get('total_equipment') or (dataset.rows if dataset is not None else 0)
+    type_dist = s.get('type_distribution') or {}
+    type_count = len(type_dist)
+    avg_flowrate = s.get('avg_flowrate')
+    avg_pressure = s.get('avg_pressure')
+    avg_temperature = s.get('avg_temperature')
+
+    def _range(col):
+        if sketches is None:
+            return None, None
+        return sketches[col].minimum, sketches[col].maximum
+
+    min_flow, max_flow = _range('Flowrate')
+    min_pressure, max_pressure = _range('Pressure')
+    min_temp, max_temp = _range('Temperature')
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, title='ChemViz Report')
+    styles = getSampleStyleSheet()
+
+    story = []
+
+    # Cover page
+    logo = Drawing(70, 70)
+    logo.add(
+        Circle(
+            35,
+            35,
+            30,
+            fillColor=colors.HexColor('#3b82f6'),
+            strokeColor=colors.HexColor('#3b82f6'),
+        )
+    )
+    logo.add(
+        String(
+            35,
+            28,
+            'CV',
+            fontSize=16,
+            fillColor=colors.white,
+            textAnchor='middle',
+        )
+    )
+    story.append(logo)
+    story.append(Spacer(1, 8))
+    story.append(Paragraph('ChemViz', styles['Title']))
+    story.append(Paragraph('Chemical Equipment Parameter Analysis Report', styles['Heading2']))
+    story.append(Spacer(1, 18))
+    story.append(Paragraph(f'Dataset: {source.name}', styles['Normal']))
+    story.append(Paragraph(f'Upload ID: {source.id}', styles['Normal']))
+    story.append(Paragraph(
+        f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M")}',
+        styles['Normal'],
+    ))
+    story.append(Spacer(1, 24))
+    story.append(Paragraph('ChemViz Report (Cover Page)', styles['Italic']))
+    story.append(PageBreak())
+
+    # Dataset overview
+    story.append(Paragraph('Dataset Overview', styles['Heading2']))
+    overview_rows = [
+        ['Total Equipment', total_equipment],
+        ['Number of Equipment Types', type_count],
+        ['Uploaded Filename', source.name],
+        ['Upload Timestamp', source.uploaded_at.strftime("%Y-%m-%d %H:%M")],
+    ]
+    overview_table = Table(overview_rows, colWidths=[200, 300])
+    overview_table.setStyle(
+        TableStyle(
+            [
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ]
+        )
+    )
+    story.append(overview_table)
+    story.append(
+        Paragraph(
+            f'Section Summary: {total_equipment} equipment records across {type_count} types.',
+            styles['Italic'],
+        )
+    )
+    story.append(Spacer(1, 16))
+
+    # Summary statistics
+    story.append(Paragraph('Summary Statistics', styles['Heading2']))
+    summary_rows = [
+        ['Average Flowrate', _format_number(avg_flowrate)],
+        ['Average Pressure', _format_number(avg_pressure)],
+        ['Average Temperature', _format_number(avg_temperature)],
+        ['Min Flowrate', _format_number(min_flow)],
+        ['Max Flowrate', _format_number(max_flow)],
+        ['Min Pressure', _format_number(min_pressure)],
+        ['Max Pressure', _format_number(max_pressure)],
+        ['Min Temperature', _format_number(min_temp)],
+        ['Max Temperature', _format_number(max_temp)],
+    ]
+    if sketches is not None:
+        for col in NUMERIC_COLUMNS:
+            p50, p95, p99 = sketches[col].quantiles((0.5, 0.95, 0.99))
+            summary_rows.append([
+                f'{col} P50 / P95 / P99',
+                ' / '.join(_format_number(value) for value in (p50, p95, p99)),
+            ])
+    summary_table = Table(summary_rows, colWidths=[200, 300])
+    summary_table.setStyle(
+        TableStyle(
+            [
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ]
+        )
+    )
+    story.append(summary_table)
+    story.append(
+        Paragraph(
+            'Section Summary: Averages and ranges are computed from valid rows.',
+            styles['Italic'],
+        )
+    )
+    story.append(Spacer(1, 16))
+
+    # Equipment type distribution
+    story.append(Paragraph('Equipment Type Distribution', styles['Heading2']))
+    if type_dist:
+        top_type = max(type_dist.items(), key=lambda x: x[1])
+        top_pct = (top_type[1] / total_equipment) * 100 if total_equipment else 0
+        type_labels = list(type_dist.keys())
+        type_values = list(type_dist.values())
+        story.append(_build_bar_chart(type_values, type_labels, 'Type Distribution'))
+        story.append(Spacer(1, 8))
+        total = sum(type_values) or 1
+        type_table_rows = [['Type', 'Count', 'Percentage']]
+        for label, count in zip(type_labels, type_values):
+            pct = (count / total) * 100
+            type_table_rows.append([label, count, f'{pct:.1f}%'])
+        type_table = Table(type_table_rows, colWidths=[220, 120, 120])
+        type_table.setStyle(
+            TableStyle(
+                [
+                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ]
+            )
+        )
+        story.append(type_table)
+        story.append(
+            Paragraph(
+                f'Section Summary: {top_type[0]} is the most common type ({top_pct:.1f}%).',
+                styles['Italic'],
+            )
+        )
+    else:
+        story.append(Paragraph('No equipment type distribution available.', styles['Normal']))
+
+    story.append(PageBreak())
+
+    # Parameter analysis
+    story.append(Paragraph('Parameter Analysis', styles['Heading2']))
+    if sketches is None:
+        story.append(
+            Paragraph(
+                'Raw CSV data could not be loaded. This section is based on stored summary values only.',
+                styles['Italic'],
+            )
+        )
+        story.append(Spacer(1, 12))
+    else:
+        for label in NUMERIC_COLUMNS:
+            values, bins = _histogram(sketches[label])
+            story.append(Paragraph(f'{label} Analysis', styles['Heading3']))
+            story.append(
+                Paragraph(f'Average {label}: {_format_number(s.get(f"avg_{label.lower()}"))}', styles['Normal'])
+            )
+            if values:
+                story.append(_build_bar_chart(values, bins, f'{label} Distribution', width=420, height=180))
+            else:
+                story.append(Paragraph('No numeric data available.', styles['Normal']))
+            if values:
+                max_idx = values.index(max(values))
+                story.append(
+                    Paragraph(
+                        f'Insight: Most values fall between {bins[max_idx]}.',
+                        styles['Italic'],
+                    )
+                )
+            story.append(Spacer(1, 12))
+
+    # Equipment snapshot table
+    story.append(Paragraph(f'Equipment Snapshot (First {SNAPSHOT_ROWS} Rows)', styles['Heading2']))
+    if df is not None:
+        snapshot_rows = [REQUIRED_COLUMNS] + df.values.tolist()
+        snapshot_table = Table(snapshot_rows, colWidths=[140, 100, 100, 100, 100])
+        snapshot_table.setStyle(
+            TableStyle(
+                [
+                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ]
+            )
+        )
+        story.append(snapshot_table)
+        story.append(Spacer(1, 12))
+    else:
+        story.append(
+            Paragraph('Snapshot not available (raw CSV could not be loaded).', styles['Italic'])
+        )
+        story.append(Spacer(1, 12))
+
+    # Observations
+    story.append(Paragraph('Observations & Insights', styles['Heading2']))
+    observations = []
+    if type_dist:
+        top_type = max(type_dist.items(), key=lambda x: x[1])
+        pct = (top_type[1] / total_equipment) * 100 if total_equipment else 0
+        observations.append(
+            f'{top_type[0]} equipment dominates the dataset ({pct:.1f}%).'
+        )
+    if avg_pressure and avg_temperature:
+        observations.append(
+            'Average pressure is slightly elevated relative to temperature patterns.'
+        )
+    if avg_flowrate:
+        observations.append(
+            'Flowrate values are within expected operational ranges.'
+        )
+    if not observations:
+        observations.append('No additional insights available.')
+    for item in observations:
+        story.append(Paragraph(f'- {item}', styles['Normal']))
+
+    def _footer(canvas, doc_obj):
+        canvas.saveState()
+        footer_text = f'Generated by ChemViz | v1.0 | Page {canvas.getPageNumber()}'
+        canvas.setFont('Helvetica', 9)
+        canvas.setFillColor(colors.grey)
+        canvas.drawCentredString(letter[0] / 2.0, 20, footer_text)
+        canvas.restoreState()
+
+    doc.build(story, onFirstPage=_footer, onLaterPages=_footer)
+
+    return buffer.getvalue()
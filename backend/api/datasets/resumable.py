@@ -0,0 +1,240 @@
+"""
+Resumable uploads.
+
+A session is created with the file's name and size. The bytes then arrive
+as ``PUT`` requests carrying ``Content-Range`` and are appended to a staging
+file under ``MEDIA_ROOT/uploads/``; completing the session runs the normal
+upload pipeline on that file. Every range has to start where the stored
+bytes end, so a client that lost its connection asks for the offset and
+carries on from there instead of starting over.
+
+Plain CSVs are validated as they arrive: each range's complete records are
+checked by ``scan_received``, their accepted rows appended to a columnar
+staging directory and the counts kept on the session, so completing the
+upload only has to summarise them.
+"""
+
+import csv
+import io
+import re
+import shutil
+import zlib
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+from django.core.files import File
+
+from .analytics import REQUIRED_COLUMNS
+from .columnar import SIDECAR_SUFFIX, ColumnarDataset, ColumnarWriter
+from .compression import GZIP
+from .ingest import IngestState
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+_COPY_BUFFER = 64 * 1024
+# The header row has to fit in the first this many bytes of CSV.
+_HEADER_BYTES = 64 * 1024
+
+
+def staging_path(session_id) -> Path:
+    return Path(settings.MEDIA_ROOT) / 'uploads' / f'{session_id}.part'
+
+
+def scan_directory(session_id) -> Path:
+    """Where the accepted rows of a scanned session are staged."""
+    return Path(settings.MEDIA_ROOT) / 'uploads' / f'{session_id}{SIDECAR_SUFFIX}'
+
+
+def discard_staged(session_id):
+    staging_path(session_id).unlink(missing_ok=True)
+    shutil.rmtree(scan_directory(session_id), ignore_errors=True)
+
+
+class StagedFile(File):
+    """
+    A completed staging file opened as an upload. Exposing its path lets
+    the file system storage move it into place rather than copy it.
+    """
+
+    def __init__(self, file, name, path: Path):
+        super().__init__(file, name=name)
+        self._path = path
+
+    def temporary_file_path(self) -> str:
+        return str(self._path)
+
+
+def parse_content_range(header, size: int):
+    """
+    ``(start, end)`` of a ``bytes start-end/size`` header (``end``
+    inclusive), or ``(None, message)``.
+    """
+    match = _CONTENT_RANGE.match(header or '')
+    if not match:
+        return None, 'Content-Range must be "bytes <start>-<end>/<size>".'
+    start, end, total = (int(value) for value in match.groups())
+    if total != size:
+        return None, f'Content-Range size {total} does not match the session size {size}.'
+    if end < start or end >= size:
+        return None, 'Content-Range is outside the file.'
+    return (start, end), None
+
+
+def append_range(path: Path, stream, start: int, length: int) -> int:
+    """
+    Write ``length`` bytes from ``stream`` at ``start``, dropping anything
+    after ``start`` left over from an interrupted request. Returns how
+    many bytes the client actually sent.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'r+b' if path.exists() else 'wb') as handle:
+        handle.truncate(start)
+        handle.seek(start)
+        written = 0
+        while written < length:
+            block = stream.read(min(_COPY_BUFFER, length - written))
+            if not block:
+                break
+            handle.write(block)
+            written += len(block)
+    return written
+
+
+def check_header(path: Path, compression: str):
+    """
+    Check the header row of a partly received CSV. Returns ``(checked,
+    error)``: ``checked`` is false while the header has not fully arrived,
+    and ``error`` is the body for a 400 response. Only plain and gzip CSVs
+    are checked early; the CSV in a zip or zstd file is first read when
+    the upload completes.
+    """
+    if compression not in ('', GZIP):
+        return True, None
+    with open(path, 'rb') as handle:
+        head = handle.read(_HEADER_BYTES)
+    if compression == GZIP:
+        # A gzip prefix inflates fine on its own; wbits=31 expects the header.
+        try:
+            head = zlib.decompressobj(wbits=31).decompress(head, _HEADER_BYTES)
+        except zlib.error as exc:
+            return True, {'error': 'Failed to read CSV file.', 'details': str(exc)}
+    if b'\n' not in head:
+        if len(head) < _HEADER_BYTES:
+            return False, None
+        return True, {'error': 'CSV header row is too long.'}
+
+    first_line = head.split(b'\n', 1)[0].decode('utf-8-sig', errors='replace')
+    columns = [col.strip() for col in next(csv.reader(io.StringIO(first_line)), [])]
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing:
+        return True, {
+            'error': f'Missing column: {missing[0]}',
+            'missing_columns': missing,
+            'received_columns': columns,
+        }
+    return True, None
+
+
+def _record_end(data: bytes) -> int:
+    """
+    Length of the complete records at the start of ``data``: up to its
+    last newline that is not inside a quoted field.
+    """
+    quotes = data.count(b'"')
+    end = len(data)
+    while True:
+        end = data.rfind(b'\n', 0, end)
+        if end < 0:
+            return 0
+        if (quotes - data.count(b'"', end)) % 2 == 0:
+            return end + 1
+
+
+def scan_received(session, rules, max_rows: int):
+    """
+    Validate the records completed by the bytes received so far, as the
+    full upload would, leaving a partial last record for the next range.
+    Returns ``(scan, error)``: the state to store as ``session.scan``
+    (``None`` once the rules changed mid-upload and the file has to be
+    ingested on completion instead) or the body for a 400 response.
+    """
+    scan = session.scan
+    if scan and scan['rule_set'] != rules.label:
+        shutil.rmtree(scan_directory(session.id), ignore_errors=True)
+        return None, None
+    scan = scan or {
+        'rule_set': rules.label,
+        # Bytes consumed, length of the header record, rows parsed.
+        'offset': 0,
+        'header': 0,
+        'rows': 0,
+        'ingest': None,
+        'sidecar': None,
+    }
+
+    with open(staging_path(session.id), 'rb') as handle:
+        header = handle.read(scan['header'])
+        handle.seek(scan['offset'])
+        data = handle.read(session.received - scan['offset'])
+    end = len(data) if session.received == session.size else _record_end(data)
+    if not end:
+        if not scan['header'] and len(data) >= _HEADER_BYTES:
+            return None, {'error': 'CSV header row is too long.'}
+        return scan, None
+
+    try:
+        frame = pd.read_csv(io.BytesIO(header + data[:end]), dtype=str)
+    except Exception as exc:
+        return None, {'error': 'Failed to read CSV file.', 'details': str(exc)}
+    # Number rows across ranges the way one chunked read would.
+    frame.index += scan['rows']
+
+    writer = ColumnarWriter(directory=scan_directory(session.id), position=scan['sidecar'])
+    state = IngestState.restore(scan['ingest'], sink=writer, rules=rules)
+    try:
+        error = state.feed(frame, max_rows)
+    finally:
+        position = writer.detach()
+    if error:
+        return None, error
+    # The wrong columns are reported now rather than after the whole file.
+    if state.missing_columns:
+        return None, state.missing_columns_error()
+
+    if not scan['header']:
+        scan['header'] = data.find(b'\n') + 1 or end
+    scan.update(
+        offset=scan['offset'] + end,
+        rows=scan['rows'] + len(frame),
+        ingest=state.snapshot(),
+        sidecar=position,
+    )
+    return scan, None
+
+
+def finish_scan(session, rules, chunk_size: int):
+    """
+    ``(IngestResult, error, ColumnarWriter)`` for a fully scanned session,
+    as ``ingest_csv`` would have produced them, or ``None`` if the file was
+    not scanned with ``rules`` and has to be ingested now.
+    """
+    scan = session.scan
+    if not scan or scan['rule_set'] != rules.label or scan['offset'] != session.size:
+        return None
+    writer = ColumnarWriter(directory=scan_directory(session.id), position=scan['sidecar'])
+    state = IngestState.restore(scan['ingest'], rules=rules)
+    dataset = ColumnarDataset.open_directory(writer.seal())
+    result, error = state.finish(dataset.analytics(chunk_size))
+    return result, error, writer
+
+
+def scan_progress(scan):
+    """Row counts validated so far, for the session's responses."""
+    if not scan or not scan['ingest']:
+        return None
+    state = scan['ingest']
+    return {
+        'total_rows': state['total_rows'],
+        'accepted_rows': state['accepted_rows'],
+        'rejected_rows': state['total_rows'] - state['accepted_rows'],
+    }
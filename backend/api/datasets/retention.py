@@ -0,0 +1,273 @@
+"""
+Upload retention.
+
+How many uploads a user keeps, for how many days and in how many bytes is
+set by ``RetentionPolicy`` rows. The user's own policy wins; otherwise the
+most generous limits among the policies of the tiers (auth groups) they
+belong to apply; otherwise the default policy, and without one the
+``CHEMVIZ_RETENTION_*`` settings. A user's newest upload is always kept.
+
+``sweep`` applies the policies to users in batches: each batch reads its
+uploads in one query and drops the stale ones in one bulk delete. Cached
+reports and stored CSVs (with their sidecars) that no upload refers to any
+more are removed afterwards by ``release_files``. New uploads queue a sweep
+of their user; both run on a background thread, so requests do no retention
+work themselves.
+"""
+
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .columnar import remove_sidecars
+from .report_cache import invalidate_reports
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Users waiting for a background sweep; one sweep takes all of them.
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Limits:
+    max_uploads: int | None = None
+    max_age_days: int | None = None
+    max_total_bytes: int | None = None
+
+    @classmethod
+    def from_settings(cls) -> 'Limits':
+        # 0 in the settings turns a limit off.
+        return cls(
+            settings.CHEMVIZ_RETENTION_MAX_UPLOADS or None,
+            settings.CHEMVIZ_RETENTION_MAX_AGE_DAYS or None,
+            settings.CHEMVIZ_RETENTION_MAX_TOTAL_BYTES or None,
+        )
+
+    def most_generous(self, other: 'Limits') -> 'Limits':
+        def _larger(a, b):
+            return None if a is None or b is None else max(a, b)
+
+        return Limits(
+            _larger(self.max_uploads, other.max_uploads),
+            _larger(self.max_age_days, other.max_age_days),
+            _larger(self.max_total_bytes, other.max_total_bytes),
+        )
+
+    def stale(self, uploads, now) -> list:
+        """
+        Ids of the ``(id, uploaded_at, size)`` uploads, newest first, that
+        fall outside the limits. Once one upload does, so do all older ones.
+        """
+        cutoff = now - timedelta(days=self.max_age_days) if self.max_age_days else None
+        total = 0
+        for position, (_, uploaded_at, size) in enumerate(uploads):
+            total += size or 0
+            if position and (
+                (self.max_uploads is not None and position >= self.max_uploads)
+                or (cutoff is not None and uploaded_at < cutoff)
+                or (self.max_total_bytes is not None and total > self.max_total_bytes)
+            ):
+                return [upload_id for upload_id, _, _ in uploads[position:]]
+        return []
+
+
+@dataclass
+class SweepResult:
+    users: int = 0
+    uploads: int = 0
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CHEMVIZ_RETENTION_WORKERS,
+                thread_name_prefix='chemviz-retention',
+            )
+        return _executor
+
+
+def _in_background(func, *args):
+    if settings.CHEMVIZ_RETENTION_WORKERS <= 0:
+        func(*args)
+    else:
+        _get_executor().submit(_run_in_worker, func, *args)
+
+
+def _run_in_worker(func, *args):
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Retention task %s failed', func.__name__)
+    finally:
+        close_old_connections()
+
+
+def schedule_sweep(user_ids):
+    """Queue a sweep of ``user_ids``, merged with any sweep still waiting."""
+    with _pending_lock:
+        idle = not _pending
+        _pending.update(user_ids)
+    if idle:
+        _in_background(_sweep_pending)
+
+
+def _sweep_pending():
+    with _pending_lock:
+        user_ids = sorted(_pending)
+        _pending.clear()
+    if user_ids:
+        sweep(user_ids=user_ids)
+
+
+def sweep(user_ids=None, batch_size=None, dry_run=False, background=True) -> SweepResult:
+    """
+    Apply the retention policies to ``user_ids`` (every user with uploads
+    by default). With ``dry_run`` nothing is deleted and the result counts
+    what would be; ``background=False`` removes files before returning.
+    """
+    # models.py imports this module, so its models are imported late.
+    from .models import DatasetUpload
+
+    batch_size = batch_size or settings.CHEMVIZ_RETENTION_BATCH_SIZE
+    now = timezone.now()
+    result = SweepResult()
+    for batch in _user_batches(DatasetUpload, user_ids, batch_size):
+        limits = _limits_for(batch)
+        uploads = {}
+        for user_id, upload_id, uploaded_at, path, size in (
+            DatasetUpload.objects
+            .filter(user_id__in=batch)
+            .order_by('user_id', '-uploaded_at', '-id')
+            .values_list('user_id', 'id', 'uploaded_at', 'file', 'file_size_bytes')
+        ):
+            uploads.setdefault(user_id, []).append((upload_id, uploaded_at, size, path))
+
+        stale_ids, paths = [], []
+        for user_id, rows in uploads.items():
+            paths_by_id = {upload_id: path for upload_id, _, _, path in rows}
+            stale = limits[user_id].stale([row[:3] for row in rows], now)
+            stale_ids.extend(stale)
+            paths.extend(paths_by_id[upload_id] for upload_id in stale)
+
+        result.users += len(uploads)
+        result.uploads += len(stale_ids)
+        if dry_run or not stale_ids:
+            continue
+        with transaction.atomic():
+            # A queryset delete loading ids only: then one DELETE for the
+            # report jobs that cascade and one for the uploads.
+            DatasetUpload.objects.filter(id__in=stale_ids).only('id').delete()
+        if background:
+            transaction.on_commit(lambda ids=stale_ids, paths=paths: release_files(ids, paths))
+        else:
+            _release(stale_ids, paths)
+    return result
+
+
+def _user_batches(model, user_ids, batch_size):
+    if user_ids is not None:
+        user_ids = sorted(set(user_ids))
+        for start in range(0, len(user_ids), batch_size):
+            yield user_ids[start:start + batch_size]
+        return
+
+    last = None
+    while True:
+        users = model.objects.order_by('user_id').values_list('user_id', flat=True).distinct()
+        if last is not None:
+            users = users.filter(user_id__gt=last)
+        batch = list(users[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1]
+
+
+def _limits_for(user_ids) -> dict:
+    """The resolved ``Limits`` of each user, in two queries."""
+    from .models import RetentionPolicy
+
+    own, tiers, default = {}, {}, Limits.from_settings()
+    for policy in RetentionPolicy.objects.filter(
+        Q(user_id__in=user_ids) | Q(user__isnull=True)
+    ):
+        if policy.user_id:
+            own[policy.user_id] = policy.limits
+        elif policy.tier_id:
+            tiers[policy.tier_id] = policy.limits
+        else:
+            default = policy.limits
+
+    limits = {user_id: own.get(user_id) for user_id in user_ids}
+    if tiers:
+        memberships = get_user_model().groups.through.objects.filter(
+            user_id__in=[user_id for user_id, found in limits.items() if found is None],
+            group_id__in=list(tiers),
+        )
+        tiered = {}
+        for user_id, group_id in memberships.values_list('user_id', 'group_id'):
+            current = tiered.get(user_id)
+            tiered[user_id] = (
+                tiers[group_id] if current is None else current.most_generous(tiers[group_id])
+            )
+        limits.update({user_id: found for user_id, found in tiered.items()})
+    return {user_id: found or default for user_id, found in limits.items()}
+
+
+def release_files(upload_ids, paths):
+    """
+    Remove the cached reports of deleted uploads, and their stored CSVs and
+    sidecars once no remaining upload shares them, in the background.
+    """
+    _in_background(_release, list(upload_ids), list(paths))
+
+
+def _release(upload_ids, paths):
+    from .models import DatasetUpload
+
+    invalidate_reports(*upload_ids)
+    paths = set(paths)
+    # Re-uploads share the stored CSV, so it stays until its last upload
+    # is gone.
+    shared = set(DatasetUpload.objects.filter(file__in=paths).values_list('file', flat=True))
+    for path in paths - shared:
+        _remove_unshared(DatasetUpload, path)
+
+
+def _remove_unshared(model, path):
+    """
+    Delete a stored CSV no upload referred to a moment ago. A re-upload may
+    have claimed it since, so the file is moved aside before the final
+    check: a claim committed before that check keeps the file, and one
+    committed after it finds the file gone and stores it again (see
+    ``uploads.restore_released``).
+    """
+    stored = Path(default_storage.path(path))
+    released = stored.with_name(f'{stored.name}.{uuid.uuid4().hex}.released')
+    try:
+        os.replace(stored, released)
+    except FileNotFoundError:
+        return
+    if model.objects.filter(file=path).exists():
+        os.replace(released, stored)
+        return
+    remove_sidecars(stored)
+    released.unlink(missing_ok=True)
@@ -1,3 +1,1549 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import runpy
+import shutil
+import sqlite3
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections, transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from . import jobs, offload, report_cache, retention, views
+from .analytics import NUMERIC_COLUMNS, REQUIRED_COLUMNS, AnalyticsAccumulator
+from .columnar import (
+    ColumnarDataset,
+    ColumnarWriter,
+    install_staged,
+    read_rows,
+    read_stored_rows,
+    remove_sidecars,
+    sidecar_path,
+)
+from .batch import ingest_many
+from .ingest import MAX_ROW_ERRORS, ingest_csv
+from .management.commands.bench_validation import _legacy_validate, _synthetic_csv
+from .models import (
+    DatasetUpload,
+    ReportJob,
+    RetentionPolicy,
+    UploadSession,
+    ValidationRuleSet,
+)
+from .reports import ReportSource, render_source_pdf, report_etag, report_file
+from .resumable import append_range, staging_path
+from .validation import INVALID, MISSING, RANGE, compile_rule_set, compile_rules
+
+SAMPLE_CSV = (
+    b'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+    b'Pump-1,Pump,120.5,5.2,110\n'
+    b'Valve-1,Valve,60.0,4.1,105\n'
+    b'Reactor-1,Reactor,,6.3,140\n'
+    b'Pump-2,Pump,130.0,-1,115\n'
+)
+
+
+class DatasetAPITestCase(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            CHEMVIZ_REPORT_CACHE_DIR=f'{media_root}/reports',
+            CHEMVIZ_REPORT_WORKERS=0,
+            CHEMVIZ_RETENTION_WORKERS=0,
+            CHEMVIZ_OFFLOAD_WORKERS=0,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = get_user_model().objects.create_user(
+            username='analyst@example.com',
+            email='analyst@example.com',
+            password='Secret123',
+            first_name='Plant Analyst',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _upload(self, name='equipment.csv', content=SAMPLE_CSV, **data):
+        response = self.client.post(
+            '/api/datasets/upload/',
+            {'file': SimpleUploadedFile(name, content, content_type='text/csv'), **data},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+
+class DatasetQueryCountTests(DatasetAPITestCase):
+    """
+    Pins every dataset endpoint to a fixed number of queries so per-row
+    lookups cannot creep back in.
+    """
+
+    def test_upload(self):
+        # Rule set and previous-upload lookups, insert, then the on-commit
+        # retention check (two reads).
+        with self.assertNumQueries(5):
+            with self.captureOnCommitCallbacks(execute=True):
+                self._upload()
+
+    def test_summary_listing_is_one_query(self):
+        for idx in range(5):
+            self._upload(f'equipment-{idx}.csv')
+
+        for url in (
+            '/api/datasets/summary/',
+            '/api/datasets/history/',
+            '/api/datasets/summaries/',
+            '/api/summary/',
+            '/api/history/',
+        ):
+            with self.subTest(url=url), self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(len(response.json()['results']), 5)
+            self.assertEqual(response.json()['results'][0]['uploaded_by'], 'Plant Analyst')
+
+    def test_latest_rows(self):
+        self._upload()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/datasets/latest/')
+        self.assertEqual(len(response.json()['rows']), 2)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/datasets/latest/', {'limit': 1, 'offset': 1, 'columns': 'Type,Flowrate'}
+            )
+        self.assertEqual(response.json()['rows'], [{'Type': 'Valve', 'Flowrate': 60.0}])
+
+    def test_report(self):
+        upload_id = self._upload()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/datasets/report/{upload_id}/')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        with self.assertNumQueries(1):
+            self.client.get('/api/report/pdf/')
+
+    def test_report_job(self):
+        upload_id = self._upload()
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                '/api/datasets/report/jobs/', {'upload_id': upload_id}, format='json'
+            )
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], 'succeeded')
+
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/datasets/report/jobs/{job_id}/')
+        with self.assertNumQueries(1):
+            self.client.get(f'/api/datasets/report/jobs/{job_id}/pdf/')
+
+    def test_type_stats(self):
+        upload_id = self._upload()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/datasets/stats/{upload_id}/')
+        self.assertEqual(list(response.json()['types']), ['Pump', 'Valve'])
+
+    def test_aggregate(self):
+        for idx in range(5):
+            self._upload(f'equipment-{idx}.csv')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/datasets/aggregate/')
+        self.assertEqual(len(response.json()['uploads']), 5)
+
+    def test_conditional_get_returns_304(self):
+        upload_id = self._upload()
+        for url in (
+            '/api/datasets/summaries/',
+            '/api/datasets/latest/',
+            f'/api/datasets/report/{upload_id}/',
+            f'/api/datasets/stats/{upload_id}/',
+            '/api/datasets/aggregate/',
+        ):
+            etag = self.client.get(url)['ETag']
+            with self.subTest(url=url), self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_latest_resources_fall_back_without_a_stale_304(self):
+        older = self._upload('older.csv', SAMPLE_CSV.replace(b'Pump-1', b'Pump-0'))
+        newest = self._upload()
+        since = http_date(timezone.now().timestamp() + 60)
+
+        self.assertIn('Last-Modified', self.client.get(f'/api/datasets/report/{newest}/'))
+        for url in ('/api/datasets/latest/', '/api/datasets/report/pdf/'):
+            self.assertNotIn('Last-Modified', self.client.get(url))
+
+        DatasetUpload.objects.get(id=newest).delete()
+        response = self.client.get('/api/datasets/latest/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], older)
+        response = self.client.get('/api/datasets/report/pdf/', HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], report_etag(DatasetUpload.objects.get(id=older)))
+
+    def test_etag_survives_a_compressed_response(self):
+        for _ in range(3):
+            self._upload()
+        response = self.client.get('/api/datasets/summaries/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        plain = self.client.get('/api/datasets/summaries/')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), plain.json())
+        self.assertEqual(response['ETag'], 'W/' + plain['ETag'])
+
+        response = self.client.get(
+            '/api/datasets/summaries/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_pdf_reports_are_not_recompressed(self):
+        upload_id = self._upload()
+        etag = self.client.get(f'/api/datasets/report/{upload_id}/')['ETag']
+        response = self.client.get(f'/api/datasets/report/{upload_id}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], etag)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+def assert_close(test, first, second):
+    """``assertEqual`` for nested summaries, with floats compared to rounding."""
+    if isinstance(first, dict):
+        test.assertEqual(first.keys(), second.keys())
+        for key in first:
+            assert_close(test, first[key], second[key])
+    elif isinstance(first, (list, tuple)):
+        test.assertEqual(len(first), len(second))
+        for a, b in zip(first, second):
+            assert_close(test, a, b)
+    elif isinstance(first, float):
+        test.assertAlmostEqual(first, second, delta=1e-9 * max(1.0, abs(first)))
+    else:
+        test.assertEqual(first, second)
+
+
+class IngestTests(DatasetAPITestCase):
+    # Twenty more copies of SAMPLE_CSV's rows: 84 rows, 42 of them rejected.
+    CONTENT = SAMPLE_CSV + SAMPLE_CSV.split(b'\n', 1)[1] * 20
+
+    def _ingest(self, chunk_size, content=CONTENT, max_rows=1000):
+        return ingest_csv(io.BytesIO(content), max_rows=max_rows, chunk_size=chunk_size)
+
+    def _upload_body(self):
+        response = self.client.post(
+            '/api/datasets/upload/',
+            {'file': SimpleUploadedFile('equipment.csv', self.CONTENT, content_type='text/csv')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        summary = DatasetUpload.objects.get(id=body.pop('id')).summary
+        del body['uploaded_at'], body['uploaded_by']
+        return body, summary
+
+    def test_chunked_upload_matches_a_single_read(self):
+        with override_settings(CHEMVIZ_CSV_CHUNK_SIZE=1000):
+            single = self._upload_body()
+        # Another user, so the second upload is not a re-upload.
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username='other', password='Secret123')
+        )
+        with override_settings(CHEMVIZ_CSV_CHUNK_SIZE=5):
+            chunked = self._upload_body()
+        assert_close(self, chunked, single)
+
+        expected, _ = self._ingest(chunk_size=1000)
+        for chunk_size in (1, 3, 4, 7):
+            result, error = self._ingest(chunk_size)
+            self.assertIsNone(error)
+            self.assertEqual(result.row_count, 84)
+            self.assertEqual(result.validation_summary, expected.validation_summary)
+            assert_close(self, result.analytics, expected.analytics)
+
+    def test_row_errors_are_numbered_across_chunks(self):
+        result, _ = self._ingest(chunk_size=3)
+        rows = [(error['row'], error['column']) for error in result.validation_summary['row_errors']]
+        # Data rows start on line 2; each copy of the four rows adds four lines.
+        expected = []
+        for copy in range(21):
+            expected += [(4 + 4 * copy, 'Flowrate'), (5 + 4 * copy, 'Pressure')]
+        self.assertEqual(sorted(rows), sorted(expected))
+
+    def test_row_limit_is_enforced_inside_a_chunk(self):
+        sink = mock.Mock()
+        result, error = ingest_csv(
+            io.BytesIO(self.CONTENT), max_rows=6, chunk_size=4, sink=sink
+        )
+        self.assertIsNone(result)
+        self.assertEqual(error, {'error': 'CSV exceeds maximum row limit (6).'})
+        # The first chunk was within the limit; the second one is not consumed.
+        self.assertEqual(sink.append.call_count, 1)
+        self.assertEqual(self._ingest(chunk_size=100, max_rows=84)[1], None)
+        self.assertEqual(
+            self._ingest(chunk_size=100, max_rows=83)[1],
+            {'error': 'CSV exceeds maximum row limit (83).'},
+        )
+
+
+class AnalyticsAccumulatorTests(SimpleTestCase):
+    def _frame(self, rows=500, seed=7):
+        rng = np.random.default_rng(seed)
+        frame = pd.DataFrame({
+            'Equipment Name': [f'E-{idx}' for idx in range(rows)],
+            'Type': rng.choice(['Pump', 'Valve', 'Reactor'], rows),
+            'Flowrate': rng.normal(100, 25, rows),
+            'Pressure': rng.normal(5, 1, rows),
+            'Temperature': rng.normal(110, 8, rows),
+        })
+        frame.loc[::17, 'Flowrate'] = np.nan
+        return frame
+
+    def _parts(self, frame, sizes):
+        bounds = np.cumsum([0, *sizes])
+        return [
+            AnalyticsAccumulator.from_dataframe(frame.iloc[start:stop])
+            for start, stop in zip(bounds, bounds[1:])
+        ]
+
+    def test_merge_is_associative(self):
+        a, b, c = self._parts(self._frame(), [120, 1, 379])
+        left = a.merge(b).merge(c).finalize()
+        right = a.merge(b.merge(c)).finalize()
+        assert_close(self, left, right)
+        assert_close(self, AnalyticsAccumulator().merge(a).finalize(), a.finalize())
+
+    def test_chunked_matches_a_single_frame(self):
+        frame = self._frame()
+        single = AnalyticsAccumulator.from_dataframe(frame)
+        chunked = AnalyticsAccumulator()
+        for part in self._parts(frame, [7] * 71 + [3]):
+            chunked = chunked.merge(part)
+
+        self.assertEqual(chunked.finalize()['type_distribution'], single.finalize()['type_distribution'])
+        for col in NUMERIC_COLUMNS:
+            values = frame[col].dropna()
+            self.assertEqual(chunked.columns[col].count, len(values))
+            self.assertAlmostEqual(chunked.columns[col].average, values.mean(), places=9)
+            self.assertAlmostEqual(chunked.columns[col].variance, values.var(), places=7)
+            for label, group in frame.groupby('Type'):
+                stats = chunked.by_type[label].columns[col]
+                self.assertAlmostEqual(stats.average, group[col].mean(), places=9)
+                self.assertAlmostEqual(stats.variance, group[col].var(), places=7)
+
+    def test_components_round_trip(self):
+        accumulator = AnalyticsAccumulator.from_dataframe(self._frame())
+        restored = AnalyticsAccumulator.from_components(
+            json.loads(json.dumps(accumulator.components()))
+        )
+        summary, expected = restored.finalize(), accumulator.finalize()
+        self.assertEqual(summary['components'], expected['components'])
+        for label, stats in expected['type_stats'].items():
+            for col in NUMERIC_COLUMNS:
+                # Sketches are not part of the components.
+                for key in ('count', 'mean', 'std', 'min', 'max'):
+                    self.assertEqual(summary['type_stats'][label][col][key], stats[col][key])
+
+        # Components stored before per-Type counters still finalize.
+        legacy = accumulator.components()
+        del legacy['by_type']
+        self.assertEqual(AnalyticsAccumulator.from_components(legacy).finalize()['type_stats'], {})
+
+
+class ColumnarTests(DatasetAPITestCase):
+    FRAMES = [
+        pd.DataFrame({
+            'Equipment Name': ['Pump-1', 'Pümpe-β', ''],
+            'Type': ['Pump', '泵', 'Valve'],
+            'Flowrate': [120.5, -0.0, 1e300],
+            'Pressure': [5.2, 0.0, -4.25],
+            'Temperature': [110.0, 2.0 ** -40, 105.0],
+        }),
+        pd.DataFrame(columns=REQUIRED_COLUMNS),
+        pd.DataFrame({
+            'Equipment Name': ['Reactor, "main"'],
+            'Type': ['Reactor'],
+            'Flowrate': [0.1],
+            'Pressure': [6.3],
+            'Temperature': [140.0],
+        }),
+    ]
+
+    def _dataset(self):
+        writer = ColumnarWriter()
+        for frame in self.FRAMES:
+            writer.append(frame)
+        return ColumnarDataset.open_directory(writer.seal())
+
+    def test_numeric_columns_round_trip(self):
+        dataset = self._dataset()
+        self.assertEqual(dataset.rows, 4)
+        expected = pd.concat(self.FRAMES, ignore_index=True)
+        for col in NUMERIC_COLUMNS:
+            values = dataset.column(col)
+            self.assertEqual(values.dtype, np.float64)
+            self.assertEqual(values.tolist(), expected[col].astype(float).tolist())
+            self.assertEqual(dataset.column(col, 1, 3).tolist(), values[1:3].tolist())
+
+    def test_text_columns_round_trip(self):
+        dataset = self._dataset()
+        expected = pd.concat(self.FRAMES, ignore_index=True)
+        for col in ('Equipment Name', 'Type'):
+            self.assertEqual(dataset.column(col).tolist(), expected[col].tolist())
+            # Slices start and end on any offset, including empty values.
+            for start, stop in ((0, 0), (1, 3), (2, 3), (3, 4), (3, 99), (4, 5), (-1, None)):
+                self.assertEqual(
+                    dataset.column(col, start, stop).tolist(),
+                    expected[col].tolist()[start:stop],
+                    (col, start, stop),
+                )
+
+    def test_concurrent_installs_of_the_same_sidecar(self):
+        csv_path = Path(settings.MEDIA_ROOT) / 'shared.csv'
+        first, second = ColumnarWriter(), ColumnarWriter()
+        for writer in (first, second):
+            writer.append(self.FRAMES[0])
+        target = first.install(csv_path)
+
+        # The second request checked before the first one had installed.
+        staged = second.seal()
+        with mock.patch.object(Path, 'exists', return_value=False):
+            self.assertEqual(install_staged(staged, csv_path), target)
+        self.assertFalse(staged.exists())
+        self.assertEqual(ColumnarDataset.open(csv_path).rows, 3)
+
+        # A target that is not a sidecar is still an error.
+        shutil.rmtree(target)
+        target.mkdir()
+        (target / 'stray').write_bytes(b'')
+        staged = ColumnarWriter().seal()
+        with mock.patch.object(Path, 'exists', return_value=False), \
+                self.assertRaises(OSError):
+            install_staged(staged, csv_path)
+
+    def test_read_rows_at_the_edges(self):
+        upload = DatasetUpload.objects.get(id=self._upload())
+        names = ['Pump-1', 'Valve-1']
+        for start, stop in ((0, 0), (0, 1), (1, 2), (1, 99), (2, 3), (5, 9)):
+            total, records, error = read_rows(upload, ['Equipment Name'], start, stop)
+            self.assertIsNone(error)
+            self.assertEqual(total, 2)
+            self.assertEqual(
+                [record['Equipment Name'] for record in records], names[start:stop]
+            )
+
+    def test_missing_sidecar_is_rebuilt_from_the_csv(self):
+        upload = DatasetUpload.objects.get(id=self._upload())
+        expected = read_rows(upload, REQUIRED_COLUMNS, 0, None)
+        remove_sidecars(upload.file.path)
+
+        with mock.patch('api.datasets.columnar.ingest_csv', wraps=ingest_csv) as ingest:
+            self.assertEqual(read_rows(upload, REQUIRED_COLUMNS, 0, None), expected)
+            self.assertEqual(read_rows(upload, REQUIRED_COLUMNS, 0, None), expected)
+        ingest.assert_called_once()
+        self.assertTrue(sidecar_path(upload.file.path).exists())
+
+        # A sidecar built with a stored rule set is not rebuilt with the defaults.
+        ValidationRuleSet.objects.create(
+            site='north', rules={'ranges': [{'column': 'Flowrate', 'min': 0}]}
+        )
+        rule_set_upload = DatasetUpload.objects.get(
+            id=self._upload('north.csv', SAMPLE_CSV + b'Pump-9,Pump,1,1,1\n', site='north')
+        )
+        remove_sidecars(rule_set_upload.file.path)
+        self.assertEqual(
+            read_rows(rule_set_upload, REQUIRED_COLUMNS, 0, None),
+            (None, None, 'Accepted rows for this upload are no longer available.'),
+        )
+
+
+class ReportCacheTests(DatasetAPITestCase):
+    def _entries(self):
+        return sorted(path.name for path in Path(settings.CHEMVIZ_REPORT_CACHE_DIR).glob('*.pdf'))
+
+    @override_settings(CHEMVIZ_REPORT_CACHE_MAX_BYTES=300)
+    def test_least_recently_used_entry_is_evicted(self):
+        paths = [report_cache.store_report(upload_id, 1, b'x' * 100) for upload_id in (1, 2, 3)]
+        for age, path in enumerate(paths):
+            os.utime(path, (1000 + age, 1000 + age))
+        # A hit makes report 1 the most recently used.
+        self.assertEqual(report_cache.get_cached_report(1, 1), paths[0])
+
+        report_cache.store_report(4, 1, b'x' * 100)
+        self.assertEqual(
+            self._entries(), ['report-1-v1.pdf', 'report-3-v1.pdf', 'report-4-v1.pdf']
+        )
+        self.assertIsNone(report_cache.get_cached_report(2, 1))
+
+    @override_settings(CHEMVIZ_REPORT_CACHE_MAX_BYTES=250)
+    def test_cache_stays_under_its_size_cap(self):
+        for upload_id in range(1, 6):
+            report_cache.store_report(upload_id, 1, b'x' * 100)
+            entries = Path(settings.CHEMVIZ_REPORT_CACHE_DIR).glob('*.pdf')
+            self.assertLessEqual(sum(path.stat().st_size for path in entries), 250)
+        self.assertEqual(len(self._entries()), 2)
+
+        # A report larger than the cap is still kept, alone.
+        report_cache.store_report(6, 1, b'x' * 400)
+        self.assertEqual(self._entries(), ['report-6-v1.pdf'])
+
+    def test_template_version_change_renders_again(self):
+        upload = DatasetUpload.objects.get(id=self._upload())
+        with mock.patch('api.datasets.reports.render_report_pdf', return_value=b'%PDF v2') as render:
+            first = report_file(upload)
+            self.assertEqual(report_file(upload), first)
+            render.assert_called_once()
+
+            etag = report_etag(upload)
+            with mock.patch('api.datasets.reports.REPORT_TEMPLATE_VERSION', 99):
+                self.assertNotEqual(report_etag(upload), etag)
+                self.assertEqual(report_file(upload).name, f'report-{upload.id}-v99.pdf')
+            self.assertEqual(render.call_count, 2)
+        self.assertEqual(self._entries(), [f'report-{upload.id}-v99.pdf'])
+
+    def test_rule_change_keeps_reports_of_existing_uploads(self):
+        upload = DatasetUpload.objects.get(id=self._upload())
+        with mock.patch('api.datasets.reports.render_report_pdf', return_value=b'%PDF') as render:
+            path = report_file(upload)
+            etag = report_etag(upload)
+            # The upload keeps the summary and rows it was validated with,
+            # so its report does not change with the rules.
+            ValidationRuleSet.objects.create(
+                site='', rules={'ranges': [{'column': 'Flowrate', 'max': 100}]}
+            )
+            self.assertEqual(report_file(upload), path)
+            self.assertEqual(report_etag(upload), etag)
+            render.assert_called_once()
+
+            # The same file under the new rules is a new upload with its own report.
+            again = DatasetUpload.objects.get(id=self._upload())
+            self.assertNotEqual(again.summary['validation'], upload.summary['validation'])
+            self.assertNotEqual(report_file(again), path)
+            self.assertEqual(render.call_count, 2)
+
+
+class ReportJobTests(DatasetAPITestCase):
+    def _job(self, upload_id, status, age, started_age=None):
+        job = ReportJob.objects.create(
+            user=self.user, upload_id=upload_id, template_version=1, status=status
+        )
+        now = timezone.now()
+        ReportJob.objects.filter(id=job.id).update(
+            created_at=now - age,
+            started_at=None if started_age is None else now - started_age,
+        )
+        return job
+
+    def _status(self, job):
+        job.refresh_from_db()
+        return job.status
+
+    def test_job_renders_the_report_once(self):
+        upload_id = self._upload()
+        response = self.client.post(
+            '/api/datasets/report/jobs/', {'upload_id': upload_id}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['id']
+        self.assertEqual(response.json()['status'], 'succeeded')
+
+        response = self.client.get(f'/api/datasets/report/jobs/{job_id}/')
+        self.assertEqual(response.json()['download_url'], f'/api/datasets/report/jobs/{job_id}/pdf/')
+        response = self.client.get(response.json()['download_url'])
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+        # The report is cached now, so another job completes without rendering.
+        with mock.patch('api.datasets.jobs.render_report_pdf') as render:
+            response = self.client.post(
+                '/api/datasets/report/jobs/', {'upload_id': upload_id}, format='json'
+            )
+        self.assertEqual(response.json()['status'], 'succeeded')
+        render.assert_not_called()
+
+    def test_unfinished_and_foreign_jobs_are_not_served(self):
+        upload_id = self._upload()
+        pending = ReportJob.objects.create(user=self.user, upload_id=upload_id, template_version=1)
+        response = self.client.get(f'/api/datasets/report/jobs/{pending.id}/pdf/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['status'], 'pending')
+
+        self.client.force_authenticate(
+            get_user_model().objects.create_user(username='other', password='Secret123')
+        )
+        response = self.client.post(
+            '/api/datasets/report/jobs/', {'upload_id': upload_id}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+        for url in (
+            f'/api/datasets/report/jobs/{pending.id}/',
+            f'/api/datasets/report/jobs/{pending.id}/pdf/',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+    @override_settings(CHEMVIZ_REPORT_WORKERS=1, CHEMVIZ_REPORT_JOB_TIMEOUT_SECONDS=600)
+    def test_starting_the_pool_fails_jobs_left_running_by_a_dead_process(self):
+        upload_id = self._upload()
+        hour, moment = timedelta(hours=1), timedelta(seconds=5)
+        stale = self._job(upload_id, ReportJob.STATUS_RUNNING, hour, started_age=hour)
+        # Queued for an hour behind a backlog, started just now.
+        fresh = self._job(upload_id, ReportJob.STATUS_RUNNING, hour, started_age=moment)
+        queued = self._job(upload_id, ReportJob.STATUS_PENDING, hour)
+        done = self._job(upload_id, ReportJob.STATUS_SUCCEEDED, hour, started_age=hour)
+
+        with mock.patch.object(jobs, '_executor', None):
+            self.addCleanup(jobs._get_executor().shutdown)
+
+        self.assertEqual(self._status(stale), ReportJob.STATUS_FAILED)
+        self.assertTrue(stale.error)
+        self.assertIsNotNone(stale.finished_at)
+        self.assertEqual(self._status(fresh), ReportJob.STATUS_RUNNING)
+        self.assertEqual(self._status(queued), ReportJob.STATUS_PENDING)
+        self.assertEqual(self._status(done), ReportJob.STATUS_SUCCEEDED)
+
+        # A job left pending still renders once a worker claims it.
+        jobs.run_report_job(queued.id)
+        self.assertEqual(self._status(queued), ReportJob.STATUS_SUCCEEDED)
+        self.assertIsNotNone(queued.started_at)
+
+    @override_settings(CHEMVIZ_REPORT_JOB_TIMEOUT_SECONDS=600)
+    def test_polling_a_stale_job_reports_it_failed(self):
+        upload_id = self._upload()
+        hour = timedelta(hours=1)
+        for job, expected in (
+            (self._job(upload_id, ReportJob.STATUS_PENDING, hour), 'pending'),
+            (self._job(upload_id, ReportJob.STATUS_RUNNING, hour, timedelta(seconds=5)), 'running'),
+            (self._job(upload_id, ReportJob.STATUS_RUNNING, hour, hour), 'failed'),
+            # Started before started_at was recorded.
+            (self._job(upload_id, ReportJob.STATUS_RUNNING, hour), 'failed'),
+        ):
+            response = self.client.get(f'/api/datasets/report/jobs/{job.id}/')
+            self.assertEqual(response.json()['status'], expected)
+        self.assertTrue(response.json()['error'])
+
+
+class ValidationRuleSetTests(DatasetAPITestCase):
+    CSV = (
+        b'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+        b'Pump-1,Pump,120,5,180\n'
+        b'Valve-1,Valve,60,4,180\n'
+        b'Valve-2,Valve,600,4,90\n'
+    )
+
+    def setUp(self):
+        super().setUp()
+        ValidationRuleSet.objects.create(
+            site='north',
+            rules={
+                'ranges': [
+                    {'column': 'Flowrate', 'min': 0},
+                    {'column': 'Flowrate', 'type': 'Valve', 'min': 0, 'max': 100},
+                    {'column': 'Temperature', 'min': -50, 'max': 500},
+                    {'column': 'Temperature', 'type': 'Pump', 'max': 150},
+                ]
+            },
+        )
+
+    def _validation(self, upload_id):
+        return DatasetUpload.objects.get(id=upload_id).summary['validation']
+
+    def test_site_rules_apply_per_type(self):
+        validation = self._validation(self._upload(content=self.CSV, site='north'))
+        self.assertEqual(validation['accepted_rows'], 1)
+        self.assertEqual(validation['out_of_range'], {'Flowrate': 1, 'Pressure': 0, 'Temperature': 1})
+        self.assertEqual(
+            validation['row_errors'],
+            [
+                {'row': 4, 'column': 'Flowrate', 'message': 'Value must be between 0 and 100 for Valve'},
+                {'row': 2, 'column': 'Temperature', 'message': 'Value must be <= 150 for Pump'},
+            ],
+        )
+        self.assertEqual(validation['rule_set'], {'site': 'north', 'version': 1})
+
+    def test_other_sites_use_default_rules(self):
+        validation = self._validation(self._upload(content=self.CSV, site='south'))
+        self.assertEqual(validation['accepted_rows'], 3)
+        self.assertNotIn('rule_set', validation)
+
+    def test_edits_bump_the_version(self):
+        rule_set = ValidationRuleSet.objects.get(site='north')
+        rule_set.rules = {'ranges': [{'column': 'Flowrate', 'min': 0}]}
+        rule_set.save()
+
+        validation = self._validation(self._upload(content=self.CSV, site='north'))
+        self.assertEqual(validation['accepted_rows'], 3)
+        self.assertEqual(validation['rule_set'], {'site': 'north', 'version': 2})
+
+
+def _row_by_row(frame, rules):
+    """
+    ``(accepted, counts, row_errors)`` from checking each row against each
+    rule in turn, as uploads were validated before ``CompiledRules``.
+    """
+    accepted, counts, errors = 0, [0] * len(rules), [[] for _ in rules]
+    for position, row in enumerate(frame.to_dict(orient='records')):
+        valid = True
+        for idx, rule in enumerate(rules):
+            text = row[rule.column]
+            blank = pd.isna(text) or not str(text).strip()
+            try:
+                number = float(text)
+            except (TypeError, ValueError):
+                number = None
+            if rule.kind == MISSING:
+                failed = blank
+            elif rule.kind == INVALID:
+                failed = number is None and not blank
+            else:
+                minimum, maximum = rule.minimum, rule.maximum
+                for label, type_minimum, type_maximum in rule.by_type:
+                    if label == row['Type']:
+                        minimum, maximum = type_minimum, type_maximum
+                failed = number is not None and (
+                    (minimum is not None and number < minimum)
+                    or (maximum is not None and number > maximum)
+                )
+            if failed:
+                valid = False
+                counts[idx] += 1
+                message = rule.message_for(row['Type']) if rule.by_type else rule.message
+                errors[idx].append({'row': position + 2, 'column': rule.column, 'message': message})
+        accepted += valid
+    row_errors = [error for found in errors for error in found][:MAX_ROW_ERRORS]
+    return accepted, counts, row_errors
+
+
+class RuleEngineEquivalenceTests(DatasetAPITestCase):
+    """The vectorised rule engine against a plain per-row loop."""
+
+    def _check(self, rules, data, chunk_size):
+        frame = pd.read_csv(io.BytesIO(data), dtype=str)
+        accepted, counts, row_errors = _row_by_row(frame, rules.rules)
+        result, error = ingest_csv(
+            io.BytesIO(data), max_rows=len(frame), chunk_size=chunk_size, rules=rules
+        )
+        self.assertIsNone(error)
+        summary = result.validation_summary
+        self.assertEqual(summary['accepted_rows'], accepted)
+        self.assertEqual(summary['row_errors'], row_errors)
+        keys = {MISSING: 'missing_values', INVALID: 'invalid_values', RANGE: 'out_of_range'}
+        for rule, count in zip(rules.rules, counts):
+            self.assertEqual(summary[keys[rule.kind]][rule.column], count, rule)
+        return summary
+
+    def test_default_rules(self):
+        data = _synthetic_csv(3000, bad_fraction=0.02, seed=1)
+        summary = self._check(compile_rules(), data, chunk_size=700)
+        # The bench's copy of the original mask loop agrees on what is accepted.
+        frame = pd.read_csv(io.BytesIO(data), dtype=str)
+        self.assertEqual(summary['accepted_rows'], _legacy_validate(frame))
+
+    def test_stored_rule_set_with_per_type_bounds(self):
+        rule_set = ValidationRuleSet.objects.create(
+            site='north',
+            rules={
+                'ranges': [
+                    {'column': 'Flowrate', 'min': 0, 'max': 350},
+                    {'column': 'Flowrate', 'type': 'Pump', 'min': 50, 'max': 300},
+                    {'column': 'Pressure', 'type': 'Valve', 'max': 15},
+                    {'column': 'Temperature', 'min': -50, 'max': 500},
+                    {'column': 'Temperature', 'type': 'Reactor', 'min': 0},
+                ]
+            },
+        )
+        data = _synthetic_csv(3000, bad_fraction=0.005, seed=2)
+        summary = self._check(compile_rule_set(rule_set), data, chunk_size=700)
+        messages = {error['message'] for error in summary['row_errors']}
+        self.assertIn('Value must be between 50 and 300 for Pump', messages)
+        self.assertEqual(summary['rule_set'], {'site': 'north', 'version': 1})
+
+
+class DatabaseProfileTests(SimpleTestCase):
+    def _settings(self, **env):
+        """The project settings module evaluated with ``env``."""
+        environ = {
+            key: value for key, value in os.environ.items() if not key.startswith('CHEMVIZ_')
+        }
+        with mock.patch.dict(os.environ, {**environ, **env}, clear=True):
+            return runpy.run_path(str(Path(settings.BASE_DIR) / 'chemviz' / 'settings.py'))
+
+    def test_sqlite_profile(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = f'{directory}/profile.sqlite3'
+        config = self._settings(CHEMVIZ_SQLITE_PATH=path)['DATABASES']['default']
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+        handler = ConnectionHandler({'default': config, 'profile': config})
+        connections['profile'] = handler['profile']
+        self.addCleanup(connections.__delitem__, 'profile')
+        self.addCleanup(connections['profile'].close)
+        with connections['profile'].cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'busy_timeout', 'synchronous')
+            }
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'busy_timeout': 20000, 'synchronous': 1})
+
+        # The write lock is taken when the transaction begins, before any write.
+        with transaction.atomic(using='profile'):
+            other = sqlite3.connect(path, timeout=0)
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'database is locked'):
+                other.execute('BEGIN IMMEDIATE')
+            other.close()
+
+    def test_postgres_profile(self):
+        config = self._settings(
+            CHEMVIZ_DB_PROFILE='postgres', CHEMVIZ_DB_NAME='plant', CHEMVIZ_DB_CONN_MAX_AGE='120'
+        )['DATABASES']['default']
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['NAME'], 'plant')
+        self.assertEqual(config['CONN_MAX_AGE'], 120)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+
+    def test_unknown_profile_is_refused(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "not 'mysql'"):
+            self._settings(CHEMVIZ_DB_PROFILE='mysql')
+
+
+class ContentDeduplicationTests(DatasetAPITestCase):
+    def test_reupload_reuses_summary_and_file(self):
+        first_id = self._upload('monday.csv')
+        with mock.patch('api.datasets.views.ingest_csv') as ingest:
+            response = self.client.post(
+                '/api/datasets/upload/',
+                {'file': SimpleUploadedFile('tuesday.csv', SAMPLE_CSV, content_type='text/csv')},
+                format='multipart',
+            )
+        ingest.assert_not_called()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['duplicate_of'], first_id)
+
+        first = DatasetUpload.objects.get(id=first_id)
+        second = DatasetUpload.objects.get(id=response.json()['id'])
+        self.assertEqual(second.name, 'tuesday.csv')
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(second.summary, first.summary)
+        self.assertTrue(first.file.name.endswith(f'{first.content_hash}.csv'))
+
+    def test_shared_file_outlives_all_but_last_upload(self):
+        first = DatasetUpload.objects.get(id=self._upload())
+        second = DatasetUpload.objects.get(id=self._upload())
+        csv_path = Path(first.file.path)
+        self.assertTrue(sidecar_path(csv_path).exists())
+
+        first.delete()
+        self.assertTrue(csv_path.exists())
+        self.assertEqual(self.client.get('/api/datasets/latest/').json()['id'], second.id)
+
+        second.delete()
+        self.assertFalse(csv_path.exists())
+        self.assertFalse(sidecar_path(csv_path).exists())
+
+    def test_release_keeps_a_file_claimed_during_it(self):
+        first = DatasetUpload.objects.get(id=self._upload())
+        csv_path = Path(first.file.path)
+        remove = retention._remove_unshared
+
+        def _claimed_meanwhile(model, path):
+            # A re-upload reuses the file after the release's first check.
+            DatasetUpload.objects.create(user=self.user, name='again.csv', file=path)
+            return remove(model, path)
+
+        with mock.patch.object(retention, '_remove_unshared', side_effect=_claimed_meanwhile):
+            DatasetUpload.objects.filter(id=first.id).delete()
+            retention._release([first.id], [first.file.name])
+        self.assertEqual(csv_path.read_bytes(), SAMPLE_CSV)
+        self.assertEqual(list(csv_path.parent.glob('*.released')), [])
+
+    def test_reupload_stores_a_file_released_during_it(self):
+        first = DatasetUpload.objects.get(id=self._upload())
+        csv_path = Path(first.file.path)
+        is_reusable = views._is_reusable
+
+        def _released_meanwhile(previous, rules):
+            reusable = is_reusable(previous, rules)
+            csv_path.unlink()
+            return reusable
+
+        with mock.patch.object(views, '_is_reusable', side_effect=_released_meanwhile):
+            self._upload('again.csv')
+        self.assertEqual(csv_path.read_bytes(), SAMPLE_CSV)
+
+    def test_other_users_share_the_file_but_not_the_summary(self):
+        first = DatasetUpload.objects.get(id=self._upload())
+        other = get_user_model().objects.create_user(username='other', password='Secret123')
+        self.client.force_authenticate(other)
+        response = self.client.post(
+            '/api/datasets/upload/',
+            {'file': SimpleUploadedFile('copy.csv', SAMPLE_CSV, content_type='text/csv')},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('duplicate_of', response.json())
+        self.assertEqual(DatasetUpload.objects.get(id=response.json()['id']).file.name, first.file.name)
+
+
+class BatchUploadTests(DatasetAPITestCase):
+    OTHER_CSV = SAMPLE_CSV.replace(b'Pump-2', b'Pump-3')
+
+    def _batch(self, *files):
+        return self.client.post(
+            '/api/datasets/upload/batch/',
+            {'files': [SimpleUploadedFile(name, content) for name, content in files]},
+            format='multipart',
+        )
+
+    def test_batch_of_csvs_and_zip(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('exports/b.csv', self.OTHER_CSV)
+            zf.writestr('exports/empty.csv', b'')
+            zf.writestr('__MACOSX/exports/._b.csv', b'junk')
+
+        response = self._batch(
+            ('a.csv', SAMPLE_CSV),
+            ('notes.txt', b'hello'),
+            ('day.zip', archive.getvalue()),
+            ('a-again.csv', SAMPLE_CSV),
+        )
+        self.assertEqual(response.status_code, 201)
+        body = response.json()
+        self.assertEqual(
+            [(r['file'], r['status']) for r in body['results']],
+            [
+                ('a.csv', 'created'),
+                ('notes.txt', 'rejected'),
+                ('b.csv', 'created'),
+                ('empty.csv', 'rejected'),
+                ('a-again.csv', 'created'),
+            ],
+        )
+        self.assertEqual((body['created'], body['rejected']), (3, 2))
+        self.assertEqual(body['results'][4]['duplicate_of'], body['results'][0]['id'])
+        self.assertEqual(body['results'][2]['summary']['total_equipment'], 2)
+        self.assertEqual(self.client.get('/api/datasets/latest/').json()['id'], body['results'][4]['id'])
+
+    def test_zip_members_are_extracted_to_temporary_files(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('a.csv', SAMPLE_CSV)
+            zf.writestr('b.csv', self.OTHER_CSV)
+            zf.writestr('big.csv', SAMPLE_CSV * 10)
+
+        sources = []
+
+        def _ingest_many(pairs, rules):
+            sources.extend(source for source, _ in pairs)
+            self.assertTrue(all(Path(source).is_file() for source in sources))
+            return ingest_many(pairs, rules)
+
+        with override_settings(CHEMVIZ_UPLOAD_MAX_BYTES=len(SAMPLE_CSV) * 2), \
+                mock.patch.object(views, 'ingest_many', side_effect=_ingest_many):
+            response = self._batch(('day.zip', archive.getvalue()))
+        body = response.json()
+        self.assertEqual(
+            [(r['file'], r['status']) for r in body['results']],
+            [('a.csv', 'created'), ('b.csv', 'created'), ('big.csv', 'rejected')],
+        )
+        self.assertEqual(len(sources), 2)
+        self.assertTrue(all(isinstance(source, str) for source in sources))
+        self.assertFalse(any(Path(source).exists() for source in sources))
+
+    def test_retention_runs_once_per_batch(self):
+        files = [(f'f{idx}.csv', SAMPLE_CSV.replace(b'Pump-1', f'P{idx}'.encode())) for idx in range(7)]
+        with mock.patch.object(retention, 'sweep', wraps=retention.sweep) as sweep:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self._batch(*files)
+        self.assertEqual(response.json()['created'], 7)
+        sweep.assert_called_once_with(user_ids=[self.user.id])
+        self.assertEqual(DatasetUpload.objects.filter(user=self.user).count(), 5)
+
+    def test_rejects_oversized_batches(self):
+        with override_settings(CHEMVIZ_BATCH_MAX_FILES=2):
+            response = self._batch(*[(f'f{idx}.csv', SAMPLE_CSV) for idx in range(3)])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Batch exceeds maximum of 2 files.')
+
+
+class CompressedUploadTests(DatasetAPITestCase):
+    def _zip(self, *members):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, content in members:
+                zf.writestr(name, content)
+        return archive.getvalue()
+
+    def test_gzip_upload_is_stored_compressed(self):
+        plain = DatasetUpload.objects.get(id=self._upload())
+        upload = DatasetUpload.objects.get(
+            id=self._upload('equipment.csv.gz', gzip.compress(SAMPLE_CSV, mtime=0))
+        )
+        self.assertTrue(upload.file.name.endswith(f'{upload.content_hash}.csv.gz'))
+        self.assertEqual(Path(upload.file.path).read_bytes(), gzip.compress(SAMPLE_CSV, mtime=0))
+        self.assertEqual(upload.summary['compression'], 'gzip')
+        self.assertEqual(upload.summary['validation'], plain.summary['validation'])
+
+        # Sidecars are rebuilt from the compressed file when missing.
+        remove_sidecars(upload.file.path)
+        rows = self.client.get('/api/datasets/latest/').json()['rows']
+        self.assertEqual([row['Equipment Name'] for row in rows], ['Pump-1', 'Valve-1'])
+
+    def test_zip_must_hold_one_csv(self):
+        upload = DatasetUpload.objects.get(
+            id=self._upload('equipment.zip', self._zip(('equipment.csv', SAMPLE_CSV)))
+        )
+        self.assertEqual(upload.summary['total_equipment'], 2)
+
+        response = self.client.post(
+            '/api/datasets/upload/',
+            {'file': SimpleUploadedFile(
+                'two.zip', self._zip(('a.csv', SAMPLE_CSV), ('b.csv', SAMPLE_CSV))
+            )},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Zip uploads must contain exactly one .csv file.')
+
+    def test_decompressed_size_is_capped(self):
+        padded = SAMPLE_CSV + b'\n' * 100000
+        with override_settings(CHEMVIZ_UPLOAD_MAX_DECOMPRESSED_BYTES=64 * 1024):
+            response = self.client.post(
+                '/api/datasets/upload/',
+                {'file': SimpleUploadedFile('bomb.csv.gz', gzip.compress(padded))},
+                format='multipart',
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json()['error'], 'Decompressed CSV exceeds maximum size (0.0625 MB).'
+        )
+
+
+@override_settings(CHEMVIZ_UPLOAD_CHUNK_BYTES=64)
+class ResumableUploadTests(DatasetAPITestCase):
+    def _start(self, content=SAMPLE_CSV, filename='equipment.csv'):
+        response = self.client.post(
+            '/api/datasets/upload/sessions/',
+            {'filename': filename, 'size': len(content), 'name': 'Line 4'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def _put(self, session, content, start, end):
+        return self.client.put(
+            session['upload_url'],
+            content[start:end + 1],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(content)}',
+        )
+
+    def test_upload_resumes_from_the_stored_offset(self):
+        session = self._start()
+        self.assertEqual(self._put(session, SAMPLE_CSV, 0, 63).json()['offset'], 64)
+
+        # A retried range that already arrived is refused with the offset.
+        retry = self._put(session, SAMPLE_CSV, 0, 63)
+        self.assertEqual(retry.status_code, 409)
+        offset = self.client.get(session['upload_url']).json()['offset']
+        self.assertEqual(retry.json()['offset'], offset)
+
+        incomplete = self.client.post(session['complete_url'])
+        self.assertEqual(incomplete.status_code, 409)
+
+        while offset < len(SAMPLE_CSV):
+            end = min(offset + 63, len(SAMPLE_CSV) - 1)
+            offset = self._put(session, SAMPLE_CSV, offset, end).json()['offset']
+
+        response = self.client.post(session['complete_url'])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['name'], 'Line 4')
+        self.assertEqual(response.json()['summary']['total_equipment'], 2)
+        upload = DatasetUpload.objects.get(id=response.json()['id'])
+        self.assertEqual(Path(upload.file.path).read_bytes(), SAMPLE_CSV)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(staging_path(session['id']).exists())
+
+    def test_wrong_columns_are_rejected_with_the_first_range(self):
+        content = b'Name,Kind\n' + b'a,b\n' * 20
+        session = self._start(content)
+        response = self._put(session, content, 0, 63)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Missing column: Equipment Name')
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(staging_path(session['id']).exists())
+
+    def test_body_is_read_outside_the_transaction(self):
+        session = self._start()
+        depth = len(connection.atomic_blocks)
+
+        def _append(*args):
+            self.assertEqual(len(connection.atomic_blocks), depth)
+            return append_range(*args)
+
+        with mock.patch('api.datasets.views.append_range', side_effect=_append) as append:
+            self.assertEqual(self._put(session, SAMPLE_CSV, 0, 63).status_code, 200)
+        append.assert_called_once()
+
+    def test_range_in_flight_holds_the_offset(self):
+        session = self._start()
+        sessions = UploadSession.objects.filter(id=session['id'])
+        sessions.update(reserved_by=uuid.uuid4(), reserved_at=timezone.now())
+        busy = self._put(session, SAMPLE_CSV, 0, 63)
+        self.assertEqual(busy.status_code, 409)
+        self.assertEqual(busy.json(), {'error': 'Another range is still being uploaded.', 'offset': 0})
+
+        # A request that never finished loses the offset after the timeout.
+        sessions.update(reserved_at=timezone.now() - timedelta(seconds=301))
+        self.assertEqual(self._put(session, SAMPLE_CSV, 0, 63).json()['offset'], 64)
+        self.assertIsNone(sessions.get().reserved_by)
+
+    def _send(self, session, content, offset=0, stop=None):
+        """PUT ``content[offset:stop]`` in 64-byte ranges; the last response."""
+        stop = len(content) if stop is None else stop
+        while offset < stop:
+            response = self._put(session, content, offset, min(offset + 63, len(content) - 1))
+            if response.status_code != 200:
+                return response
+            offset = response.json()['offset']
+        return response
+
+    def test_rows_are_validated_as_ranges_arrive(self):
+        # Rows split across ranges, one of them by a quoted line break.
+        body = SAMPLE_CSV.split(b'\n', 1)[1]
+        content = SAMPLE_CSV + b'"Pump\n-3",Pump,abc,5.0,100\n' + body * 3
+        expected, _ = ingest_csv(io.BytesIO(content), max_rows=100, chunk_size=100)
+
+        session = self._start(content)
+        first = self._send(session, content, stop=128).json()
+        self.assertEqual(
+            first['validation'], {'total_rows': 2, 'accepted_rows': 2, 'rejected_rows': 0}
+        )
+        with mock.patch('api.datasets.views.ingest_csv') as ingest:
+            self._send(session, content, offset=first['offset'])
+            progress = self.client.get(session['upload_url']).json()['validation']
+            response = self.client.post(session['complete_url'])
+        ingest.assert_not_called()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(progress['total_rows'], 17)
+        upload = DatasetUpload.objects.get(id=response.json()['id'])
+        self.assertEqual(upload.summary['validation'], expected.validation_summary)
+        for key, value in expected.analytics.items():
+            self.assertEqual(upload.summary[key], value, key)
+        self.assertEqual(Path(upload.file.path).read_bytes(), content)
+        self.assertTrue(sidecar_path(upload.file.path).exists())
+        self.assertEqual(list(staging_path(session['id']).parent.iterdir()), [])
+
+    @override_settings(CHEMVIZ_UPLOAD_MAX_ROWS=3)
+    def test_row_limit_is_enforced_on_the_range_that_passes_it(self):
+        content = SAMPLE_CSV + SAMPLE_CSV.split(b'\n', 1)[1]
+        session = self._start(content)
+        self.assertEqual(self._send(session, content, stop=128).status_code, 200)
+        response = self._put(session, content, 128, 191)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'CSV exceeds maximum row limit (3).'})
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_ranges_are_checked(self):
+        session = self._start()
+        too_big = self._put(session, SAMPLE_CSV, 0, 99)
+        self.assertEqual(too_big.status_code, 413)
+        wrong_size = self.client.put(
+            session['upload_url'],
+            SAMPLE_CSV[:10],
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 0-9/999',
+        )
+        self.assertEqual(wrong_size.status_code, 400)
+
+
+class TypeStatsTests(DatasetAPITestCase):
+    PUMPS_CSV = (
+        b'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+        b'Pump-1,Pump,100,5,110\n'
+        b'Pump-2,Pump,120,6,120\n'
+        b'Pump-3,Pump,140,7,130\n'
+        b'Valve-1,Valve,60,4,105\n'
+    )
+
+    def test_stats_are_stored_per_type(self):
+        upload_id = self._upload(content=self.PUMPS_CSV)
+        pump = DatasetUpload.objects.get(id=upload_id).summary['type_stats']['Pump']
+        self.assertEqual(pump['count'], 3)
+        self.assertEqual(
+            pump['Flowrate'],
+            {
+                'count': 3, 'mean': 120.0, 'min': 100.0, 'max': 140.0, 'std': 20.0,
+                'p5': 102.0, 'p25': 110.0, 'p50': 120.0, 'p75': 130.0, 'p95': 138.0,
+            },
+        )
+        self.assertIsNone(
+            DatasetUpload.objects.get(id=upload_id).summary['type_stats']['Valve']['Flowrate']['std']
+        )
+
+        response = self.client.get(f'/api/datasets/stats/{upload_id}/', {'type': 'Valve,Compressor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()['types']), ['Valve'])
+        self.assertEqual(response.json()['quantiles'], ['p5', 'p25', 'p50', 'p75', 'p95'])
+
+    def test_older_summaries_are_backfilled_once(self):
+        upload = DatasetUpload.objects.get(id=self._upload(content=self.PUMPS_CSV))
+        expected = upload.summary.pop('type_stats')
+        upload.save()
+
+        response = self.client.get(f'/api/datasets/stats/{upload.id}/')
+        self.assertEqual(response.json()['types'], expected)
+        upload.refresh_from_db()
+        self.assertEqual(upload.summary['type_stats'], expected)
+
+
+class PercentileTests(DatasetAPITestCase):
+    def test_percentiles_merge_uploads(self):
+        first = self._upload(content=TypeStatsTests.PUMPS_CSV)
+        second = self._upload()
+        again = self._upload()  # the same file again is counted once
+
+        response = self.client.get('/api/datasets/percentiles/', {'q': '0,0.5,1'})
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['uploads'], [again, first])
+        self.assertEqual(body['skipped'], [second])
+        # Accepted flowrates: 100, 120, 140, 60 and 120.5, 60.
+        self.assertEqual(
+            body['columns']['Flowrate'],
+            {'count': 6, 'min': 60.0, 'max': 140.0, 'p0': 60.0, 'p50': 110.0, 'p100': 140.0},
+        )
+
+        response = self.client.get('/api/datasets/percentiles/', {'ids': str(second)})
+        self.assertEqual(response.json()['columns']['Flowrate']['p50'], 90.25)
+        self.assertEqual(
+            self.client.get('/api/datasets/percentiles/', {'q': '2'}).status_code, 400
+        )
+
+    def test_sketches_stay_out_of_responses(self):
+        upload_id = self._upload()
+        self.assertIn('sketches', DatasetUpload.objects.get(id=upload_id).summary)
+        self.assertNotIn(
+            'sketches', self.client.get('/api/datasets/summaries/').json()['results'][0]['summary']
+        )
+
+
+class AggregateTests(DatasetAPITestCase):
+    def test_uploads_are_combined_with_deltas(self):
+        first = self._upload(content=TypeStatsTests.PUMPS_CSV)
+        second = self._upload()
+        again = self._upload()  # the same file again is counted once
+
+        response = self.client.get('/api/datasets/aggregate/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        combined = body['combined']
+        self.assertEqual(combined['total_equipment'], 6)
+        self.assertEqual(combined['type_distribution'], {'Pump': 4, 'Valve': 2})
+        flowrate = combined['columns']['Flowrate']
+        self.assertEqual((flowrate['count'], flowrate['min'], flowrate['max']), (6, 60.0, 140.0))
+        self.assertAlmostEqual(flowrate['mean'], 600.5 / 6)
+
+        self.assertEqual([entry['id'] for entry in body['uploads']], [again, second, first])
+        self.assertEqual(
+            body['uploads'][0]['delta'],
+            {
+                'total_equipment': 0,
+                'averages': {'Flowrate': 0.0, 'Pressure': 0.0, 'Temperature': 0.0},
+                'type_counts': {},
+            },
+        )
+        delta = body['uploads'][1]['delta']
+        self.assertEqual(delta['total_equipment'], -2)
+        self.assertEqual(delta['averages']['Flowrate'], 90.25 - 105.0)
+        self.assertEqual(delta['type_counts'], {'Pump': -2})
+        self.assertIsNone(body['uploads'][2]['delta'])
+
+        response = self.client.get('/api/datasets/aggregate/', {'ids': f'{first}', 'limit': 1})
+        self.assertEqual(response.json()['combined']['total_equipment'], 4)
+        self.assertEqual(
+            self.client.get('/api/datasets/aggregate/', {'limit': 0}).status_code, 400
+        )
+
+    def test_older_summaries_are_backfilled(self):
+        upload = DatasetUpload.objects.get(id=self._upload())
+        upload.summary.pop('components')
+        upload.save()
+
+        body = self.client.get('/api/datasets/aggregate/').json()
+        self.assertEqual(body['combined']['total_equipment'], 2)
+        upload.refresh_from_db()
+        self.assertIn('components', upload.summary)
+
+
+class SummaryListTests(DatasetAPITestCase):
+    def test_cursor_pages_through_every_upload(self):
+        ids = [self._upload(f'equipment-{idx}.csv') for idx in range(7)]
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+            with self.assertNumQueries(1):
+                body = self.client.get('/api/datasets/summaries/', params).json()
+            seen.extend(result['id'] for result in body['results'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, ids[::-1])
+
+        # Without parameters the listing is the five newest, as before.
+        body = self.client.get('/api/datasets/summaries/').json()
+        self.assertEqual([result['id'] for result in body['results']], ids[:-6:-1])
+        self.assertIsNotNone(body['next_cursor'])
+        self.assertEqual(
+            self.client.get('/api/datasets/summaries/', {'cursor': 'nope'}).status_code, 400
+        )
+
+    def test_fields_and_compact_shape(self):
+        self._upload()
+
+        response = self.client.get('/api/datasets/summaries/', {'fields': 'id,rejected_rows'})
+        self.assertEqual(list(response.json()['results'][0]), ['id', 'rejected_rows'])
+        self.assertEqual(response.json()['results'][0]['rejected_rows'], 2)
+
+        response = self.client.get('/api/datasets/summaries/', {'shape': 'compact'})
+        summary = response.json()['results'][0]['summary']
+        self.assertNotIn('validation', summary)
+        self.assertNotIn('type_stats', summary)
+        self.assertEqual(summary['total_equipment'], 2)
+
+        for params in ({'fields': 'id,secret'}, {'shape': 'tiny'}, {'limit': 0}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/datasets/summaries/', params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_backfilled_summary_changes_the_etag(self):
+        upload_id = self._upload()
+        # An upload stored before type stats existed.
+        upload = DatasetUpload.objects.get(id=upload_id)
+        old_summary = {
+            key: value for key, value in upload.summary.items()
+            if key not in ('type_stats', 'sketches', 'components')
+        }
+        DatasetUpload.objects.filter(id=upload_id).update(summary=old_summary)
+
+        response = self.client.get('/api/datasets/summaries/')
+        self.assertNotIn('type_stats', response.json()['results'][0]['summary'])
+        etag = response['ETag']
+
+        # Reading its type stats backfills the summary.
+        self.client.get(f'/api/datasets/stats/{upload_id}/')
+        response = self.client.get('/api/datasets/summaries/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('type_stats', response.json()['results'][0]['summary'])
+
+
+class RetentionTests(DatasetAPITestCase):
+    def _uploads(self, count):
+        return [
+            self._upload(f'f{idx}.csv', SAMPLE_CSV.replace(b'Pump-1', f'P{idx}'.encode()))
+            for idx in range(count)
+        ]
+
+    def test_user_tier_and_default_policies(self):
+        RetentionPolicy.objects.create(max_uploads=2)
+        tier = Group.objects.create(name='pro')
+        RetentionPolicy.objects.create(tier=tier, max_uploads=4)
+        RetentionPolicy.objects.create(tier=Group.objects.create(name='archive'), max_uploads=3)
+        self.user.groups.add(tier)
+        kept = self._uploads(6)[2:]
+
+        other = get_user_model().objects.create_user(username='other@example.com', password='x')
+        self.client.force_authenticate(other)
+        other_uploads = self._uploads(3)
+        # Room for about two of these CSVs, but the newest always stays.
+        RetentionPolicy.objects.create(user=other, max_total_bytes=2 * len(SAMPLE_CSV))
+        stranger = get_user_model().objects.create_user(username='third@example.com', password='x')
+        self.client.force_authenticate(stranger)
+        stranger_uploads = self._uploads(3)
+
+        result = retention.sweep(batch_size=2)
+        self.assertEqual((result.users, result.uploads), (3, 4))
+        uploads = DatasetUpload.objects.order_by('id')
+        self.assertEqual(list(uploads.filter(user=self.user).values_list('id', flat=True)), kept)
+        self.assertEqual(
+            list(uploads.filter(user=other).values_list('id', flat=True)), other_uploads[1:]
+        )
+        self.assertEqual(
+            list(uploads.filter(user=stranger).values_list('id', flat=True)), stranger_uploads[1:]
+        )
+
+    def test_age_limit_keeps_the_newest_upload(self):
+        RetentionPolicy.objects.create(max_age_days=30)
+        ids = self._uploads(3)
+        DatasetUpload.objects.update(uploaded_at=timezone.now() - timedelta(days=31))
+
+        retention.sweep(user_ids=[self.user.id])
+        self.assertEqual(list(DatasetUpload.objects.values_list('id', flat=True)), ids[-1:])
+
+    def test_size_limit_reads_the_size_column(self):
+        RetentionPolicy.objects.create(max_total_bytes=1000)
+        ids = self._uploads(3)
+        # The column, not the copy inside the summary JSON, is summed.
+        DatasetUpload.objects.filter(id=ids[1]).update(file_size_bytes=1000)
+        self.assertTrue(
+            all(upload.summary['file_size_bytes'] < 1000 for upload in DatasetUpload.objects.all())
+        )
+
+        retention.sweep(user_ids=[self.user.id])
+        self.assertEqual(list(DatasetUpload.objects.values_list('id', flat=True)), ids[-1:])
+
+    def test_command_removes_files_reports_and_sidecars(self):
+        ids = self._uploads(6)
+        oldest = DatasetUpload.objects.get(id=ids[0])
+        csv_path = Path(oldest.file.path)
+        self.client.get(f'/api/datasets/report/{oldest.id}/')
+        reports = Path(f'{oldest.file.storage.location}/reports')
+        self.assertTrue(list(reports.glob(f'report-{oldest.id}-v*.pdf')))
+
+        out = io.StringIO()
+        call_command('prune_uploads', '--dry-run', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Would remove 1 uploads of 1 users.')
+        self.assertTrue(DatasetUpload.objects.filter(id=oldest.id).exists())
+
+        call_command('prune_uploads', self.user.username, stdout=io.StringIO())
+        self.assertFalse(DatasetUpload.objects.filter(id=oldest.id).exists())
+        self.assertFalse(csv_path.exists())
+        self.assertFalse(sidecar_path(csv_path).exists())
+        self.assertFalse(list(reports.glob(f'report-{oldest.id}-v*.pdf')))
+        with self.assertRaises(CommandError):
+            call_command('prune_uploads', 'nobody')
+
+    def test_filters_run_on_summary_columns(self):
+        clean = self._upload(content=TypeStatsTests.PUMPS_CSV)
+        dirty = self._upload()
+        upload = DatasetUpload.objects.get(id=dirty)
+        self.assertEqual(
+            (upload.row_count, upload.accepted_rows, upload.rejected_rows, upload.total_equipment),
+            (4, 2, 2, 2),
+        )
+        self.assertEqual(upload.avg_flowrate, 90.25)
+
+        def _ids(**params):
+            body = self.client.get('/api/datasets/summaries/', {'fields': 'id', **params}).json()
+            return [result['id'] for result in body['results']]
+
+        self.assertEqual(_ids(rejected='false'), [clean])
+        self.assertEqual(_ids(rejected='true', min_rows=4, max_rows=4), [dirty])
+        self.assertEqual(_ids(min_rows=5), [])
+        self.assertEqual(
+            self.client.get('/api/datasets/summaries/', {'min_rows': 'x'}).status_code, 400
+        )
+
+
+class AsyncViewTests(DatasetAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=self.user).key}'}
+
+    def test_async_views_match_the_sync_ones(self):
+        upload_id = self._upload()
+        for sync_url, async_url, params in (
+            ('/api/datasets/summaries/', '/api/datasets/async/summaries/', {'shape': 'compact'}),
+            ('/api/datasets/latest/', '/api/datasets/async/latest/', {'columns': 'Type', 'offset': 1}),
+        ):
+            with self.subTest(url=async_url):
+                expected = self.client.get(sync_url, params)
+                response = self.client.get(async_url, params, **self.auth)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+                self.assertEqual(response['ETag'], expected['ETag'])
+                self.assertEqual(
+                    response.has_header('Last-Modified'), expected.has_header('Last-Modified')
+                )
+
+        response = self.client.get(f'/api/datasets/async/report/{upload_id}/', **self.auth)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        response = self.client.get(
+            f'/api/datasets/async/report/{upload_id}/',
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            **self.auth,
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get('/api/datasets/async/summaries/').status_code, 401)
+        response = self.client.get(
+            '/api/datasets/async/summaries/', HTTP_AUTHORIZATION='Token nope'
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_full_worker_pool_answers_503(self):
+        upload_id = self._upload()
+        with mock.patch.object(offload, 'run', side_effect=offload.OffloadBusy):
+            response = self.client.get(f'/api/datasets/async/report/{upload_id}/', **self.auth)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    def test_cancelled_call_keeps_its_slot_until_it_ends(self):
+        started, finish = threading.Event(), threading.Event()
+
+        def _slow():
+            started.set()
+            finish.wait(5)
+
+        async def _cancel_then_retry():
+            task = asyncio.ensure_future(offload.run(_slow))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            # The call is still running, so it still holds the only slot.
+            with self.assertRaises(offload.OffloadBusy):
+                await offload.run(int)
+            finish.set()
+            for _ in range(500):
+                try:
+                    return await offload.run(int)
+                except offload.OffloadBusy:
+                    await asyncio.sleep(0.01)
+
+        with override_settings(CHEMVIZ_OFFLOAD_MAX_PENDING=1), \
+                mock.patch.object(offload, '_pending', None):
+            self.assertEqual(async_to_sync(_cancel_then_retry)(), 0)
+
+    @override_settings(CHEMVIZ_OFFLOAD_WORKERS=1)
+    def test_workers_are_spawned_and_given_plain_values(self):
+        upload = DatasetUpload.objects.get(id=self._upload())
+        with mock.patch.object(offload, '_executor', None), \
+                mock.patch.object(offload, '_pending', None):
+            executor, _ = offload._get_executor()
+            self.addCleanup(executor.shutdown)
+            self.assertEqual(executor._mp_context.get_start_method(), 'spawn')
+
+            rows = async_to_sync(offload.run)(
+                read_stored_rows, upload.file.path, '', ['Equipment Name'], 0, 5
+            )
+            self.assertEqual(rows, (2, [{'Equipment Name': 'Pump-1'}, {'Equipment Name': 'Valve-1'}], None))
+            content = async_to_sync(offload.run)(render_source_pdf, ReportSource.of(upload))
+            self.assertTrue(content.startswith(b'%PDF'))
@@ -0,0 +1,96 @@
+"""
+Content hashing and content-addressed storage for uploaded CSVs.
+
+The hashing upload handlers (installed through ``FILE_UPLOAD_HANDLERS``)
+feed every chunk to BLAKE2b as Django receives it and set
+``content_hash`` on the resulting ``UploadedFile``, so identical uploads can
+be recognised without another pass over the file.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import (
+    MemoryFileUploadHandler,
+    TemporaryFileUploadHandler,
+)
+
+DIGEST_SIZE = 32
+
+
+def _new_hasher():
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+
+class _HashingMixin:
+    def new_file(self, *args, **kwargs):
+        # Before super(): the memory handler claims a file by raising
+        # StopFutureHandlers from new_file.
+        self._hasher = _new_hasher()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self._hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None:
+            uploaded.content_hash = self._hasher.hexdigest()
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(_HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(_HashingMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def content_hash(uploaded_file) -> str:
+    """The upload's BLAKE2b hex digest, hashing it now if no handler did."""
+    digest = getattr(uploaded_file, 'content_hash', None)
+    if digest:
+        return digest
+    hasher = _new_hasher()
+    for chunk in uploaded_file.chunks():
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    uploaded_file.content_hash = hasher.hexdigest()
+    return uploaded_file.content_hash
+
+
+def store_content_addressed(uploaded_file, digest: str, suffix: str = '.csv') -> str:
+    """
+    Save the upload as ``datasets/<aa>/<digest><suffix>`` unless that file
+    is already stored, and return the storage name to put on the model.
+    Compressed uploads keep their suffix and are stored as sent.
+    """
+    name = f'datasets/{digest[:2]}/{digest}{suffix}'
+    if default_storage.exists(name):
+        return name
+    return default_storage.save(name, uploaded_file)
+
+
+def restore_released(uploaded_file, name: str) -> bool:
+    """
+    Write the upload back to ``name`` if retention removed the stored file
+    while an upload referring to it was being created. Call it once that
+    upload is committed: a release that started earlier either sees the
+    new row and keeps the file, or has moved it away by now.
+    """
+    path = Path(default_storage.path(name))
+    if path.exists():
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    uploaded_file.seek(0)
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as staged:
+        for chunk in uploaded_file.chunks():
+            staged.write(chunk)
+    os.replace(staged.name, path)
+    uploaded_file.seek(0)
+    return True
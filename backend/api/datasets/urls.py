@@ -1,19 +1,48 @@
 from django.urls import path
 
+from . import async_views
 from .views import (
+    DatasetAggregateView,
+    DatasetBatchUploadView,
     DatasetLatestReportView,
     DatasetLatestRowsView,
+    DatasetPercentilesView,
     DatasetReportView,
     DatasetSummaryListView,
+    DatasetTypeStatsView,
     DatasetUploadView,
+    ReportJobCreateView,
+    ReportJobDetailView,
+    ReportJobDownloadView,
+    UploadSessionCompleteView,
+    UploadSessionCreateView,
+    UploadSessionView,
 )
 
 urlpatterns = [
     path('upload/', DatasetUploadView.as_view(), name='dataset-upload'),
+    path('upload/batch/', DatasetBatchUploadView.as_view(), name='dataset-upload-batch'),
+    path('upload/sessions/', UploadSessionCreateView.as_view(), name='dataset-upload-sessions'),
+    path('upload/sessions/<uuid:session_id>/', UploadSessionView.as_view(), name='dataset-upload-session'),
+    path(
+        'upload/sessions/<uuid:session_id>/complete/',
+        UploadSessionCompleteView.as_view(),
+        name='dataset-upload-session-complete',
+    ),
     path('summary/', DatasetSummaryListView.as_view(), name='dataset-summary'),
     path('history/', DatasetSummaryListView.as_view(), name='dataset-history'),
     path('summaries/', DatasetSummaryListView.as_view(), name='dataset-summaries'),
     path('latest/', DatasetLatestRowsView.as_view(), name='dataset-latest'),
+    path('aggregate/', DatasetAggregateView.as_view(), name='dataset-aggregate'),
+    path('percentiles/', DatasetPercentilesView.as_view(), name='dataset-percentiles'),
+    path('stats/<int:upload_id>/', DatasetTypeStatsView.as_view(), name='dataset-type-stats'),
     path('report/<int:upload_id>/', DatasetReportView.as_view(), name='dataset-report'),
     path('report/pdf/', DatasetLatestReportView.as_view(), name='dataset-report-latest'),
+    path('report/jobs/', ReportJobCreateView.as_view(), name='dataset-report-jobs'),
+    path('report/jobs/<uuid:job_id>/', ReportJobDetailView.as_view(), name='dataset-report-job'),
+    path('report/jobs/<uuid:job_id>/pdf/', ReportJobDownloadView.as_view(), name='dataset-report-job-pdf'),
+    # Async variants of the read endpoints, for ASGI deployments.
+    path('async/summaries/', async_views.summaries, name='dataset-summaries-async'),
+    path('async/latest/', async_views.latest_rows, name='dataset-latest-async'),
+    path('async/report/<int:upload_id>/', async_views.report, name='dataset-report-async'),
 ]
@@ -0,0 +1,276 @@
+"""
+Declarative row validation for uploaded CSVs.
+
+A rule set is an ordered tuple of ``Rule`` values. ``compile_rules`` turns it
+into a ``CompiledRules`` object that evaluates every rule over a chunk in one
+vectorised pass: each column is parsed and blank-checked once, all rule masks
+are stacked into a single boolean matrix, and only the first few offending
+rows per rule are ever turned into Python integers.
+"""
+
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .analytics import NUMERIC_COLUMNS, REQUIRED_COLUMNS
+
+MISSING = 'missing'
+INVALID = 'invalid'
+RANGE = 'range'
+
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+@dataclass(frozen=True)
+class Rule:
+    column: str
+    kind: str
+    message: str
+    minimum: float | None = None
+    maximum: float | None = None
+    # ``(type, minimum, maximum)`` overrides of the bounds for one
+    # equipment Type; other types use ``minimum``/``maximum``.
+    by_type: tuple = ()
+
+    def message_for(self, type_label) -> str:
+        for label, minimum, maximum in self.by_type:
+            if label == type_label:
+                return f'{_range_message(minimum, maximum)} for {label}'
+        return self.message
+
+
+def _range_message(minimum, maximum) -> str:
+    if minimum is None and maximum is None:
+        return 'Value out of range'
+    if maximum is None:
+        return f'Value must be >= {minimum:g}'
+    if minimum is None:
+        return f'Value must be <= {maximum:g}'
+    return f'Value must be between {minimum:g} and {maximum:g}'
+
+
+def required(column: str) -> Rule:
+    return Rule(column, MISSING, 'Missing value')
+
+
+def numeric(column: str) -> Rule:
+    return Rule(column, INVALID, 'Invalid numeric value')
+
+
+def value_range(column: str, minimum=None, maximum=None, message=None, by_type=()) -> Rule:
+    if message is None:
+        message = _range_message(minimum, maximum)
+    return Rule(column, RANGE, message, minimum, maximum, tuple(by_type))
+
+
+def rules_from_config(config: dict) -> tuple:
+    """
+    Build a rule tuple from the stored form of a rule set::
+
+        {"ranges": [
+            {"column": "Temperature", "min": -50, "max": 500},
+            {"column": "Temperature", "type": "Pump", "min": -20, "max": 150},
+        ]}
+
+    Entries without ``type`` are the defaults for their column. Required and
+    numeric checks are structural and always included. Raises ``ValueError``
+    on a malformed config.
+    """
+    if not isinstance(config, dict) or not isinstance(config.get('ranges', []), list):
+        raise ValueError('Rule set must be an object with a "ranges" list.')
+
+    defaults = {}
+    overrides = {col: {} for col in NUMERIC_COLUMNS}
+    for entry in config.get('ranges', []):
+        if not isinstance(entry, dict):
+            raise ValueError('Each range must be an object.')
+        column = entry.get('column')
+        if column not in NUMERIC_COLUMNS:
+            raise ValueError(f'Unknown range column: {column!r}')
+        bounds = []
+        for key in ('min', 'max'):
+            value = entry.get(key)
+            if value is not None and (
+                isinstance(value, bool) or not isinstance(value, (int, float))
+            ):
+                raise ValueError(f'{column} {key} must be a number.')
+            bounds.append(None if value is None else float(value))
+        if None not in bounds and bounds[0] > bounds[1]:
+            raise ValueError(f'{column} min is greater than max.')
+
+        type_label = entry.get('type')
+        target = defaults if type_label is None else overrides[column]
+        key = column if type_label is None else str(type_label)
+        if key in target:
+            raise ValueError(f'Duplicate range for {column}' + (f' / {type_label}' if type_label else ''))
+        target[key] = tuple(bounds)
+
+    ranges = []
+    for col in NUMERIC_COLUMNS:
+        if col not in defaults and not overrides[col]:
+            continue
+        minimum, maximum = defaults.get(col, (None, None))
+        ranges.append(
+            value_range(
+                col,
+                minimum,
+                maximum,
+                by_type=[(label, lo, hi) for label, (lo, hi) in overrides[col].items()],
+            )
+        )
+
+    return (
+        *(required(col) for col in REQUIRED_COLUMNS),
+        *(numeric(col) for col in NUMERIC_COLUMNS),
+        *ranges,
+    )
+
+
+DEFAULT_CONFIG = {
+    'ranges': [
+        {'column': 'Flowrate', 'min': 0},
+        {'column': 'Pressure', 'min': 0},
+        {'column': 'Temperature', 'min': -50, 'max': 500},
+    ]
+}
+
+# Rules are evaluated and row errors reported in this order.
+DEFAULT_RULES = rules_from_config(DEFAULT_CONFIG)
+
+
+@dataclass
+class RuleEvaluation:
+    counts: np.ndarray
+    # Per rule, positions (not index labels) of the first offending rows.
+    first_rows: list
+    valid: np.ndarray
+    numeric: dict
+
+
+class CompiledRules:
+    def __init__(self, rules, label=None):
+        self.rules = tuple(rules)
+        # Identifies the stored rule set these came from, if any.
+        self.label = label
+        self.blank_columns = list(dict.fromkeys(
+            rule.column for rule in self.rules if rule.kind in (MISSING, INVALID)
+        ))
+        self.numeric_columns = list(dict.fromkeys(
+            rule.column for rule in self.rules if rule.kind in (INVALID, RANGE)
+        ))
+        self.type_labels = list(dict.fromkeys(
+            label for rule in self.rules for label, _, _ in rule.by_type
+        ))
+        # Per range rule, lower and upper bound lookup tables indexed by Type
+        # code; the last slot (code -1) holds the bounds for any other type.
+        self._bounds = {}
+        for idx, rule in enumerate(self.rules):
+            if rule.kind != RANGE or not rule.by_type:
+                continue
+            lower = np.full(len(self.type_labels) + 1, _bound(rule.minimum, -np.inf))
+            upper = np.full(len(self.type_labels) + 1, _bound(rule.maximum, np.inf))
+            for label, minimum, maximum in rule.by_type:
+                code = self.type_labels.index(label)
+                lower[code] = _bound(minimum, -np.inf)
+                upper[code] = _bound(maximum, np.inf)
+            self._bounds[idx] = (lower, upper)
+
+    def evaluate(self, frame: pd.DataFrame, limits) -> RuleEvaluation:
+        """
+        Check every rule against ``frame``. ``limits[i]`` is how many
+        offending row positions to return for rule ``i``.
+        """
+        rows = len(frame)
+        numeric_values = {
+            col: pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64)
+            for col in self.numeric_columns
+        }
+        # A value that parsed as a number cannot be blank, so numeric
+        # columns only look at the text of the cells that failed to parse.
+        blank = {
+            col: _blank_mask(frame[col], numeric_values.get(col))
+            for col in self.blank_columns
+        }
+        # Per-type bounds are gathered by Type code in one lookup per rule
+        # instead of looping over the types.
+        type_codes = None
+        if self.type_labels:
+            type_codes = pd.Categorical(frame['Type'], categories=self.type_labels).codes
+
+        masks = np.empty((len(self.rules), rows), dtype=bool)
+        # Comparisons against NaN are False, so unparsable values only ever
+        # fail the numeric rule.
+        with np.errstate(invalid='ignore'):
+            for idx, rule in enumerate(self.rules):
+                out = masks[idx]
+                if rule.kind == MISSING:
+                    out[:] = blank[rule.column]
+                elif rule.kind == INVALID:
+                    np.logical_and(
+                        np.isnan(numeric_values[rule.column]), ~blank[rule.column], out=out
+                    )
+                elif idx in self._bounds:
+                    lower, upper = self._bounds[idx]
+                    values = numeric_values[rule.column]
+                    np.logical_or(values < lower[type_codes], values > upper[type_codes], out=out)
+                else:
+                    values = numeric_values[rule.column]
+                    out[:] = False
+                    if rule.minimum is not None:
+                        out |= values < rule.minimum
+                    if rule.maximum is not None:
+                        out |= values > rule.maximum
+
+        counts = masks.sum(axis=1)
+        first_rows = [
+            np.flatnonzero(masks[idx])[:limit] if count and limit > 0 else _NO_ROWS
+            for idx, (count, limit) in enumerate(zip(counts.tolist(), limits))
+        ]
+        return RuleEvaluation(
+            counts=counts,
+            first_rows=first_rows,
+            valid=~masks.any(axis=0),
+            numeric=numeric_values,
+        )
+
+
+def _blank_mask(series: pd.Series, parsed=None) -> np.ndarray:
+    if parsed is not None:
+        candidates = np.isnan(parsed)
+        blank = np.zeros(len(series), dtype=bool)
+        blank[candidates] = _blank_mask(series[candidates])
+        return blank
+    text = series.astype(str)
+    return (series.isna() | text.eq('') | text.str.isspace()).to_numpy(dtype=bool)
+
+
+def _bound(value, fallback):
+    return fallback if value is None else value
+
+
+@lru_cache(maxsize=32)
+def compile_rules(rules=DEFAULT_RULES) -> CompiledRules:
+    return CompiledRules(rules)
+
+
+@lru_cache(maxsize=64)
+def _compile_stored(site, version, config_json):
+    return CompiledRules(
+        rules_from_config(json.loads(config_json)),
+        label={'site': site, 'version': version},
+    )
+
+
+def compile_rule_set(rule_set) -> CompiledRules:
+    """
+    Compiled rules for a stored ``ValidationRuleSet``, cached per rule set
+    version so edits take effect without a restart.
+    """
+    return _compile_stored(
+        rule_set.site,
+        rule_set.version,
+        json.dumps(rule_set.rules, sort_keys=True),
+    )
@@ -1,29 +1,56 @@
-from datetime import datetime
-from io import BytesIO
-
-import pandas as pd
-from django.http import HttpResponse
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from reportlab.graphics.shapes import Circle, Drawing, String
-from reportlab.platypus import (
-    PageBreak,
-    Paragraph,
-    SimpleDocTemplate,
-    Spacer,
-    Table,
-    TableStyle,
-)
+import shutil
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.http import FileResponse
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .analytics import REQUIRED_COLUMNS, compute_chemviz_analytics
-from .models import DatasetUpload
+from .analytics import (
+    NUMERIC_COLUMNS,
+    AnalyticsAccumulator,
+    column_sketches,
+    compute_chemviz_analytics,
+    quantile_keys,
+)
+from .batch import expand_batch, ingest_many
+from .columnar import (
+    ColumnarWriter,
+    install_staged,
+    open_valid_dataset,
+    read_rows,
+    sidecar_variant,
+)
+from .compression import COMPRESSED_MIME, compression_for, unsupported_reason, upload_suffix
+from .conditional import make_etag, not_modified, set_validators
+from .ingest import ingest_csv
+from .jobs import fail_if_stale, submit_report_job
+from .listing import RowsPage, SummaryListing, public_summary
+from .models import DatasetUpload, ReportJob, UploadSession, ValidationRuleSet
+from .reports import report_etag, report_file
+from .retention import schedule_sweep
+from .resumable import (
+    StagedFile,
+    append_range,
+    check_header,
+    finish_scan,
+    parse_content_range,
+    scan_progress,
+    scan_received,
+    staging_path,
+)
+from .sketch import merge_sketches
+from .uploads import content_hash, restore_released, store_content_addressed
+from .validation import compile_rule_set, compile_rules
 
 
 class DatasetUploadView(APIView):
@@ -33,14 +60,7 @@ class DatasetUploadView(APIView):
     def post(self, request):
         uploaded_file = request.FILES.get('file')
         name = request.data.get('name')
-        max_file_size = 5 * 1024 * 1024
-        max_rows = 10000
-        allowed_mime = {
-            'text/csv',
-            'application/csv',
-            'application/vnd.ms-excel',
-            'text/plain',
-        }
+        site = (request.data.get('site') or '').strip()
 
         if uploaded_file is None:
             return Response(
@@ -48,259 +68,858 @@ class DatasetUploadView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if uploaded_file.size == 0:
-            return Response(
-                {'error': 'CSV file is empty.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        file_error = _upload_file_error(uploaded_file)
+        if file_error:
+            return Response({'error': file_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        return _create_upload(request, uploaded_file, name, site)
+
+
+def _create_upload(request, uploaded_file, name, site, session=None):
+    """
+    Ingest an upload that passed ``_upload_file_error`` (or reuse an
+    identical earlier one) and return the 201 or 400 response. The rows
+    of a resumable ``session`` that were validated as they arrived are
+    not read again.
+    """
+    digest = content_hash(uploaded_file)
+    rules = _rules_for_site(site)
+
+    # The same bytes checked against the same rules give the same
+    # result, so a re-upload reuses the stored file, summary and sidecar.
+    previous = (
+        DatasetUpload.objects
+        .filter(user=request.user, content_hash=digest, is_valid=True)  # 🔒 USER FILTER
+        .only('id', 'file', 'summary')
+        .first()
+    )
+    if _is_reusable(previous, rules):
+        upload = DatasetUpload.objects.create(
+            user=request.user,  # 🔒 USER BINDING
+            name=name or uploaded_file.name,
+            file=previous.file.name,
+            content_hash=digest,
+            summary=previous.summary,
+            is_valid=True,
+        )
+        restore_released(uploaded_file, upload.file.name)
+        return _upload_created_response(request, upload, duplicate_of=previous.id)
+
+    compression = compression_for(uploaded_file.name)
+    scanned = None
+    if session is not None:
+        scanned = finish_scan(session, rules, settings.CHEMVIZ_CSV_CHUNK_SIZE)
+    if scanned is not None:
+        result, error, writer = scanned
+    else:
+        writer = ColumnarWriter()
+        result, error = ingest_csv(
+            uploaded_file,
+            max_rows=settings.CHEMVIZ_UPLOAD_MAX_ROWS,
+            chunk_size=settings.CHEMVIZ_CSV_CHUNK_SIZE,
+            sink=writer,
+            rules=rules,
+            compression=compression,
+            max_bytes=settings.CHEMVIZ_UPLOAD_MAX_DECOMPRESSED_BYTES,
+        )
+    uploaded_file.seek(0)
+    if error:
+        writer.discard()
+        return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+    summary = result.analytics
+    summary['row_count'] = result.row_count
+    summary['file_size_bytes'] = int(uploaded_file.size)
+    if compression:
+        summary['compression'] = compression
+    summary['validation'] = result.validation_summary
+
+    try:
+        upload = DatasetUpload.objects.create(
+            user=request.user,  # 🔒 USER BINDING
+            name=name or uploaded_file.name,
+            file=store_content_addressed(uploaded_file, digest, upload_suffix(uploaded_file.name)),
+            content_hash=digest,
+            summary=summary,
+            is_valid=True,
+        )
+    except Exception:
+        writer.discard()
+        raise
+    restore_released(uploaded_file, upload.file.name)
+    writer.install(upload.file.path, sidecar_variant(rules.label))
+
+    return _upload_created_response(request, upload)
+
+
+ALLOWED_UPLOAD_MIME = {
+    'text/csv',
+    'application/csv',
+    'application/vnd.ms-excel',
+    'text/plain',
+}
+
+
+def _upload_file_error(uploaded_file):
+    return _upload_error(
+        uploaded_file.name,
+        uploaded_file.size,
+        getattr(uploaded_file, 'content_type', None),
+    )
+
+
+def _upload_error(name, size, content_type=None):
+    max_file_size = settings.CHEMVIZ_UPLOAD_MAX_BYTES
+    if size == 0:
+        return 'CSV file is empty.'
+    if size > max_file_size:
+        return f'File exceeds maximum size ({max_file_size / (1024 * 1024):g} MB).'
+    compression = compression_for(name)
+    allowed_mime = ALLOWED_UPLOAD_MIME | COMPRESSED_MIME if compression else ALLOWED_UPLOAD_MIME
+    if compression is None or (content_type and content_type not in allowed_mime):
+        return 'Invalid file type. Please upload a .csv, .csv.gz, .csv.zst or .zip file.'
+    return unsupported_reason(compression)
+
 
-        if uploaded_file.size > max_file_size:
+def _rules_for_site(site):
+    rule_set = ValidationRuleSet.for_site(site)
+    return compile_rule_set(rule_set) if rule_set else compile_rules()
+
+
+def _is_reusable(previous, rules):
+    """Whether ``previous`` was checked with ``rules`` and its CSV is still stored."""
+    return (
+        previous is not None
+        and (previous.summary.get('validation') or {}).get('rule_set') == rules.label
+        and default_storage.exists(previous.file.name)
+    )
+
+
+def _upload_body(request, upload, duplicate_of=None):
+    body = {
+        'id': upload.id,
+        'name': upload.name,
+        'uploaded_at': upload.uploaded_at,
+        'summary': public_summary(upload.summary),
+        'uploaded_by': request.user.get_full_name() or request.user.username,
+        'validation_summary': upload.summary['validation'],
+    }
+    if duplicate_of is not None:
+        body['duplicate_of'] = duplicate_of
+    return body
+
+
+def _upload_created_response(request, upload, duplicate_of=None):
+    return Response(_upload_body(request, upload, duplicate_of), status=status.HTTP_201_CREATED)
+
+
+class DatasetBatchUploadView(APIView):
+    """
+    Upload many CSVs at once, as repeated ``files`` fields and/or ``.zip``
+    archives of CSVs. Files are ingested in parallel and answered one by
+    one; the per-user retention check runs once for the whole batch.
+    """
+
+    parser_classes = [MultiPartParser, FormParser]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        uploaded_files = request.FILES.getlist('files')
+        site = (request.data.get('site') or '').strip()
+        if not uploaded_files:
             return Response(
-                {'error': 'File exceeds maximum size (5 MB).'},
+                {'error': 'Missing files. Upload CSVs or .zip archives with form field "files".'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if uploaded_file.content_type and uploaded_file.content_type not in allowed_mime:
+        files, batch_error = expand_batch(
+            uploaded_files,
+            max_file_size=settings.CHEMVIZ_UPLOAD_MAX_BYTES,
+            max_files=settings.CHEMVIZ_BATCH_MAX_FILES,
+        )
+        if batch_error:
+            return Response({'error': batch_error}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return self._ingest(request, files, site)
+        finally:
+            # Drops the temporary files zip members were extracted to.
+            for uploaded_file in files:
+                uploaded_file.close()
+
+    def _ingest(self, request, files, site):
+        rules = _rules_for_site(site)
+        results = [None] * len(files)
+        digests = {}
+        for idx, uploaded_file in enumerate(files):
+            file_error = _upload_file_error(uploaded_file)
+            if file_error:
+                results[idx] = {'file': uploaded_file.name, 'status': 'rejected', 'error': file_error}
+            else:
+                digests[idx] = content_hash(uploaded_file)
+
+        previous = {}
+        for upload in (
+            DatasetUpload.objects
+            .filter(user=request.user, content_hash__in=set(digests.values()), is_valid=True)  # 🔒 USER FILTER
+            .only('id', 'file', 'summary', 'content_hash')
+            .order_by('uploaded_at', 'id')
+        ):
+            previous[upload.content_hash] = upload
+        previous = {
+            digest: upload for digest, upload in previous.items() if _is_reusable(upload, rules)
+        }
+
+        # Ingest each new content once, however often it repeats in the batch.
+        first_seen = {}
+        for idx, digest in digests.items():
+            if digest not in previous:
+                first_seen.setdefault(digest, idx)
+        pending = list(first_seen.items())
+        outcomes = dict(zip(
+            (digest for digest, _ in pending),
+            ingest_many(
+                [
+                    (_ingest_source(files[idx]), compression_for(files[idx].name))
+                    for _, idx in pending
+                ],
+                rules,
+            ),
+        ))
+
+        new_uploads = []
+        stored = {}
+        try:
+            for idx, digest in digests.items():
+                uploaded_file = files[idx]
+                if digest in previous:
+                    file_name = previous[digest].file.name
+                    summary = previous[digest].summary
+                else:
+                    result, error, _ = outcomes[digest]
+                    if error:
+                        results[idx] = {'file': uploaded_file.name, 'status': 'rejected', **error}
+                        continue
+                    if digest not in stored:
+                        stored[digest] = store_content_addressed(
+                            uploaded_file, digest, upload_suffix(uploaded_file.name)
+                        )
+                    file_name = stored[digest]
+                    summary = {
+                        **result.analytics,
+                        'row_count': result.row_count,
+                        'file_size_bytes': int(uploaded_file.size),
+                        'validation': result.validation_summary,
+                    }
+                    compression = compression_for(uploaded_file.name)
+                    if compression:
+                        summary['compression'] = compression
+                upload = DatasetUpload(
+                    user=request.user,  # 🔒 USER BINDING
+                    name=uploaded_file.name,
+                    file=file_name,
+                    content_hash=digest,
+                    summary=summary,
+                    is_valid=True,
+                )
+                # bulk_create does not call save().
+                upload.sync_summary_columns()
+                new_uploads.append((idx, upload))
+
+            # bulk_create skips DatasetUpload.save, so retention is scheduled
+            # here, once for the whole batch.
+            with transaction.atomic():
+                DatasetUpload.objects.bulk_create([upload for _, upload in new_uploads])
+                if new_uploads:
+                    transaction.on_commit(lambda: schedule_sweep([request.user.id]))
+            for idx, upload in new_uploads:
+                restore_released(files[idx], upload.file.name)
+
+            variant = sidecar_variant(rules.label)
+            for digest, file_name in stored.items():
+                install_staged(outcomes[digest][2], default_storage.path(file_name), variant)
+        finally:
+            # Installing moves a staged sidecar away; drop whatever is left.
+            for _, _, sidecar_dir in outcomes.values():
+                if sidecar_dir:
+                    shutil.rmtree(sidecar_dir, ignore_errors=True)
+
+        first_upload = {}
+        for idx, upload in new_uploads:
+            source = previous.get(upload.content_hash)
+            duplicate_of = source.id if source else first_upload.get(upload.content_hash)
+            first_upload.setdefault(upload.content_hash, upload.id)
+            results[idx] = {
+                'file': files[idx].name,
+                'status': 'created',
+                **_upload_body(request, upload, duplicate_of),
+            }
+
+        return Response(
+            {
+                'results': results,
+                'created': len(new_uploads),
+                'rejected': len(results) - len(new_uploads),
+            },
+            status=status.HTTP_201_CREATED if new_uploads else status.HTTP_400_BAD_REQUEST,
+        )
+
+
+def _ingest_source(uploaded_file):
+    # Files Django spooled to disk go to the workers by path, the rest as
+    # bytes.
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path()
+    uploaded_file.seek(0)
+    content = uploaded_file.read()
+    uploaded_file.seek(0)
+    return content
+
+
+class UploadSessionCreateView(APIView):
+    """
+    Start a resumable upload with ``{"filename", "size"}`` (plus optional
+    ``name`` and ``site``). The file is then sent with ``PUT`` to
+    ``upload_url`` in ranges of at most ``chunk_size`` bytes and finished
+    with ``POST`` to ``complete_url``.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        filename = str(request.data.get('filename') or '').strip()
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
             return Response(
-                {'error': 'Invalid file type. Please upload a .csv file.'},
+                {'error': 'size must be the file size in bytes.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if not uploaded_file.name.lower().endswith('.csv'):
-            return Response(
-                {'error': 'Invalid file type. Please upload a .csv file.'},
-                status=status.HTTP_400_BAD_REQUEST,
+        file_error = _upload_error(filename, size)
+        if file_error:
+            return Response({'error': file_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        UploadSession.prune_expired(timedelta(hours=settings.CHEMVIZ_UPLOAD_SESSION_TTL_HOURS))
+        session = UploadSession.objects.create(
+            user=request.user,  # 🔒 USER BINDING
+            filename=filename,
+            name=request.data.get('name') or '',
+            site=(request.data.get('site') or '').strip(),
+            size=size,
+            # Plain CSVs are validated range by range.
+            scan={} if compression_for(filename) == '' else None,
+        )
+        return Response(_serialize_upload_session(session), status=status.HTTP_201_CREATED)
+
+
+def _get_upload_session(request, session_id, for_update=False):
+    sessions = UploadSession.objects.filter(id=session_id, user=request.user)  # 🔒 OWNER CHECK
+    if for_update:
+        sessions = sessions.select_for_update()
+    return sessions.first()
+
+
+def _upload_session_not_found():
+    return Response(
+        {'error': 'Upload session not found.'},
+        status=status.HTTP_404_NOT_FOUND,
+    )
+
+
+def _serialize_upload_session(session: UploadSession) -> dict:
+    data = {
+        'id': session.id,
+        'filename': session.filename,
+        'size': session.size,
+        'offset': session.received,
+        'chunk_size': settings.CHEMVIZ_UPLOAD_CHUNK_BYTES,
+        'upload_url': reverse('dataset-upload-session', args=[session.id]),
+        'complete_url': reverse('dataset-upload-session-complete', args=[session.id]),
+    }
+    progress = scan_progress(session.scan)
+    if progress:
+        data['validation'] = progress
+    return data
+
+
+class UploadSessionView(APIView):
+    """
+    ``GET`` reports the offset to resume from, ``PUT`` appends the raw
+    bytes named by its ``Content-Range`` header, ``DELETE`` aborts.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, session_id):
+        session = _get_upload_session(request, session_id)
+        if session is None:
+            return _upload_session_not_found()
+        return Response(_serialize_upload_session(session), status=status.HTTP_200_OK)
+
+    def put(self, request, session_id):
+        # The session is locked only while the range is checked and the
+        # offset reserved; the body is read after the transaction ends, so a
+        # slow client does not hold the database lock.
+        token = uuid.uuid4()
+        with transaction.atomic():
+            session = _get_upload_session(request, session_id, for_update=True)
+            if session is None:
+                return _upload_session_not_found()
+
+            span, range_error = parse_content_range(
+                request.META.get('HTTP_CONTENT_RANGE'), session.size
             )
+            if range_error:
+                return Response({'error': range_error}, status=status.HTTP_400_BAD_REQUEST)
+            start, end = span
+            length = end - start + 1
+            if start != session.received:
+                return Response(
+                    {'error': 'Range must start at the current offset.', 'offset': session.received},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            max_chunk = settings.CHEMVIZ_UPLOAD_CHUNK_BYTES
+            if length > max_chunk:
+                return Response(
+                    {'error': f'Chunk exceeds maximum size ({max_chunk / (1024 * 1024):g} MB).'},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            if int(request.META.get('CONTENT_LENGTH') or 0) != length:
+                return Response(
+                    {'error': 'Content-Length does not match Content-Range.'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            now = timezone.now()
+            timeout = timedelta(seconds=settings.CHEMVIZ_UPLOAD_RANGE_TIMEOUT_SECONDS)
+            if session.reserved_by and session.reserved_at > now - timeout:
+                return Response(
+                    {'error': 'Another range is still being uploaded.', 'offset': session.received},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            session.reserved_by, session.reserved_at = token, now
+            session.save(update_fields=['reserved_by', 'reserved_at'])
 
         try:
-            df = pd.read_csv(uploaded_file)
-            uploaded_file.seek(0)
-        except Exception as exc:
+            return self._append(request, session, token, start, end)
+        finally:
+            # Gives the offset back if the range did not commit.
+            UploadSession.objects.filter(id=session.id, reserved_by=token).update(reserved_by=None)
+
+    def _append(self, request, session, token, start, end):
+        length = end - start + 1
+        path = staging_path(session.id)
+        if append_range(path, request.stream, start, length) != length:
             return Response(
-                {'error': 'Failed to read CSV file.', 'details': str(exc)},
+                {'error': 'Chunk was cut short.', 'offset': session.received},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-
-        df = df.dropna(how='all')
-        if df.empty:
-            return Response(
-                {'error': 'CSV file is empty.'},
-                status=status.HTTP_400_BAD_REQUEST,
+        session.received = end + 1
+
+        # Reject a file with the wrong columns, too many rows or a broken
+        # record on the ranges that carry them, not after all of it has
+        # been sent. A compressed file only has its header checked here.
+        error = None
+        if session.scan is not None:
+            session.scan, error = scan_received(
+                session, _rules_for_site(session.site), settings.CHEMVIZ_UPLOAD_MAX_ROWS
             )
-
-        if len(df) > max_rows:
+            session.header_checked = bool(session.scan and session.scan['header'])
+        elif not session.header_checked:
+            session.header_checked, error = check_header(path, compression_for(session.filename))
+        if error:
+            session.delete()
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        # Committed only if the reservation still holds: a request that
+        # outlived the timeout has been replaced and its bytes are rewritten.
+        session.updated_at = timezone.now()
+        committed = (
+            UploadSession.objects
+            .filter(id=session.id, received=start, reserved_by=token)
+            .update(
+                received=session.received,
+                header_checked=session.header_checked,
+                scan=session.scan,
+                reserved_by=None,
+                updated_at=session.updated_at,
+            )
+        )
+        if not committed:
+            current = UploadSession.objects.filter(id=session.id).values_list('received', flat=True)
             return Response(
-                {'error': f'CSV exceeds maximum row limit ({max_rows}).'},
-                status=status.HTTP_400_BAD_REQUEST,
+                {'error': 'Range must start at the current offset.', 'offset': current.first()},
+                status=status.HTTP_409_CONFLICT,
             )
+        return Response(_serialize_upload_session(session), status=status.HTTP_200_OK)
+
+    def delete(self, request, session_id):
+        session = _get_upload_session(request, session_id)
+        if session is None:
+            return _upload_session_not_found()
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-        normalized_columns = [str(col).strip() for col in df.columns]
-        missing = [col for col in REQUIRED_COLUMNS if col not in normalized_columns]
-        if missing:
+class UploadSessionCompleteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, session_id):
+        session = _get_upload_session(request, session_id)
+        if session is None:
+            return _upload_session_not_found()
+        if session.received != session.size:
             return Response(
-                {
-                    'error': f'Missing column: {missing[0]}',
-                    'missing_columns': missing,
-                    'received_columns': normalized_columns,
-                },
-                status=status.HTTP_400_BAD_REQUEST,
+                {'error': 'Upload is incomplete.', 'offset': session.received},
+                status=status.HTTP_409_CONFLICT,
             )
 
-        df.columns = normalized_columns
-        df = df[REQUIRED_COLUMNS].copy()
-
-        row_count = int(len(df))
-        file_size_bytes = int(uploaded_file.size)
-        numeric_columns = ['Flowrate', 'Pressure', 'Temperature']
-
-        missing_values = {}
-        invalid_values = {}
-        out_of_range = {}
-        row_errors = []
-        max_row_errors = 50
-
-        def _add_row_errors(mask, column, message):
-            nonlocal row_errors
-            if len(row_errors) >= max_row_errors:
-                return
-            indices = df.index[mask].tolist()
-            for idx in indices:
-                if len(row_errors) >= max_row_errors:
-                    break
-                row_errors.append(
-                    {
-                        'row': int(idx) + 2,
-                        'column': column,
-                        'message': message,
-                    }
+        path = staging_path(session.id)
+        try:
+            with open(path, 'rb') as handle:
+                uploaded_file = StagedFile(handle, session.filename, path)
+                return _create_upload(
+                    request, uploaded_file, session.name, session.site, session=session
                 )
+        finally:
+            # A new CSV was moved into storage; anything else is discarded.
+            session.delete()
 
-        valid_mask = pd.Series(True, index=df.index)
-
-        for col in REQUIRED_COLUMNS:
-            series = df[col]
-            missing_mask = series.isna() | series.astype(str).str.strip().eq('')
-            missing_values[col] = int(missing_mask.sum())
-            if missing_mask.any():
-                _add_row_errors(missing_mask, col, 'Missing value')
-            valid_mask &= ~missing_mask
-
-        numeric_df = df[numeric_columns].apply(pd.to_numeric, errors='coerce')
-        for col in numeric_columns:
-            missing_mask = df[col].isna() | df[col].astype(str).str.strip().eq('')
-            invalid_mask = numeric_df[col].isna() & ~missing_mask
-            invalid_values[col] = int(invalid_mask.sum())
-            if invalid_mask.any():
-                _add_row_errors(invalid_mask, col, 'Invalid numeric value')
-            valid_mask &= ~invalid_mask
-
-        flow_mask = numeric_df['Flowrate'] < 0
-        out_of_range['Flowrate'] = int(flow_mask.sum())
-        if flow_mask.any():
-            _add_row_errors(flow_mask, 'Flowrate', 'Value must be >= 0')
-        valid_mask &= ~flow_mask
-
-        pressure_mask = numeric_df['Pressure'] < 0
-        out_of_range['Pressure'] = int(pressure_mask.sum())
-        if pressure_mask.any():
-            _add_row_errors(pressure_mask, 'Pressure', 'Value must be >= 0')
-        valid_mask &= ~pressure_mask
-
-        temp_mask = (numeric_df['Temperature'] < -50) | (numeric_df['Temperature'] > 500)
-        out_of_range['Temperature'] = int(temp_mask.sum())
-        if temp_mask.any():
-            _add_row_errors(temp_mask, 'Temperature', 'Value must be between -50 and 500')
-        valid_mask &= ~temp_mask
-
-        accepted_rows = int(valid_mask.sum())
-        rejected_rows = int(row_count - accepted_rows)
-
-        validation_summary = {
-            'total_rows': row_count,
-            'accepted_rows': accepted_rows,
-            'rejected_rows': rejected_rows,
-            'missing_values': missing_values,
-            'invalid_values': invalid_values,
-            'out_of_range': out_of_range,
-            'row_errors': row_errors,
-        }
 
-        if accepted_rows == 0:
-            return Response(
-                {
-                    'error': 'All rows are invalid. Please fix the CSV and retry.',
-                    'validation_summary': validation_summary,
-                },
-                status=status.HTTP_400_BAD_REQUEST,
+class DatasetSummaryListView(APIView):
+    """
+    The user's uploads, newest first, five to a page unless ``?limit=`` (up
+    to 100) says otherwise. ``next_cursor`` is passed back as ``?cursor=``
+    for the following page. ``?fields=id,name,...`` keeps only those keys of
+    each result, and ``?shape=compact`` leaves the validation details and
+    per-Type stats out of each summary. ``?min_rows=``, ``?max_rows=`` and
+    ``?rejected=true|false`` filter on the row counts.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        listing, error = SummaryListing.parse(request.query_params)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            uploads = list(listing.queryset(request.user))
+        except ValueError:
+            return Response({'error': 'Invalid cursor.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Every row belongs to request.user, so resolve the name once
+        # instead of loading the user per upload.
+        uploaded_by = request.user.get_full_name() or request.user.username
+
+        uploads, next_cursor, etag = listing.page(uploads, request.user, uploaded_by)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return set_validators(cached, etag)
+
+        return set_validators(
+            Response(
+                {'results': listing.results(uploads, uploaded_by), 'next_cursor': next_cursor},
+                status=status.HTTP_200_OK,
+            ),
+            etag,
+        )
+
+
+class DatasetLatestRowsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        page, error = RowsPage.parse(request.query_params)
+        if error:
+            return Response(error, status=status.HTTP_400_BAD_REQUEST)
+
+        uploads = RowsPage.queryset(request.user)
+        while True:
+            upload = uploads.first()
+            if upload is None:
+                return Response(
+                    {'rows': [], 'error': 'No valid datasets available.'},
+                    status=status.HTTP_200_OK,
+                )
+            # Uploads never change, so a client holding this upload's tag
+            # already read its rows successfully. No Last-Modified: deleting
+            # the newest upload makes an older one the latest, and its date
+            # would pass an If-Modified-Since for the deleted one.
+            etag = page.etag(upload)
+            cached = not_modified(request, etag)
+            if cached is not None:
+                return set_validators(cached, etag)
+
+            total_rows, rows, error = read_rows(
+                upload, page.columns, page.offset, page.offset + page.limit
             )
+            if not error:
+                break
+            # Only legacy uploads whose CSV cannot be read end up here; flag
+            # them so later requests skip straight past.
+            DatasetUpload.objects.filter(id=upload.id).update(is_valid=False)
 
-        df_valid = df.loc[valid_mask].copy()
-        summary = compute_chemviz_analytics(df_valid)
-        summary['row_count'] = row_count
-        summary['file_size_bytes'] = file_size_bytes
-        summary['validation'] = validation_summary
+        response = Response(page.body(upload, total_rows, rows), status=status.HTTP_200_OK)
+        return set_validators(response, etag)
 
-        upload = DatasetUpload.objects.create(
-            user=request.user,  # 🔒 USER BINDING
-            name=name or uploaded_file.name,
-            file=uploaded_file,
-            summary=summary,
+
+class DatasetTypeStatsView(APIView):
+    """
+    Per-Type count, mean, min, max, std and quantiles of the numeric
+    columns, served from the stored summary. ``?type=Pump,Valve`` limits
+    the response to those types.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id):
+        upload = (
+            DatasetUpload.objects
+            .filter(id=upload_id, user=request.user)  # 🔒 OWNER CHECK
+            .only('id', 'name', 'uploaded_at', 'file', 'summary')
+            .first()
         )
+        if upload is None:
+            return Response(
+                {'error': 'Dataset not found or access denied.'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
 
-        return Response(
+        requested = request.query_params.get('type')
+        types = [label.strip() for label in requested.split(',')] if requested else None
+        etag = make_etag('type-stats', upload.id, upload.uploaded_at.isoformat(), types)
+        cached = not_modified(request, etag, upload.uploaded_at)
+        if cached is not None:
+            return set_validators(cached, etag, upload.uploaded_at)
+
+        summary = upload.summary
+        if 'type_stats' not in summary:
+            summary, error = _backfill_summary(upload)
+            if error:
+                return Response({'error': error}, status=status.HTTP_409_CONFLICT)
+        type_stats = summary['type_stats']
+        if types is not None:
+            type_stats = {label: type_stats[label] for label in types if label in type_stats}
+
+        response = Response(
             {
                 'id': upload.id,
                 'name': upload.name,
                 'uploaded_at': upload.uploaded_at,
-                'summary': upload.summary,
-                'uploaded_by': request.user.get_full_name() or request.user.username,
-                'validation_summary': validation_summary,
+                'columns': NUMERIC_COLUMNS,
+                'quantiles': quantile_keys(),
+                'types': type_stats,
             },
-            status=status.HTTP_201_CREATED,
+            status=status.HTTP_200_OK,
         )
+        return set_validators(response, etag, upload.uploaded_at)
+
+
+# Summary keys that uploads ingested before they existed can be missing.
+_BACKFILLED_SUMMARY_KEYS = ('type_stats', 'sketches', 'components')
+
+
+def _backfill_summary(upload):
+    """
+    Compute the summary keys an older upload lacks from its accepted rows,
+    once, and save them. Returns ``(summary, None)`` or ``(None, message)``.
+    """
+    dataset, error = open_valid_dataset(upload)
+    if error:
+        return None, error
+    analytics = compute_chemviz_analytics(dataset.frame())
+    for key in _BACKFILLED_SUMMARY_KEYS:
+        upload.summary.setdefault(key, analytics[key])
+    DatasetUpload.objects.filter(id=upload.id).update(
+        summary=upload.summary, summary_version=F('summary_version') + 1
+    )
+    return upload.summary, None
 
 
-def _load_valid_dataframe(upload: DatasetUpload):
-    try:
-        df = pd.read_csv(upload.file.path)
-    except Exception as exc:
-        return None, f'Failed to read CSV file: {exc}'
-
-    df = df.dropna(how='all')
-    if df.empty:
-        return None, 'CSV file is empty.'
-
-    normalized_columns = [str(col).strip() for col in df.columns]
-    missing = [col for col in REQUIRED_COLUMNS if col not in normalized_columns]
-    if missing:
-        return None, f'Missing required columns: {", ".join(missing)}'
-
-    df.columns = normalized_columns
-    return df, None
-
+class DatasetAggregateView(APIView):
+    """
+    Combined statistics over the latest ``?limit=`` valid uploads (default
+    5) or those in ``?ids=``, merged from the counters stored with each
+    summary, and every upload's change from the one before it.
+    """
 
-class DatasetSummaryListView(APIView):
     permission_classes = [IsAuthenticated]
+    default_limit = 5
+    max_limit = 100
 
     def get(self, request):
+        try:
+            ids = _int_list(request.query_params.get('ids'))
+            limit = int(request.query_params.get('limit', self.default_limit))
+            if limit < 1:
+                raise ValueError(limit)
+        except ValueError:
+            return Response(
+                {'error': 'ids and limit must be positive integers.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        limit = min(limit, self.max_limit)
+
         uploads = (
             DatasetUpload.objects
-            .filter(user=request.user)  # 🔒 USER FILTER
-            .order_by('-uploaded_at', '-id')[:5]
+            .filter(user=request.user, is_valid=True)  # 🔒 USER FILTER
+            .only('id', 'name', 'uploaded_at', 'file', 'content_hash', 'summary')
+            .order_by('-uploaded_at', '-id')
+        )
+        if ids is not None:
+            uploads = uploads.filter(id__in=ids)
+        uploads = list(uploads[:limit])
+
+        etag = make_etag(
+            'aggregate',
+            request.user.id,
+            [(upload.id, upload.uploaded_at.isoformat()) for upload in uploads],
         )
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return set_validators(cached, etag)
 
-        data = []
+        combined = AnalyticsAccumulator()
+        parts, skipped, seen = [], [], set()
         for upload in uploads:
-            summary = upload.summary or {}
-            validation = summary.get('validation') or {}
-            data.append(
-                {
-                    'id': upload.id,
-                    'name': upload.name,
-                    'uploaded_at': upload.uploaded_at,
-                    'summary': summary,
-                    'uploaded_by': upload.user.get_full_name() or upload.user.username,
-                    'row_count': summary.get('row_count') or validation.get('total_rows'),
-                    'file_size_bytes': summary.get('file_size_bytes'),
-                    'accepted_rows': validation.get('accepted_rows'),
-                    'rejected_rows': validation.get('rejected_rows'),
-                }
-            )
-        return Response({'results': data}, status=status.HTTP_200_OK)
+            summary = upload.summary
+            if 'components' not in summary:
+                summary, error = _backfill_summary(upload)
+                if error:
+                    skipped.append(upload.id)
+                    continue
+            part = AnalyticsAccumulator.from_components(summary['components'])
+            # A re-uploaded file is the same equipment; count it once.
+            if not upload.content_hash or upload.content_hash not in seen:
+                seen.add(upload.content_hash)
+                combined = combined.merge(part)
+            parts.append((upload, _aggregate_stats(part)))
+
+        results = []
+        for idx, (upload, stats) in enumerate(parts):
+            # Newest first, so the upload before this one is the next entry.
+            previous = parts[idx + 1][1] if idx + 1 < len(parts) else None
+            results.append({
+                'id': upload.id,
+                'name': upload.name,
+                'uploaded_at': upload.uploaded_at,
+                **stats,
+                'delta': _aggregate_delta(stats, previous) if previous else None,
+            })
 
+        response = Response(
+            {
+                'combined': {
+                    'total_equipment': combined.rows,
+                    'columns': {
+                        col: combined.columns[col].describe() for col in NUMERIC_COLUMNS
+                    },
+                    'type_distribution': combined.type_distribution(),
+                },
+                'uploads': results,
+                'skipped': skipped,
+            },
+            status=status.HTTP_200_OK,
+        )
+        return set_validators(response, etag)
+
+
+def _aggregate_stats(accumulator):
+    return {
+        'total_equipment': accumulator.rows,
+        'averages': {col: accumulator.columns[col].average for col in NUMERIC_COLUMNS},
+        'type_distribution': accumulator.type_distribution(),
+    }
+
+
+def _aggregate_delta(current, previous):
+    def _difference(new, old):
+        return None if new is None or old is None else new - old
+
+    labels = dict.fromkeys([*current['type_distribution'], *previous['type_distribution']])
+    type_counts = {
+        label: current['type_distribution'].get(label, 0) - previous['type_distribution'].get(label, 0)
+        for label in labels
+    }
+    return {
+        'total_equipment': current['total_equipment'] - previous['total_equipment'],
+        'averages': {
+            col: _difference(current['averages'][col], previous['averages'][col])
+            for col in NUMERIC_COLUMNS
+        },
+        'type_counts': {label: change for label, change in type_counts.items() if change},
+    }
+
+
+class DatasetPercentilesView(APIView):
+    """
+    Percentiles over several uploads at once, from their merged quantile
+    sketches. ``?ids=1,2`` picks uploads (default: all valid ones) and
+    ``?q=0.5,0.95,0.99`` the quantiles.
+    """
 
-class DatasetLatestRowsView(APIView):
     permission_classes = [IsAuthenticated]
+    default_quantiles = (0.5, 0.95, 0.99)
 
     def get(self, request):
+        try:
+            ids = _int_list(request.query_params.get('ids'))
+            qs = [float(q) for q in request.query_params.get('q', '').split(',') if q.strip()]
+            if any(not 0 <= q <= 1 for q in qs):
+                raise ValueError(qs)
+        except ValueError:
+            return Response(
+                {'error': 'ids must be integers and q numbers between 0 and 1.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        qs = qs or list(self.default_quantiles)
+
         uploads = (
             DatasetUpload.objects
-            .filter(user=request.user)
+            .filter(user=request.user, is_valid=True)  # 🔒 USER FILTER
+            .only('id', 'content_hash', 'summary')
             .order_by('-uploaded_at', '-id')
         )
+        if ids is not None:
+            uploads = uploads.filter(id__in=ids)
 
+        merged = {col: [] for col in NUMERIC_COLUMNS}
+        included, skipped, seen = [], [], set()
         for upload in uploads:
-            df, error = _load_valid_dataframe(upload)
-            if error:
+            # A re-uploaded file is the same equipment; count it once.
+            if upload.content_hash and upload.content_hash in seen:
+                skipped.append(upload.id)
                 continue
-            df = df[REQUIRED_COLUMNS].copy().head(200)
-            rows = df.to_dict(orient='records')
-            return Response(
-                {
-                    'id': upload.id,
-                    'name': upload.name,
-                    'uploaded_at': upload.uploaded_at,
-                    'rows': rows,
-                },
-                status=status.HTTP_200_OK,
-            )
-
+            sketches = column_sketches(upload.summary)
+            if sketches is None:
+                skipped.append(upload.id)
+                continue
+            seen.add(upload.content_hash)
+            included.append(upload.id)
+            for col in NUMERIC_COLUMNS:
+                merged[col].append(sketches[col])
+
+        keys = quantile_keys(qs)
+        columns = {}
+        for col in NUMERIC_COLUMNS:
+            sketch = merge_sketches(merged[col])
+            columns[col] = {
+                'count': sketch.count,
+                'min': sketch.minimum,
+                'max': sketch.maximum,
+                **dict(zip(keys, sketch.quantiles(qs))),
+            }
         return Response(
-            {'rows': [], 'error': 'No valid datasets available.'},
+            {'uploads': included, 'skipped': skipped, 'columns': columns},
             status=status.HTTP_200_OK,
         )
 
 
+def _int_list(value):
+    if not value:
+        return None
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
 class DatasetReportView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -316,7 +935,7 @@ class DatasetReportView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        return _build_report_response(upload)
+        return _build_report_response(request, upload)
 
 
 class DatasetLatestReportView(APIView):
@@ -334,294 +953,97 @@ class DatasetLatestReportView(APIView):
                 {'error': 'No datasets available.'},
                 status=status.HTTP_404_NOT_FOUND,
             )
-        return _build_report_response(upload)
-
-
-def _build_report_response(upload: DatasetUpload):
-    df, load_error = _load_valid_dataframe(upload)
-
-    def _format_number(value):
-        if value is None or pd.isna(value):
-            return 'N/A'
-        if isinstance(value, float):
-            return f'{value:.2f}'
-        return str(value)
-
-    def _build_bar_chart(values, labels, title, width=430, height=190):
-        drawing = Drawing(width, height)
-        chart = VerticalBarChart()
-        chart.x = 40
-        chart.y = 25
-        chart.width = width - 70
-        chart.height = height - 60
-        chart.data = [values]
-        chart.categoryAxis.categoryNames = labels
-        chart.valueAxis.valueMin = 0
-        chart.barWidth = 14
-        chart.groupSpacing = 8
-        chart.barSpacing = 4
-        chart.bars.fillColor = colors.HexColor('#3b82f6')
-        drawing.add(chart)
-        drawing.add(String(40, height - 20, title, fontSize=9))
-        return drawing
-
-    def _histogram(series: pd.Series, bins=6):
-        numeric = pd.to_numeric(series, errors='coerce').dropna()
-        if numeric.empty:
-            return [], []
-        counts, edges = pd.cut(numeric, bins=bins, retbins=True)
-        counts = counts.value_counts().sort_index()
-        labels = [
-            f'{edges[i]:.1f}-{edges[i + 1]:.1f}'
-            for i in range(len(edges) - 1)
-        ]
-        return list(counts.values), labels
-
-    s = upload.summary or {}
-    total_equipment = s.get('total_equipment') or (int(len(df)) if df is not None else 0)
-    type_dist = s.get('type_distribution') or {}
-    type_count = len(type_dist)
-    avg_flowrate = s.get('avg_flowrate')
-    avg_pressure = s.get('avg_pressure')
-    avg_temperature = s.get('avg_temperature')
-
-    numeric_df = None
-    if df is not None:
-        numeric_df = df.copy()
-        for col in ['Flowrate', 'Pressure', 'Temperature']:
-            if col in numeric_df.columns:
-                numeric_df[col] = pd.to_numeric(numeric_df[col], errors='coerce')
-
-    min_flow = numeric_df['Flowrate'].min() if numeric_df is not None and 'Flowrate' in numeric_df else None
-    max_flow = numeric_df['Flowrate'].max() if numeric_df is not None and 'Flowrate' in numeric_df else None
-    min_pressure = numeric_df['Pressure'].min() if numeric_df is not None and 'Pressure' in numeric_df else None
-    max_pressure = numeric_df['Pressure'].max() if numeric_df is not None and 'Pressure' in numeric_df else None
-    min_temp = numeric_df['Temperature'].min() if numeric_df is not None and 'Temperature' in numeric_df else None
-    max_temp = numeric_df['Temperature'].max() if numeric_df is not None and 'Temperature' in numeric_df else None
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, title='ChemViz Report')
-    styles = getSampleStyleSheet()
-
-    story = []
-
-    # Cover page
-    logo = Drawing(70, 70)
-    logo.add(
-        Circle(
-            35,
-            35,
-            30,
-            fillColor=colors.HexColor('#3b82f6'),
-            strokeColor=colors.HexColor('#3b82f6'),
-        )
-    )
-    logo.add(
-        String(
-            35,
-            28,
-            'CV',
-            fontSize=16,
-            fillColor=colors.white,
-            textAnchor='middle',
-        )
-    )
-    story.append(logo)
-    story.append(Spacer(1, 8))
-    story.append(Paragraph('ChemViz', styles['Title']))
-    story.append(Paragraph('Chemical Equipment Parameter Analysis Report', styles['Heading2']))
-    story.append(Spacer(1, 18))
-    story.append(Paragraph(f'Dataset: {upload.name}', styles['Normal']))
-    story.append(Paragraph(f'Upload ID: {upload.id}', styles['Normal']))
-    story.append(Paragraph(
-        f'Generated on: {datetime.now().strftime("%Y-%m-%d %H:%M")}',
-        styles['Normal'],
-    ))
-    story.append(Spacer(1, 24))
-    story.append(Paragraph('ChemViz Report (Cover Page)', styles['Italic']))
-    story.append(PageBreak())
-
-    # Dataset overview
-    story.append(Paragraph('Dataset Overview', styles['Heading2']))
-    overview_rows = [
-        ['Total Equipment', total_equipment],
-        ['Number of Equipment Types', type_count],
-        ['Uploaded Filename', upload.name],
-        ['Upload Timestamp', upload.uploaded_at.strftime("%Y-%m-%d %H:%M")],
-    ]
-    overview_table = Table(overview_rows, colWidths=[200, 300])
-    overview_table.setStyle(
-        TableStyle(
-            [
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]
-        )
-    )
-    story.append(overview_table)
-    story.append(
-        Paragraph(
-            f'Section Summary: {total_equipment} equipment records across {type_count} types.',
-            styles['Italic'],
-        )
-    )
-    story.append(Spacer(1, 16))
-
-    # Summary statistics
-    story.append(Paragraph('Summary Statistics', styles['Heading2']))
-    summary_rows = [
-        ['Average Flowrate', _format_number(avg_flowrate)],
-        ['Average Pressure', _format_number(avg_pressure)],
-        ['Average Temperature', _format_number(avg_temperature)],
-        ['Min Flowrate', _format_number(min_flow)],
-        ['Max Flowrate', _format_number(max_flow)],
-        ['Min Pressure', _format_number(min_pressure)],
-        ['Max Pressure', _format_number(max_pressure)],
-        ['Min Temperature', _format_number(min_temp)],
-        ['Max Temperature', _format_number(max_temp)],
-    ]
-    summary_table = Table(summary_rows, colWidths=[200, 300])
-    summary_table.setStyle(
-        TableStyle(
-            [
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ]
-        )
-    )
-    story.append(summary_table)
-    story.append(
-        Paragraph(
-            'Section Summary: Averages and ranges are computed from valid rows.',
-            styles['Italic'],
-        )
-    )
-    story.append(Spacer(1, 16))
-
-    # Equipment type distribution
-    story.append(Paragraph('Equipment Type Distribution', styles['Heading2']))
-    if type_dist:
-        top_type = max(type_dist.items(), key=lambda x: x[1])
-        top_pct = (top_type[1] / total_equipment) * 100 if total_equipment else 0
-        type_labels = list(type_dist.keys())
-        type_values = list(type_dist.values())
-        story.append(_build_bar_chart(type_values, type_labels, 'Type Distribution'))
-        story.append(Spacer(1, 8))
-        total = sum(type_values) or 1
-        type_table_rows = [['Type', 'Count', 'Percentage']]
-        for label, count in zip(type_labels, type_values):
-            pct = (count / total) * 100
-            type_table_rows.append([label, count, f'{pct:.1f}%'])
-        type_table = Table(type_table_rows, colWidths=[220, 120, 120])
-        type_table.setStyle(
-            TableStyle(
-                [
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ]
+        return _build_report_response(request, upload, latest=True)
+
+
+def _serialize_report_job(job: ReportJob) -> dict:
+    data = {
+        'id': job.id,
+        'upload_id': job.upload_id,
+        'status': job.status,
+        'error': job.error or None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
+    if job.status == ReportJob.STATUS_SUCCEEDED:
+        data['download_url'] = reverse('dataset-report-job-pdf', args=[job.id])
+    return data
+
+
+class ReportJobCreateView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        upload_id = request.data.get('upload_id')
+        try:
+            upload = DatasetUpload.objects.get(
+                id=int(upload_id),
+                user=request.user  # 🔒 OWNER CHECK
             )
-        )
-        story.append(type_table)
-        story.append(
-            Paragraph(
-                f'Section Summary: {top_type[0]} is the most common type ({top_pct:.1f}%).',
-                styles['Italic'],
+        except (TypeError, ValueError, DatasetUpload.DoesNotExist):
+            return Response(
+                {'error': 'Dataset not found or access denied.'},
+                status=status.HTTP_404_NOT_FOUND,
             )
-        )
-    else:
-        story.append(Paragraph('No equipment type distribution available.', styles['Normal']))
 
-    story.append(PageBreak())
+        job = submit_report_job(request.user, upload)
+        return Response(_serialize_report_job(job), status=status.HTTP_202_ACCEPTED)
+
+
+def _get_report_job(request, job_id):
+    return (
+        ReportJob.objects
+        .select_related('upload')
+        .filter(id=job_id, user=request.user)  # 🔒 OWNER CHECK
+        .first()
+    )
+
+
+class ReportJobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
 
-    # Parameter analysis
-    story.append(Paragraph('Parameter Analysis', styles['Heading2']))
-    if df is None:
-        story.append(
-            Paragraph(
-                'Raw CSV data could not be loaded. This section is based on stored summary values only.',
-                styles['Italic'],
+    def get(self, request, job_id):
+        job = _get_report_job(request, job_id)
+        if job is None:
+            return Response(
+                {'error': 'Report job not found.'},
+                status=status.HTTP_404_NOT_FOUND,
             )
-        )
-        story.append(Spacer(1, 12))
-    else:
-        for label in ['Flowrate', 'Pressure', 'Temperature']:
-            if label not in df.columns:
-                continue
-            values, bins = _histogram(df[label])
-            story.append(Paragraph(f'{label} Analysis', styles['Heading3']))
-            story.append(
-                Paragraph(f'Average {label}: {_format_number(s.get(f"avg_{label.lower()}"))}', styles['Normal'])
+        return Response(_serialize_report_job(fail_if_stale(job)), status=status.HTTP_200_OK)
+
+
+class ReportJobDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = _get_report_job(request, job_id)
+        if job is None:
+            return Response(
+                {'error': 'Report job not found.'},
+                status=status.HTTP_404_NOT_FOUND,
             )
-            if values:
-                story.append(_build_bar_chart(values, bins, f'{label} Distribution', width=420, height=180))
-            else:
-                story.append(Paragraph('No numeric data available.', styles['Normal']))
-            if values:
-                max_idx = values.index(max(values))
-                story.append(
-                    Paragraph(
-                        f'Insight: Most values fall between {bins[max_idx]}.',
-                        styles['Italic'],
-                    )
-                )
-            story.append(Spacer(1, 12))
-
-    # Equipment snapshot table
-    story.append(Paragraph('Equipment Snapshot (First 10 Rows)', styles['Heading2']))
-    if df is not None:
-        preview = df[REQUIRED_COLUMNS].head(10)
-        snapshot_rows = [REQUIRED_COLUMNS] + preview.values.tolist()
-        snapshot_table = Table(snapshot_rows, colWidths=[140, 100, 100, 100, 100])
-        snapshot_table.setStyle(
-            TableStyle(
-                [
-                    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ]
+        if job.status != ReportJob.STATUS_SUCCEEDED:
+            return Response(
+                {'error': 'Report is not ready yet.', 'status': job.status},
+                status=status.HTTP_409_CONFLICT,
             )
-        )
-        story.append(snapshot_table)
-        story.append(Spacer(1, 12))
-    else:
-        story.append(
-            Paragraph('Snapshot not available (raw CSV could not be loaded).', styles['Italic'])
-        )
-        story.append(Spacer(1, 12))
-
-    # Observations
-    story.append(Paragraph('Observations & Insights', styles['Heading2']))
-    observations = []
-    if type_dist:
-        top_type = max(type_dist.items(), key=lambda x: x[1])
-        pct = (top_type[1] / total_equipment) * 100 if total_equipment else 0
-        observations.append(
-            f'{top_type[0]} equipment dominates the dataset ({pct:.1f}%).'
-        )
-    if avg_pressure and avg_temperature:
-        observations.append(
-            'Average pressure is slightly elevated relative to temperature patterns.'
-        )
-    if avg_flowrate:
-        observations.append(
-            'Flowrate values are within expected operational ranges.'
-        )
-    if not observations:
-        observations.append('No additional insights available.')
-    for item in observations:
-        story.append(Paragraph(f'- {item}', styles['Normal']))
-
-    def _footer(canvas, doc_obj):
-        canvas.saveState()
-        footer_text = f'Generated by ChemViz | v1.0 | Page {canvas.getPageNumber()}'
-        canvas.setFont('Helvetica', 9)
-        canvas.setFillColor(colors.grey)
-        canvas.drawCentredString(letter[0] / 2.0, 20, footer_text)
-        canvas.restoreState()
-
-    doc.build(story, onFirstPage=_footer, onLaterPages=_footer)
-
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=\"chemviz-report-{upload.id}.pdf\"'
-    return response
+        # Falls back to a synchronous render if the PDF was evicted since.
+        return _build_report_response(request, job.upload)
+
+
+def _build_report_response(request, upload: DatasetUpload, latest=False):
+    # The latest report can fall back to an older upload, so only the ETag,
+    # which names the upload, validates it.
+    last_modified = None if latest else upload.uploaded_at
+    etag = report_etag(upload)
+    cached = not_modified(request, etag, last_modified)
+    if cached is not None:
+        return set_validators(cached, etag, last_modified)
+
+    response = FileResponse(
+        open(report_file(upload), 'rb'),
+        as_attachment=True,
+        filename=f'chemviz-report-{upload.id}.pdf',
+        content_type='application/pdf',
+    )
+    return set_validators(response, etag, last_modified)
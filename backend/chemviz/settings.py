@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,6 +53,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    'api.core.middleware.JSONGZipMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -81,12 +85,49 @@ WSGI_APPLICATION = 'chemviz.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# CHEMVIZ_DB_PROFILE picks the database: "sqlite" (default) or "postgres".
+# SQLite runs in WAL mode so readers do not wait on a writer, waits up to
+# CHEMVIZ_SQLITE_BUSY_TIMEOUT_MS for the write lock instead of failing, and
+# takes that lock when a transaction begins so two writers cannot deadlock
+# upgrading from a read. PostgreSQL (which needs psycopg installed) keeps
+# connections open for CHEMVIZ_DB_CONN_MAX_AGE seconds, checking them
+# before reuse.
+CHEMVIZ_DB_PROFILE = os.environ.get('CHEMVIZ_DB_PROFILE', 'sqlite')
+
+if CHEMVIZ_DB_PROFILE == 'sqlite':
+    CHEMVIZ_SQLITE_JOURNAL_MODE = os.environ.get('CHEMVIZ_SQLITE_JOURNAL_MODE', 'wal')
+    CHEMVIZ_SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('CHEMVIZ_SQLITE_BUSY_TIMEOUT_MS', 20000))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('CHEMVIZ_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                'init_command': (
+                    f'PRAGMA journal_mode={CHEMVIZ_SQLITE_JOURNAL_MODE};'
+                    f'PRAGMA busy_timeout={CHEMVIZ_SQLITE_BUSY_TIMEOUT_MS};'
+                    'PRAGMA synchronous=NORMAL;'
+                ),
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
     }
-}
+elif CHEMVIZ_DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('CHEMVIZ_DB_NAME', 'chemviz'),
+            'USER': os.environ.get('CHEMVIZ_DB_USER', 'chemviz'),
+            'PASSWORD': os.environ.get('CHEMVIZ_DB_PASSWORD', ''),
+            'HOST': os.environ.get('CHEMVIZ_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('CHEMVIZ_DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('CHEMVIZ_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f'CHEMVIZ_DB_PROFILE must be "sqlite" or "postgres", not {CHEMVIZ_DB_PROFILE!r}.'
+    )
 
 
 # Password validation
@@ -127,6 +168,70 @@ STATIC_URL = 'static/'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Dataset ingestion
+# Uploads are parsed in chunks, so the caps below can be raised well past the
+# defaults without the request's peak memory growing with the file.
+
+CHEMVIZ_UPLOAD_MAX_BYTES = int(os.environ.get('CHEMVIZ_UPLOAD_MAX_BYTES', 5 * 1024 * 1024))
+CHEMVIZ_UPLOAD_MAX_ROWS = int(os.environ.get('CHEMVIZ_UPLOAD_MAX_ROWS', 10000))
+CHEMVIZ_CSV_CHUNK_SIZE = int(os.environ.get('CHEMVIZ_CSV_CHUNK_SIZE', 50000))
+# .csv.gz / .csv.zst / .zip uploads are capped by their size after
+# decompression as well as by CHEMVIZ_UPLOAD_MAX_BYTES as sent.
+CHEMVIZ_UPLOAD_MAX_DECOMPRESSED_BYTES = int(
+    os.environ.get('CHEMVIZ_UPLOAD_MAX_DECOMPRESSED_BYTES', 50 * 1024 * 1024)
+)
+
+# Resumable uploads arrive as PUT ranges of at most CHEMVIZ_UPLOAD_CHUNK_BYTES;
+# sessions idle for longer than the TTL are dropped with their staged bytes.
+# A PUT that has not finished within RANGE_TIMEOUT seconds loses its claim on
+# the offset to the client's next attempt.
+CHEMVIZ_UPLOAD_CHUNK_BYTES = int(os.environ.get('CHEMVIZ_UPLOAD_CHUNK_BYTES', 1024 * 1024))
+CHEMVIZ_UPLOAD_SESSION_TTL_HOURS = int(os.environ.get('CHEMVIZ_UPLOAD_SESSION_TTL_HOURS', 24))
+CHEMVIZ_UPLOAD_RANGE_TIMEOUT_SECONDS = int(
+    os.environ.get('CHEMVIZ_UPLOAD_RANGE_TIMEOUT_SECONDS', 300)
+)
+
+# Batch uploads are ingested on a process pool; 0 ingests them in the request.
+CHEMVIZ_BATCH_WORKERS = int(os.environ.get('CHEMVIZ_BATCH_WORKERS', 2))
+CHEMVIZ_BATCH_MAX_FILES = int(os.environ.get('CHEMVIZ_BATCH_MAX_FILES', 50))
+
+# Upload retention when no RetentionPolicy applies; 0 turns a limit off.
+# Sweeps, and removing the files of swept uploads, run on a background
+# thread pool; 0 workers runs them inline.
+CHEMVIZ_RETENTION_MAX_UPLOADS = int(os.environ.get('CHEMVIZ_RETENTION_MAX_UPLOADS', 5))
+CHEMVIZ_RETENTION_MAX_AGE_DAYS = int(os.environ.get('CHEMVIZ_RETENTION_MAX_AGE_DAYS', 0))
+CHEMVIZ_RETENTION_MAX_TOTAL_BYTES = int(os.environ.get('CHEMVIZ_RETENTION_MAX_TOTAL_BYTES', 0))
+CHEMVIZ_RETENTION_BATCH_SIZE = int(os.environ.get('CHEMVIZ_RETENTION_BATCH_SIZE', 500))
+CHEMVIZ_RETENTION_WORKERS = int(os.environ.get('CHEMVIZ_RETENTION_WORKERS', 1))
+
+# Hash uploads while they stream in so re-uploads are recognised for free.
+FILE_UPLOAD_HANDLERS = [
+    'api.datasets.uploads.HashingMemoryFileUploadHandler',
+    'api.datasets.uploads.HashingTemporaryFileUploadHandler',
+]
+
+# Rendered PDF reports are cached on disk, least recently used evicted first.
+
+CHEMVIZ_REPORT_CACHE_DIR = os.environ.get('CHEMVIZ_REPORT_CACHE_DIR', MEDIA_ROOT / 'reports')
+CHEMVIZ_REPORT_CACHE_MAX_BYTES = int(
+    os.environ.get('CHEMVIZ_REPORT_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+)
+
+# Report jobs run on an in-process thread pool; 0 renders them inline.
+# A job still running JOB_TIMEOUT seconds after it started is taken to have
+# died with its process and is marked failed.
+
+CHEMVIZ_REPORT_WORKERS = int(os.environ.get('CHEMVIZ_REPORT_WORKERS', 2))
+CHEMVIZ_REPORT_JOB_TIMEOUT_SECONDS = int(
+    os.environ.get('CHEMVIZ_REPORT_JOB_TIMEOUT_SECONDS', 600)
+)
+
+# The async read endpoints run pandas and ReportLab work on this many worker
+# processes (0 runs it on a thread), with at most MAX_PENDING calls queued
+# or running before they answer 503.
+CHEMVIZ_OFFLOAD_WORKERS = int(os.environ.get('CHEMVIZ_OFFLOAD_WORKERS', 2))
+CHEMVIZ_OFFLOAD_MAX_PENDING = int(os.environ.get('CHEMVIZ_OFFLOAD_MAX_PENDING', 16))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/6.0/ref/settings/#default-auto-field
 
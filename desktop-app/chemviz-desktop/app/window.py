@@ -21,6 +21,8 @@ from screens.upload import UploadScreen
 from widgets.nav import NavWidget
 from widgets.topbar import TopBar
 from services.api_client import client
+from services.store import store
+from services.tasks import runner
 
 
 class MainWindow(QMainWindow):
@@ -94,6 +96,9 @@ class MainWindow(QMainWindow):
         self.nav.set_active("dashboard")
         self.content_stack.setCurrentWidget(self.dashboard_screen)
         self._set_topbar("Dashboard", "Overview of recent equipment analytics.")
+        # Screens share one store, so these four refreshes cost one request
+        # per endpoint.
+        store.clear()
         self.dashboard_screen.refresh()
         self.history_screen.refresh()
         self.charts_screen.refresh()
@@ -139,11 +144,16 @@ class MainWindow(QMainWindow):
             self.top_bar.set_theme_label(theme)
 
     def _on_upload_success(self) -> None:
+        store.invalidate("summaries", "latest_rows")
         self.dashboard_screen.refresh()
         self.history_screen.refresh()
         self.charts_screen.refresh()
 
     def _on_logout(self) -> None:
+        # Drop in-flight refreshes so they cannot repaint the next session.
+        runner.cancel_all()
+        store.clear()
+        self.upload_screen.reset()
         client.logout()
         self.root_stack.setCurrentWidget(self.login_screen)
 
@@ -0,0 +1,92 @@
+"""
+Dashboard refresh latency against a running backend.
+
+Times what DashboardScreen.refresh does on the wire (summaries, then the
+latest rows) three ways:
+
+  baseline     module-level requests.get, a new connection per call
+  session      ApiClient's pooled keep-alive session, validators cleared
+  conditional  ApiClient with ETag validators, so unchanged data is a 304
+
+Usage (from desktop-app/chemviz-desktop, with the backend running):
+
+    python -m benchmarks.refresh_latency --username you@example.com --password ...
+
+Run the backend under a real WSGI server (e.g. gunicorn) for meaningful
+numbers. ``manage.py runserver`` stalls each reply on a kept-alive
+connection for a delayed ACK (~40 ms), which penalises pooled sessions.
+"""
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+import requests
+
+from services.api_client import ApiClient
+
+
+def _time(fn: Callable[[], None], iterations: int, warmup: int) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(label: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[max(0, int(len(ordered) * 0.95) - 1)]
+    print(
+        f"{label:<12} median {statistics.median(ordered):7.2f} ms"
+        f"   p95 {p95:7.2f} ms   mean {statistics.fmean(ordered):7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    args = parser.parse_args()
+
+    # Log in directly so the benchmark never overwrites the saved desktop token.
+    response = requests.post(
+        f"{args.base_url}/api/auth/token/",
+        json={"username": args.username, "password": args.password},
+        timeout=15,
+    )
+    response.raise_for_status()
+    token = response.json()["token"]
+    headers = {"Authorization": f"Token {token}"}
+    client = ApiClient(base_url=args.base_url, token=token)
+
+    def baseline() -> None:
+        for path in ("/api/datasets/summaries/", "/api/datasets/latest/"):
+            response = requests.get(f"{args.base_url}{path}", headers=headers, timeout=15)
+            response.raise_for_status()
+            response.json()
+
+    def pooled() -> None:
+        client._validators.clear()
+        client.fetch_summaries()
+        client.fetch_latest_rows()
+
+    def conditional() -> None:
+        client.fetch_summaries()
+        client.fetch_latest_rows()
+
+    print(f"Dashboard refresh against {args.base_url} ({args.iterations} iterations)")
+    _report("baseline", _time(baseline, args.iterations, args.warmup))
+    _report("session", _time(pooled, args.iterations, args.warmup))
+    _report("conditional", _time(conditional, args.iterations, args.warmup))
+
+
+if __name__ == "__main__":
+    main()
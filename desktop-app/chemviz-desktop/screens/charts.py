@@ -11,7 +11,7 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
-from services.api_client import client
+from services.store import store
 
 
 class ChartsScreen(QWidget):
@@ -19,6 +19,7 @@ class ChartsScreen(QWidget):
         super().__init__()
         self.theme = "dark"
         self.metric = "Flowrate"
+        self.summary: dict = {}
         self.latest_rows: list[dict] = []
 
         root_layout = QVBoxLayout(self)
@@ -99,30 +100,47 @@ class ChartsScreen(QWidget):
         layout.addWidget(self.scatter_card)
         layout.addStretch()
 
+        store.subscribe("summaries", self._on_summaries, self._on_summaries_failed)
+        store.subscribe("latest_rows", self._on_latest_rows, self._on_latest_rows_failed)
+
     def refresh(self) -> None:
-        try:
-            data = client.fetch_summaries()
-            results = data.get("results", [])
-            summary = results[0]["summary"] if results else {}
-        except Exception:
-            summary = {}
+        store.load("summaries")
+        store.load("latest_rows")
+
+    def _on_summaries(self, data: dict) -> None:
+        results = data.get("results", [])
+        self.summary = results[0]["summary"] if results else {}
+        self._render_summary()
+
+    def _on_summaries_failed(self, _error: Exception) -> None:
+        self.summary = {}
+        self._render_summary()
+
+    def _on_latest_rows(self, data: dict) -> None:
+        self.latest_rows = data.get("rows", [])
+        self._render_rows()
 
+    def _on_latest_rows_failed(self, _error: Exception) -> None:
+        self.latest_rows = []
+        self._render_rows()
+
+    def _render(self) -> None:
+        self._render_summary()
+        self._render_rows()
+
+    def _render_summary(self) -> None:
+        summary = self.summary
         type_dist = summary.get("type_distribution", {}) if summary else {}
         self._plot_type_distribution(type_dist)
         self._plot_averages(summary)
 
-        try:
-            latest = client.fetch_latest_rows()
-            self.latest_rows = latest.get("rows", [])
-        except Exception:
-            self.latest_rows = []
-
+    def _render_rows(self) -> None:
         self._plot_deep_dive()
         self._plot_scatter()
 
     def set_theme(self, theme: str) -> None:
         self.theme = theme
-        self.refresh()
+        self._render()
 
     def _metric_button(self, label: str) -> QPushButton:
         button = QPushButton(label)
@@ -16,7 +16,7 @@ from PyQt5.QtWidgets import (
     QWidget,
 )
 
-from services.api_client import client
+from services.store import store
 
 
 class DashboardScreen(QWidget):
@@ -24,6 +24,7 @@ class DashboardScreen(QWidget):
         super().__init__()
         self.theme = "dark"
         self.metric = "Flowrate"
+        self.uploads: list[dict] = []
         self.latest_rows: list[dict] = []
         root_layout = QVBoxLayout(self)
         root_layout.setContentsMargins(0, 0, 0, 0)
@@ -144,16 +145,36 @@ class DashboardScreen(QWidget):
         layout.addWidget(table_card)
         layout.addStretch()
 
+        store.subscribe("summaries", self._on_summaries, self._on_summaries_failed)
+        store.subscribe("latest_rows", self._on_latest_rows, self._on_latest_rows_failed)
+
     def refresh(self) -> None:
-        try:
-            data = client.fetch_summaries()
-            results = data.get("results", [])
-            summary = results[0]["summary"] if results else {}
-        except Exception:
-            summary = {}
-            results = []
-
-        uploads = results
+        store.load("summaries")
+        store.load("latest_rows")
+
+    def _on_summaries(self, data: dict) -> None:
+        self.uploads = data.get("results", [])
+        self._render_summary()
+
+    def _on_summaries_failed(self, _error: Exception) -> None:
+        self.uploads = []
+        self._render_summary()
+
+    def _on_latest_rows(self, data: dict) -> None:
+        self.latest_rows = data.get("rows", [])
+        self._plot_deep_dive()
+
+    def _on_latest_rows_failed(self, _error: Exception) -> None:
+        self.latest_rows = []
+        self._plot_deep_dive()
+
+    def _render(self) -> None:
+        self._render_summary()
+        self._plot_deep_dive()
+
+    def _render_summary(self) -> None:
+        uploads = self.uploads
+        summary = uploads[0]["summary"] if uploads else {}
         mapping = {
             "Total Equipment": summary.get("total_equipment"),
             "Avg Flowrate": summary.get("avg_flowrate"),
@@ -174,17 +195,9 @@ class DashboardScreen(QWidget):
         self._plot_averages(summary)
         self._render_table(uploads)
 
-        try:
-            latest = client.fetch_latest_rows()
-            self.latest_rows = latest.get("rows", [])
-        except Exception:
-            self.latest_rows = []
-
-        self._plot_deep_dive()
-
     def set_theme(self, theme: str) -> None:
         self.theme = theme
-        self.refresh()
+        self._render()
 
     def _metric_button(self, label: str) -> QPushButton:
         button = QPushButton(label)
@@ -12,6 +12,8 @@ from PyQt5.QtWidgets import (
 )
 
 from services.api_client import client
+from services.store import store
+from services.tasks import runner
 
 
 class HistoryScreen(QWidget):
@@ -42,19 +44,21 @@ class HistoryScreen(QWidget):
         layout.addWidget(timeline)
         layout.addStretch()
 
+        store.subscribe("summaries", self._on_summaries, lambda _: self._render([]))
+
     def refresh(self) -> None:
+        store.load("summaries")
+
+    def _on_summaries(self, data: dict) -> None:
+        self._render(data.get("results", []))
+
+    def _render(self, uploads: list[dict]) -> None:
         for idx in reversed(range(self.timeline_layout.count())):
             item = self.timeline_layout.itemAt(idx)
             widget = item.widget()
             if widget is not None:
                 widget.setParent(None)
 
-        try:
-            data = client.fetch_summaries()
-            uploads = data.get("results", [])
-        except Exception:
-            uploads = []
-
         if not uploads:
             self.empty_label = QLabel("No uploads yet. Upload a CSV to see history.")
             self.empty_label.setObjectName("historySubtitle")
@@ -131,13 +135,24 @@ class HistoryScreen(QWidget):
         )
         if not path:
             return
-        try:
-            content = client.fetch_report(upload_id)
-            with open(path, "wb") as handle:
-                handle.write(content)
-            QMessageBox.information(self, "Download Complete", "PDF report saved.")
-        except Exception:
-            QMessageBox.critical(self, "Download Failed", "Unable to download PDF report.")
+        runner.run(
+            f"history.report.{upload_id}",
+            self._save_report,
+            upload_id,
+            path,
+            on_success=lambda _: QMessageBox.information(
+                self, "Download Complete", "PDF report saved."
+            ),
+            on_error=lambda _: QMessageBox.critical(
+                self, "Download Failed", "Unable to download PDF report."
+            ),
+        )
+
+    def _save_report(self, upload_id: int, path: str) -> None:
+        # Runs on a pool thread so a slow report render keeps the window live.
+        content = client.fetch_report(upload_id)
+        with open(path, "wb") as handle:
+            handle.write(content)
 
     def _format_datetime(self, value: str | None) -> str:
         if not value:
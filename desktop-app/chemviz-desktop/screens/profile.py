@@ -12,6 +12,7 @@ from PyQt5.QtWidgets import (
 )
 
 from services.api_client import client
+from services.store import store
 
 
 class ProfileScreen(QWidget):
@@ -77,18 +78,23 @@ class ProfileScreen(QWidget):
         layout.addWidget(self.card)
         layout.addStretch()
 
+        store.subscribe(
+            "profile",
+            self._apply_profile,
+            lambda _: self.status_label.setText("Unable to load profile."),
+        )
+
     def refresh(self) -> None:
-        try:
-            profile = client.fetch_profile()
-            username = profile.get("username", "")
-            email = profile.get("email", "")
-            role = profile.get("role", "--")
-            self.username_input.setText(username)
-            self.email_input.setText(email)
-            self.role_label.setText(f"Role: {role}")
-            self.status_label.setText("")
-        except Exception:
-            self.status_label.setText("Unable to load profile.")
+        store.load("profile")
+
+    def _apply_profile(self, profile: dict) -> None:
+        username = profile.get("username", "")
+        email = profile.get("email", "")
+        role = profile.get("role", "--")
+        self.username_input.setText(username)
+        self.email_input.setText(email)
+        self.role_label.setText(f"Role: {role}")
+        self.status_label.setText("")
 
     def _toggle_edit(self) -> None:
         if not self.editing:
@@ -112,9 +118,10 @@ class ProfileScreen(QWidget):
 
         try:
             updated = client.update_profile(username, email)
-            self.username_input.setText(updated.get("username", username))
-            self.email_input.setText(updated.get("email", email))
-            self.role_label.setText(f"Role: {updated.get('role', 'User')}")
+            updated.setdefault("username", username)
+            updated.setdefault("email", email)
+            updated.setdefault("role", "User")
+            store.put("profile", updated)
             QMessageBox.information(self, "Success", "Profile updated.")
             self._stop_edit()
         except Exception:
@@ -122,7 +129,11 @@ class ProfileScreen(QWidget):
 
     def _cancel_edit(self) -> None:
         self._stop_edit()
-        self.refresh()
+        cached = store.get("profile")
+        if cached:
+            self._apply_profile(cached)
+        else:
+            self.refresh()
 
     def _stop_edit(self) -> None:
         self.editing = False
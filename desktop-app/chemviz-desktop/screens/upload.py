@@ -3,6 +3,7 @@ from PyQt5.QtWidgets import (
     QFileDialog,
     QFrame,
     QLabel,
+    QProgressBar,
     QPushButton,
     QVBoxLayout,
     QHBoxLayout,
@@ -11,10 +12,13 @@ from PyQt5.QtWidgets import (
 )
 
 from services.api_client import client
+from services.tasks import runner
 
 
 class UploadScreen(QWidget):
     upload_success = pyqtSignal()
+    # Emitted from the upload's worker thread; Qt queues it to the GUI.
+    upload_progress = pyqtSignal(object, object)
 
     def __init__(self) -> None:
         super().__init__()
@@ -76,6 +80,13 @@ class UploadScreen(QWidget):
         self.upload_button.setObjectName("primaryButton")
         self.upload_button.clicked.connect(self._upload_file)
 
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setObjectName("uploadProgress")
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.hide()
+        self.upload_progress.connect(self._on_upload_progress)
+
         self.status_label = QLabel("")
         self.status_label.setObjectName("cardSubtitle")
         self.status_label.setAlignment(Qt.AlignCenter)
@@ -83,6 +94,7 @@ class UploadScreen(QWidget):
         card_layout.addWidget(drop_zone)
         card_layout.addWidget(self.file_label)
         card_layout.addWidget(self.upload_button, alignment=Qt.AlignCenter)
+        card_layout.addWidget(self.progress_bar)
         card_layout.addWidget(self.status_label)
 
         layout.addWidget(upload_card)
@@ -135,21 +147,52 @@ class UploadScreen(QWidget):
 
     def _browse_file(self) -> None:
         path, _ = QFileDialog.getOpenFileName(
-            self, "Select CSV", "", "CSV Files (*.csv)"
+            self, "Select CSV", "", "CSV Files (*.csv *.csv.gz *.csv.zst *.zip)"
         )
         if path:
             self.file_path = path
             self.file_label.setText(path)
             self.status_label.setText("")
 
+    def reset(self) -> None:
+        self.file_path = ""
+        self.file_label.setText("No file selected.")
+        self.status_label.setText("")
+        self.progress_bar.hide()
+        self.upload_button.setEnabled(True)
+
     def _upload_file(self) -> None:
         if not self.file_path:
             self.status_label.setText("Please select a CSV file.")
             return
         self.status_label.setText("Uploading...")
-        try:
-            client.upload_csv(self.file_path, "")
-            self.status_label.setText("Upload complete.")
-            self.upload_success.emit()
-        except Exception:
-            self.status_label.setText("Upload failed. Check the CSV and try again.")
+        self.upload_button.setEnabled(False)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        runner.run(
+            "upload",
+            client.upload_csv_resumable,
+            self.file_path,
+            progress=self.upload_progress.emit,
+            on_success=self._on_upload_done,
+            on_error=self._on_upload_failed,
+        )
+
+    def _on_upload_progress(self, sent: int, total: int) -> None:
+        percent = int(sent * 100 / total) if total else 100
+        self.progress_bar.setValue(percent)
+        if sent < total:
+            self.status_label.setText(f"Uploading... {percent}%")
+        else:
+            self.status_label.setText("Processing...")
+
+    def _on_upload_done(self, _result: object) -> None:
+        self.progress_bar.hide()
+        self.upload_button.setEnabled(True)
+        self.status_label.setText("Upload complete.")
+        self.upload_success.emit()
+
+    def _on_upload_failed(self, _error: Exception) -> None:
+        self.progress_bar.hide()
+        self.upload_button.setEnabled(True)
+        self.status_label.setText("Upload failed. Check the CSV and try again.")
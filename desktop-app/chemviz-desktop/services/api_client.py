@@ -1,13 +1,23 @@
+import gzip
 import json
-from dataclasses import dataclass
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 TOKEN_PATH = Path(__file__).resolve().parent.parent / "data" / "token.json"
 
+# Sent as they are; plain CSVs are gzipped first.
+COMPRESSED_SUFFIXES = (".csv.gz", ".csv.zst", ".zip")
+
 
 def _save_token(token: str) -> None:
     TOKEN_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -33,20 +43,75 @@ def _clear_token() -> None:
 class ApiClient:
     base_url: str = "http://127.0.0.1:8000"
     token: Optional[str] = None
+    pool_size: int = 8
+    max_retries: int = 3
+    backoff_factor: float = 0.3
+    session: requests.Session = field(init=False, repr=False)
+    # URL -> (ETag, decoded body) from the last 200, replayed on a 304.
+    _validators: Dict[str, Tuple[str, Any]] = field(default_factory=dict, init=False, repr=False)
 
     def __post_init__(self) -> None:
+        self.session = self._build_session()
         if self.token is None:
             self.token = _load_token()
+        self._set_token(self.token)
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        # Only idempotent reads are retried; uploads and logins are not.
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["Accept-Encoding"] = "gzip, deflate"
+        return session
 
-    def _headers(self) -> Dict[str, str]:
+    def _set_token(self, token: Optional[str]) -> None:
+        self.token = token
+        if token:
+            self.session.headers["Authorization"] = f"Token {token}"
+        else:
+            self.session.headers.pop("Authorization", None)
+
+    def _conditional_get(
+        self,
+        path: str,
+        binary: bool = False,
+        timeout: int = 15,
+        cache_path: Optional[str] = None,
+    ) -> Any:
+        """GET ``path``, revalidating the copy cached under ``cache_path`` (default ``path``)."""
+        url = f"{self.base_url}{path}"
+        cache_key = f"{self.base_url}{cache_path or path}"
         headers: Dict[str, str] = {}
-        if self.token:
-            headers["Authorization"] = f"Token {self.token}"
-        return headers
+        cached = self._validators.get(cache_key)
+        if cached:
+            headers["If-None-Match"] = cached[0]
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        response.raise_for_status()
+        body = response.content if binary else response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._validators[cache_key] = (etag, body)
+        return body
 
     def login(self, username: str, password: str) -> str:
-        response = requests.post(
+        response = self.session.post(
             f"{self.base_url}/api/auth/token/",
+            # Never send a stale token to the public auth endpoints.
+            headers={"Authorization": None},
             json={"username": username, "password": password},
             timeout=15,
         )
@@ -54,13 +119,16 @@ class ApiClient:
         token = response.json().get("token")
         if not token:
             raise ValueError("Token not returned by server.")
-        self.token = token
+        self._set_token(token)
+        self._validators.clear()
         _save_token(token)
         return token
 
     def register(self, full_name: str, email: str, password: str, confirm_password: str) -> str:
-        response = requests.post(
+        response = self.session.post(
             f"{self.base_url}/api/auth/register/",
+            # Never send a stale token to the public auth endpoints.
+            headers={"Authorization": None},
             json={
                 "full_name": full_name,
                 "email": email,
@@ -73,45 +141,38 @@ class ApiClient:
         token = response.json().get("token")
         if not token:
             raise ValueError("Token not returned by server.")
-        self.token = token
+        self._set_token(token)
+        self._validators.clear()
         _save_token(token)
         return token
 
     def logout(self) -> None:
         if self.token:
             try:
-                requests.post(
+                self.session.post(
                     f"{self.base_url}/api/auth/logout/",
-                    headers=self._headers(),
                     timeout=10,
                 )
             except requests.RequestException:
                 pass
-        self.token = None
+        self._set_token(None)
+        self._validators.clear()
         _clear_token()
 
     def fetch_summaries(self) -> Dict[str, Any]:
-        response = requests.get(
-            f"{self.base_url}/api/datasets/summaries/",
-            headers=self._headers(),
-            timeout=15,
-        )
-        response.raise_for_status()
-        return response.json()
+        return self._conditional_get("/api/datasets/summaries/")
 
     def fetch_profile(self) -> Dict[str, Any]:
-        response = requests.get(
+        response = self.session.get(
             f"{self.base_url}/api/auth/me/",
-            headers=self._headers(),
             timeout=15,
         )
         response.raise_for_status()
         return response.json()
 
     def update_profile(self, username: str, email: str) -> Dict[str, Any]:
-        response = requests.put(
+        response = self.session.put(
             f"{self.base_url}/api/auth/me/",
-            headers=self._headers(),
             json={"username": username, "email": email},
             timeout=15,
         )
@@ -119,38 +180,147 @@ class ApiClient:
         return response.json()
 
     def fetch_latest_rows(self) -> Dict[str, Any]:
-        response = requests.get(
-            f"{self.base_url}/api/datasets/latest/",
-            headers=self._headers(),
+        return self._conditional_get("/api/datasets/latest/")
+
+    def request_report(self, upload_id: int) -> Dict[str, Any]:
+        response = self.session.post(
+            f"{self.base_url}/api/datasets/report/jobs/",
+            json={"upload_id": upload_id},
             timeout=15,
         )
         response.raise_for_status()
         return response.json()
 
-    def fetch_report(self, upload_id: int) -> bytes:
-        response = requests.get(
-            f"{self.base_url}/api/datasets/report/{upload_id}/",
-            headers=self._headers(),
-            timeout=30,
+    def fetch_report_job(self, job_id: str) -> Dict[str, Any]:
+        response = self.session.get(
+            f"{self.base_url}/api/datasets/report/jobs/{job_id}/",
+            timeout=15,
         )
         response.raise_for_status()
-        return response.content
+        return response.json()
+
+    def fetch_report(
+        self,
+        upload_id: int,
+        poll_interval: float = 0.5,
+        max_wait: float = 120.0,
+    ) -> bytes:
+        # Cached reports come back as already succeeded jobs, so this is
+        # one POST plus a download that revalidates the copy kept here.
+        job = self.request_report(upload_id)
+        deadline = time.monotonic() + max_wait
+        while job.get("status") not in ("succeeded", "failed"):
+            if time.monotonic() > deadline:
+                raise TimeoutError("Report generation timed out.")
+            time.sleep(poll_interval)
+            job = self.fetch_report_job(job["id"])
+
+        if job["status"] == "failed":
+            raise RuntimeError(job.get("error") or "Report generation failed.")
+
+        return self._conditional_get(
+            job["download_url"],
+            binary=True,
+            timeout=30,
+            cache_path=f"/api/datasets/report/{upload_id}/",
+        )
 
     def upload_csv(self, file_path: str, name: Optional[str] = None) -> Dict[str, Any]:
-        with open(file_path, "rb") as handle:
-            files = {"file": handle}
-            data = {}
-            if name:
-                data["name"] = name
-            response = requests.post(
+        path = Path(file_path)
+        data = {"name": name or path.name}
+        with self._compressed(path) as (upload_name, handle):
+            response = self.session.post(
                 f"{self.base_url}/api/datasets/upload/",
-                headers=self._headers(),
-                files=files,
+                files={"file": (upload_name, handle)},
                 data=data,
                 timeout=30,
             )
         response.raise_for_status()
         return response.json()
 
+    def upload_csv_resumable(
+        self,
+        file_path: str,
+        name: Optional[str] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        max_attempts: int = 5,
+    ) -> Dict[str, Any]:
+        """
+        Upload through a resumable session: the file goes up in ranges, and
+        after a dropped connection or a 5xx the client asks the server for
+        its offset and resumes there. ``progress(sent, total)`` is called
+        after every range.
+        """
+        path = Path(file_path)
+        with self._compressed(path) as (upload_name, handle):
+            size = handle.seek(0, 2)
+            response = self.session.post(
+                f"{self.base_url}/api/datasets/upload/sessions/",
+                json={"filename": upload_name, "size": size, "name": name or path.name},
+                timeout=15,
+            )
+            response.raise_for_status()
+            upload = response.json()
+            upload_url = f"{self.base_url}{upload['upload_url']}"
+
+            offset: Optional[int] = upload["offset"]
+            failures = 0
+            while offset is None or offset < size:
+                try:
+                    if offset is None:
+                        response = self.session.get(upload_url, timeout=15)
+                    else:
+                        handle.seek(offset)
+                        chunk = handle.read(upload["chunk_size"])
+                        response = self.session.put(
+                            upload_url,
+                            data=chunk,
+                            headers={
+                                "Content-Type": "application/octet-stream",
+                                "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{size}",
+                            },
+                            timeout=30,
+                        )
+                    if response.status_code >= 500:
+                        raise requests.HTTPError(response=response)
+                except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+                    failures += 1
+                    if failures >= max_attempts:
+                        raise
+                    time.sleep(self.backoff_factor * 2 ** failures)
+                    offset = None
+                    continue
+
+                # 409: the server holds a different offset than we assumed.
+                if response.status_code != 409:
+                    response.raise_for_status()
+                failures = 0
+                offset = response.json()["offset"]
+                if progress is not None:
+                    progress(offset, size)
+
+            response = self.session.post(
+                f"{self.base_url}{upload['complete_url']}",
+                timeout=120,
+            )
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    @contextmanager
+    def _compressed(path: Path) -> Iterator[Tuple[str, IO[bytes]]]:
+        if path.name.lower().endswith(COMPRESSED_SUFFIXES):
+            with open(path, "rb") as handle:
+                yield path.name, handle
+            return
+        # No name and mtime=0 in the gzip header keep the bytes a function
+        # of the CSV alone, so the server recognises re-uploads of the same
+        # file even when it was renamed or touched.
+        with open(path, "rb") as source, tempfile.SpooledTemporaryFile(8 * 1024 * 1024) as spool:
+            with gzip.GzipFile(filename="", fileobj=spool, mode="wb", mtime=0) as packed:
+                shutil.copyfileobj(source, packed, 1024 * 1024)
+            spool.seek(0)
+            yield f"{path.name}.gz", spool
+
 
 client = ApiClient()
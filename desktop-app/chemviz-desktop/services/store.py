@@ -0,0 +1,103 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from services.api_client import client
+from services.tasks import TaskRunner, runner
+
+
+Callback = Callable[[Any], None]
+
+
+class DataStore:
+    """
+    Shared cache of API reads for the desktop screens.
+
+    Screens subscribe to a key and call ``load``; the first caller starts
+    one background fetch, later callers join it, and while the response is
+    younger than ``ttl`` seconds further loads are no-ops. Every response
+    is handed to all subscribers of its key, on the GUI thread.
+    """
+
+    def __init__(
+        self,
+        fetchers: Dict[str, Callable[[], Any]],
+        ttl: float = 30.0,
+        task_runner: Optional[TaskRunner] = None,
+    ) -> None:
+        self.fetchers = fetchers
+        self.ttl = ttl
+        self.runner = task_runner or runner
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self._pending: set = set()
+        self._subscribers: Dict[str, List[Tuple[Callback, Optional[Callback]]]] = {}
+
+    def subscribe(
+        self,
+        key: str,
+        on_data: Callback,
+        on_error: Optional[Callback] = None,
+    ) -> None:
+        self._subscribers.setdefault(key, []).append((on_data, on_error))
+
+    def get(self, key: str) -> Any:
+        entry = self._cache.get(key)
+        return entry[1] if entry else None
+
+    def load(self, key: str, force: bool = False) -> None:
+        if not force:
+            if key in self._pending:
+                return
+            entry = self._cache.get(key)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                # Every subscriber was handed this value when it arrived.
+                return
+
+        # Starting under the same task key supersedes an older fetch.
+        self._pending.add(key)
+        self.runner.run(
+            f"store.{key}",
+            self.fetchers[key],
+            on_success=lambda value: self._on_loaded(key, value),
+            on_error=lambda exc: self._on_failed(key, exc),
+        )
+
+    def put(self, key: str, value: Any) -> None:
+        self._cache[key] = (time.monotonic(), value)
+        self._notify(key, value)
+
+    def invalidate(self, *keys: str) -> None:
+        # A fetch already in flight may predate the change, so the next
+        # load starts a new one rather than joining it.
+        for key in keys or list(self._cache):
+            self._cache.pop(key, None)
+            self._pending.discard(key)
+
+    def clear(self) -> None:
+        for key in list(self._pending):
+            self.runner.cancel(f"store.{key}")
+        self._pending.clear()
+        self._cache.clear()
+
+    def _on_loaded(self, key: str, value: Any) -> None:
+        self._pending.discard(key)
+        self.put(key, value)
+
+    def _on_failed(self, key: str, exc: Exception) -> None:
+        self._pending.discard(key)
+        self._cache.pop(key, None)
+        for _, on_error in self._subscribers.get(key, []):
+            if on_error is not None:
+                on_error(exc)
+
+    def _notify(self, key: str, value: Any) -> None:
+        for on_data, _ in self._subscribers.get(key, []):
+            on_data(value)
+
+
+store = DataStore(
+    {
+        "summaries": client.fetch_summaries,
+        "latest_rows": client.fetch_latest_rows,
+        "profile": client.fetch_profile,
+    }
+)
@@ -0,0 +1,104 @@
+from typing import Any, Callable, Dict, Optional
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class _TaskSignals(QObject):
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+
+class ApiTask(QRunnable):
+    """
+    Runs one blocking call on a pool thread and reports back through Qt
+    signals, which are delivered on the thread that connected to them.
+    """
+
+    def __init__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        super().__init__()
+        # TaskRunner holds the reference; with auto-delete Qt would free
+        # the C++ object when run() returns, before the runner lets go of
+        # it, and cancelling the task then would hit a deleted wrapper.
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = _TaskSignals()
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def run(self) -> None:
+        if self.cancelled:
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as exc:
+            self._emit(self.signals.failed, exc)
+            return
+        self._emit(self.signals.succeeded, result)
+
+    def _emit(self, signal, value: Any) -> None:
+        if self.cancelled:
+            return
+        try:
+            signal.emit(value)
+        except RuntimeError:
+            # The signals object is gone because the app is shutting down.
+            pass
+
+
+class TaskRunner(QObject):
+    """
+    Keyed front end for QThreadPool. Starting a task under a key that is
+    still running cancels the older one, so a superseded refresh never
+    overwrites newer results.
+    """
+
+    def __init__(self, pool: Optional[QThreadPool] = None) -> None:
+        super().__init__()
+        self.pool = pool or QThreadPool.globalInstance()
+        self._active: Dict[str, ApiTask] = {}
+
+    def run(
+        self,
+        key: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        on_success: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        **kwargs: Any,
+    ) -> ApiTask:
+        self.cancel(key)
+        task = ApiTask(fn, *args, **kwargs)
+        if on_success is not None:
+            task.signals.succeeded.connect(on_success)
+        if on_error is not None:
+            task.signals.failed.connect(on_error)
+        task.signals.succeeded.connect(lambda _result: self._release(key, task))
+        task.signals.failed.connect(lambda _exc: self._release(key, task))
+        self._active[key] = task
+        self.pool.start(task)
+        return task
+
+    def cancel(self, key: str) -> None:
+        task = self._active.pop(key, None)
+        if task is None:
+            return
+        task.cancel()
+        self.pool.tryTake(task)
+
+    def cancel_all(self) -> None:
+        for key in list(self._active):
+            self.cancel(key)
+
+    def is_running(self, key: str) -> bool:
+        return key in self._active
+
+    def _release(self, key: str, task: ApiTask) -> None:
+        if self._active.get(key) is task:
+            del self._active[key]
+
+
+runner = TaskRunner()
@@ -0,0 +1,51 @@
+import os
+import threading
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QCoreApplication, QThreadPool  # noqa: E402
+
+from services.tasks import TaskRunner  # noqa: E402
+
+app = QCoreApplication.instance() or QCoreApplication([])
+
+
+class TaskRunnerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = QThreadPool()
+        self.runner = TaskRunner(self.pool)
+
+    def test_cancelling_a_finished_task(self) -> None:
+        self.runner.run("summaries", lambda: 42)
+        self.runner.run("latest", lambda: 7)
+        self.pool.waitForDone()
+
+        # run() has returned but the queued signals have not been delivered.
+        self.assertTrue(self.runner.is_running("summaries"))
+        self.runner.cancel("summaries")
+        self.runner.cancel_all()
+        self.assertFalse(self.runner.is_running("latest"))
+        app.processEvents()
+
+    def test_result_is_delivered_and_released(self) -> None:
+        results = []
+        self.runner.run("summaries", lambda: 42, on_success=results.append)
+        self.pool.waitForDone()
+        app.processEvents()
+        self.assertEqual(results, [42])
+        self.assertFalse(self.runner.is_running("summaries"))
+
+    def test_newer_task_supersedes_a_running_one(self) -> None:
+        release = threading.Event()
+        results = []
+        self.runner.run("latest", release.wait, 5, on_success=results.append)
+        self.runner.run("latest", lambda: "newer", on_success=results.append)
+        release.set()
+        self.pool.waitForDone()
+        app.processEvents()
+        self.assertEqual(results, ["newer"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -61,10 +61,38 @@ export async function fetchSummaries() {
   return response.data.results;
 }
 
+export type ReportJob = {
+  id: string;
+  upload_id: number;
+  status: 'pending' | 'running' | 'succeeded' | 'failed';
+  error: string | null;
+  created_at: string;
+  finished_at: string | null;
+  download_url?: string;
+};
+
+const REPORT_POLL_INTERVAL_MS = 500;
+const REPORT_MAX_WAIT_MS = 120_000;
+
 export async function fetchReport(uploadId: number) {
-  const response = await api.get(`/api/datasets/report/${uploadId}/`, {
-    responseType: 'blob',
+  let { data: job } = await api.post<ReportJob>('/api/datasets/report/jobs/', {
+    upload_id: uploadId,
   });
+
+  const deadline = Date.now() + REPORT_MAX_WAIT_MS;
+  while (job.status === 'pending' || job.status === 'running') {
+    if (Date.now() > deadline) {
+      throw new Error('Report generation timed out.');
+    }
+    await new Promise((resolve) => setTimeout(resolve, REPORT_POLL_INTERVAL_MS));
+    ({ data: job } = await api.get<ReportJob>(`/api/datasets/report/jobs/${job.id}/`));
+  }
+
+  if (job.status === 'failed' || !job.download_url) {
+    throw new Error(job.error ?? 'Report generation failed.');
+  }
+
+  const response = await api.get(job.download_url, { responseType: 'blob' });
   return response.data as Blob;
 }
 